@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+'''
+정부 api 공용 http 클라이언트 (모든 적재 스크립트에서 사용)
+- 연결 재사용(keep-alive) 세션 + 커넥션 풀
+- connect/read timeout
+- 5xx, 연결 오류 시 지수 백오프(jitter) 재시도
+- metrics가 있으면 요청마다 대기 시간(재시도 포함)·응답 바이트 수 기록 (http 단계)
+- on_retry: 재시도할 때마다 호출 (재시도도 실제 api 호출 -> 일일 할당량 기록용)
+create: 2026.10.18
+'''
+
+import logging
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUS = 500 # 이 이상 응답 코드는 재시도
+
+
+class ApiClient:
+    def __init__(self, pool_size: int = 16, connect_timeout: float = 5, read_timeout: float = 60,
+                 max_retries: int = 4, backoff: float = 1.0, max_backoff: float = 30, metrics=None):
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self.adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session = requests.Session()
+        self.session.mount('http://', self.adapter)
+        self.session.mount('https://', self.adapter)
+
+        # 요청 수, 재시도 수, 연결 오류(연결 끊김, timeout -> 재연결) 수, 5xx 수
+        self.stats = {'requests': 0, 'retries': 0, 'reconnects': 0, 'server_errors': 0}
+        self.lock = threading.Lock()
+        self.metrics = metrics # metrics.Metrics (선택)
+
+    def _count(self, key: str):
+        with self.lock:
+            self.stats[key] += 1
+
+    # 재시도 대기 시간: 0 ~ backoff * 2^attempt 사이 임의 값 (full jitter)
+    def _sleep(self, attempt: int):
+        time.sleep(random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt)))
+
+    def _retry(self, attempt: int, on_retry=None):
+        self._count('retries')
+        if on_retry is not None:
+            on_retry()
+        self._sleep(attempt)
+
+    def get(self, url: str, params: dict = None, stream: bool = False, on_retry=None) -> requests.Response:
+        start = time.perf_counter()
+        r = self._get(url, params, stream, on_retry)
+        if self.metrics is not None:
+            # stream이면 본문을 아직 안 받았으므로 바이트 수는 기록 안 함
+            self.metrics.observe('http', time.perf_counter() - start, nbytes=0 if stream else len(r.content))
+        return r
+
+    def _get(self, url: str, params: dict = None, stream: bool = False, on_retry=None) -> requests.Response:
+        for attempt in range(self.max_retries + 1):
+            self._count('requests')
+            try:
+                r = self.session.get(url, params=params, timeout=self.timeout, stream=stream)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._count('reconnects')
+                if attempt == self.max_retries:
+                    raise
+                logging.warning('api 연결 오류. 재시도 %d/%d: %s', attempt + 1, self.max_retries, e)
+                self._retry(attempt, on_retry)
+                continue
+
+            if r.status_code >= RETRY_STATUS:
+                self._count('server_errors')
+                if attempt == self.max_retries:
+                    r.raise_for_status()
+                logging.warning('api 응답 코드 %d. 재시도 %d/%d', r.status_code, attempt + 1, self.max_retries)
+                r.close()
+                self._retry(attempt, on_retry)
+                continue
+
+            return r
+
+    ### 지금까지 새로 연 tcp 연결 수 (keep-alive로 재사용되면 늘지 않음)
+    def connections(self) -> int:
+        pools = self.adapter.poolmanager.pools
+        return sum(pools[key].num_connections for key in pools.keys())
+
+    def summary(self) -> str:
+        return 'api 요청 {requests}회, 재시도 {retries}회, 재연결 {reconnects}회, 5xx {server_errors}회'.format(**self.stats) \
+            + ', tcp 연결 {}개'.format(self.connections())
+
+    def close(self):
+        self.session.close()
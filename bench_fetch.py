@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+'''
+순차 수집 vs 동시 수집 벤치마크 (molit_stub 로컬 서버 대상)
+실행: python bench_fetch.py --jobs 260 --latency 0.2
+create: 2026.10.18
+'''
+
+import argparse
+import time
+import xml.etree.ElementTree as ET
+
+import requests
+
+from api_client import ApiClient
+from fetcher import fetch_concurrent
+from molit_stub import start_server
+
+
+# get: requests.get(매번 새 연결) 또는 ApiClient.get(keep-alive 세션)
+def make_fetch(endpoint: str, get=requests.get):
+    def fetch(job):
+        code, bas_ym = job
+        params = {'serviceKey': 'bench', 'DEAL_YMD': bas_ym, 'LAWD_CD': code, 'pageNo': '1', 'numOfRows': '10000'}
+        r = get(endpoint, params=params)
+        root = ET.fromstring(r.content)
+        return len(root.find('body').find('items'))
+    return fetch
+
+
+def run(jobs: list, fetch, workers: int, rps: float = None):
+    start = time.time()
+    rows = 0
+    # 결과 소비는 한 곳에서 순서대로 (db insert 자리)
+    for job, n in fetch_concurrent(jobs, fetch, workers=workers, rps=rps):
+        rows += n
+    return rows, time.time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--jobs', type=int, default=260)
+    parser.add_argument('--latency', type=float, default=0.2, help='요청당 서버 지연(초)')
+    parser.add_argument('--rps', type=float, default=None)
+    args = parser.parse_args()
+
+    server, endpoint = start_server(latency=args.latency)
+    jobs = [(str(11000 + i * 10), '202409') for i in range(args.jobs)]
+    client = ApiClient(pool_size=32)
+
+    print('jobs: {}, latency: {}s, rps: {}'.format(args.jobs, args.latency, args.rps))
+    base = None
+    for name, get in [('requests.get', requests.get), ('ApiClient', client.get)]:
+        fetch = make_fetch(endpoint, get)
+        for workers in [1, 4, 8, 16, 32]:
+            rows, elapsed = run(jobs, fetch, workers, args.rps)
+            base = base or elapsed
+            print('{:<12} workers={:>2} {}행 {:.2f}s (x{:.1f})'.format(name, workers, rows, elapsed, base / elapsed))
+    print(client.summary())
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+'''
+지역·계약월 전체를 모아서 처리 vs 청크 파이프라인 최대 메모리 비교 (로컬 가짜 api 서버 + 메모리 sqlite)
+지역 크기(월별 행 수)를 늘려도 파이프라인 쪽 최대 메모리는 거의 일정해야 함
+가짜 서버는 별도 프로세스로 실행 (서버 메모리가 측정에 섞이지 않도록). 메모리는 tracemalloc 기준
+실행: python bench_memory.py --rows 2000 10000 40000 --months 3
+create: 2026.10.18
+'''
+
+import argparse
+import io
+import multiprocessing
+import time
+import tracemalloc
+import warnings
+
+import pandas as pd
+import requests
+from sqlalchemy import text
+
+from bulk_writer import sqlite_engine, write_df
+from fetcher import fetch_pages, iter_pages
+from molit_stub import start_server
+from pipeline import CHUNK_ROWS, PREFETCH_PAGES, coalesce, run_pipeline
+from transform import KeyCounts, proc_df
+from xml_parser import APT_TRADE_COLUMNS, parse_columns
+
+PAGE_SIZE = 1000
+
+
+### 별도 프로세스에서 가짜 서버 실행 (지역·계약월마다 n_rows행)
+def serve(n_rows, conn):
+    server, endpoint = start_server(rows=lambda code: n_rows)
+    conn.send(endpoint)
+    while True:
+        time.sleep(1)
+
+
+def start_stub(n_rows):
+    parent, child = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=serve, args=(n_rows, child), daemon=True)
+    process.start()
+    return process, parent.recv()
+
+
+def make_get_page(session, endpoint):
+    def get_page(params, meta):
+        r = session.get(endpoint, params=params)
+        columns = parse_columns(io.BytesIO(r.content), APT_TRADE_COLUMNS, meta)
+        offset = (int(params['pageNo']) - 1) * int(params['numOfRows'])
+        data = {'no': ['{}_{:04d}'.format(params['DEAL_YMD'], i) for i in range(offset + 1, offset + len(columns['aptNm']) + 1)]}
+        data.update(columns)
+        return data
+    return get_page
+
+
+def job_params(job):
+    return {'LAWD_CD': job[0], 'DEAL_YMD': job[1], 'pageNo': '1', 'numOfRows': str(PAGE_SIZE)}
+
+
+### 기존 방식: 지역·계약월 전체 페이지 합치기 -> DataFrame -> proc_df -> 적재
+def run_whole(jobs, get_page, engine):
+    total = 0
+    for job in jobs:
+        data, _ = fetch_pages(get_page, job_params(job))
+        estate_df = proc_df(pd.DataFrame(data))
+        write_df(estate_df, engine, table='bench_apart', mode='multi')
+        total += estate_df.shape[0]
+    return total
+
+
+### 파이프라인: 청크(CHUNK_ROWS행씩 묶은 페이지) 단위로 수집 -> 전처리 -> 적재 (ingest.Ingestor.run과 같은 설정)
+def run_chunked(jobs, get_page, engine):
+    total = 0
+    fetch_chunks = lambda job: coalesce(iter_pages(get_page, job_params(job), window=PREFETCH_PAGES), CHUNK_ROWS)
+    transform = lambda job, chunk, state: proc_df(pd.DataFrame(chunk), state.setdefault('key_counts', KeyCounts()))
+    write = lambda job, data: write_df(data, engine, table='bench_apart', mode='multi')
+    for job, rows in run_pipeline(jobs, fetch_chunks, transform, write):
+        total += rows
+    return total
+
+
+def measure(run, jobs, get_page, engine, sample):
+    with engine.begin() as conn:
+        conn.execute(text('drop table if exists bench_apart'))
+    sample.head(0).to_sql(name='bench_apart', con=engine, index=False)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    rows = run(jobs, get_page, engine)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return rows, seconds, peak / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, nargs='+', default=[2000, 10000, 40000], help='지역·계약월 하나의 행 수')
+    parser.add_argument('--months', type=int, default=3)
+    args = parser.parse_args()
+    warnings.simplefilter('ignore')
+
+    session = requests.Session()
+    engine = sqlite_engine()
+    months = ['2024{:02d}'.format(month) for month in range(1, args.months + 1)]
+    jobs = [('11110', ym) for ym in months]
+
+    print('{:>8} {:>10} {:>10} {:>10} {:>10}'.format('행/월', '방식', '행', '초', '최대MB'))
+    for n_rows in args.rows:
+        process, endpoint = start_stub(n_rows)
+        get_page = make_get_page(session, endpoint)
+        sample, _ = fetch_pages(get_page, dict(job_params(jobs[0]), numOfRows='100'))
+        sample = proc_df(pd.DataFrame(sample).head(100))
+
+        for name, run in (('whole', run_whole), ('pipeline', run_chunked)):
+            rows, seconds, peak = measure(run, jobs, get_page, engine, sample)
+            print('{:>8} {:>10} {:>10} {:>10.2f} {:>10.1f}'.format(n_rows, name, rows, seconds, peak))
+        process.terminate()
+
+
+if __name__ == '__main__':
+    main()
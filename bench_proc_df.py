@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+'''
+proc_df 벤치마크: 기존(행 단위 apply) vs transform.proc_df(컬럼 단위)
+실행: python bench_proc_df.py --rows 10000 100000 1000000
+create: 2026.10.18
+'''
+
+import argparse
+import time
+import warnings
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from molit_stub import make_items
+from transform import RENAME_COLUMNS, proc_df
+
+
+### 기존 load_data_monthly.proc_df (비교 기준)
+def proc_df_legacy(data_frame: pd.DataFrame):
+    data = data_frame.copy()
+    for col in data.columns:
+        blank_cnt = data[data[col] == ''].shape[0]
+        if blank_cnt > 0:
+            data[col] = data[col].replace({'': np.nan})
+
+    data['dealAmount'] = data['dealAmount'].str.replace(',', '').astype(int)
+    data['floor'] = data['floor'].astype(float)
+    data['excluUseAr'] = data['excluUseAr'].astype(float)
+    data['cdealType'] = data['cdealType'].replace({'O':'1', 'X':'0'})
+    data['bas_dt'] = data.apply(lambda x:'%s%s%s' % (x['dealYear'],x['dealMonth'].zfill(2),x['dealDay'].zfill(2)),axis=1)
+    data.loc[data['rgstDate'].notnull(), 'rgstDate'] = data.loc[data['rgstDate'].notnull(), 'rgstDate'].apply(lambda x: '20' + x[:2] + x[3:5] + x[6:8])
+    data.drop(columns=['dealYear', 'dealMonth', 'dealDay'], inplace=True)
+    data.rename(columns=RENAME_COLUMNS, inplace=True)
+    data['load_dh'] = datetime.now().strftime('%Y%m%d%H%M%S')
+    return data
+
+
+### 합성 데이터: stub 응답과 같은 형태의 행 1만 개를 반복해서 n_rows 만들기
+def make_frame(n_rows: int) -> pd.DataFrame:
+    base = pd.DataFrame(make_items('11680', '202409', 10000))
+    reps = -(-n_rows // len(base))
+    frame = pd.concat([base] * reps, ignore_index=True).iloc[:n_rows]
+    frame.insert(0, 'no', ['202409_{:07d}'.format(i) for i in range(1, n_rows + 1)])
+    return frame
+
+
+def timeit(func, frame: pd.DataFrame) -> float:
+    start = time.perf_counter()
+    func(frame)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 1000000])
+    args = parser.parse_args()
+    warnings.simplefilter('ignore')
+
+    for n_rows in args.rows:
+        frame = make_frame(n_rows)
+        legacy = timeit(proc_df_legacy, frame)
+        new = timeit(proc_df, frame)
+        mem_legacy = proc_df_legacy(frame).memory_usage(deep=True).sum() / 2 ** 20
+        mem_new = proc_df(frame).memory_usage(deep=True).sum() / 2 ** 20
+        print('{:>8}행 legacy {:.3f}s / new {:.3f}s (x{:.1f}) | 결과 메모리 {:.1f}MB -> {:.1f}MB'
+              .format(n_rows, legacy, new, legacy / new, mem_legacy, mem_new))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+'''
+오프라인 벤치마크 모음 (api 키, 네트워크, rds 없이 실행. 로컬 가짜 api 서버 molit_stub + sqlite 또는 임시 mysql)
+- stages: 응답 파싱(get_items), 전처리(proc_df), 적재(write_df 방식별) 단계별 행/s
+- monthly: load_data_monthly.main() 전체 흐름 (지연·오류 비율 지정). 단계별 소요 시간 요약은 main()이 출력
+- quota: 서비스키 여러 개 + 키당 요청 수 제한. 요청 횟수 초과 응답을 받으면 다른 키로 바꿔 이어가는지
+- parallel: 캐시된 응답 replay. 청크 파이프라인(한 프로세스) vs 파싱·전처리 워커 프로세스 수별 행/s
+- queries: 조회 모음(queries.py) 인덱스 조회 vs 캐시 hit 소요 시간
+--db-url로 mysql을 지정하면 apart, zip_code 테이블을 지우고 다시 만듦 (버려도 되는 db에서만 사용)
+실행: python bench_suite.py --regions 20 --rows 3000 --latency 0.05 --error-rate 0.02
+      python bench_suite.py stages --rows 10000 --db-url mysql+pymysql://user:pw@localhost/estate_bench
+create: 2026.10.18
+'''
+
+import argparse
+import io
+import os
+import pickle
+import tempfile
+import time
+import warnings
+
+import pandas as pd
+
+from api_client import ApiClient
+from bulk_writer import WRITE_MODES, write_df
+from change_detect import recent_months
+from checkpoint import Checkpoint
+from context import Context
+from datasets import APT_TRADE, table_ddl
+from db import Database
+from dimensions import Dimensions, create_tables as create_dimension_tables
+from ingest import Ingestor, backfill
+from molit_stub import make_items, make_xml, start_server
+from partitions import EXCHANGE
+from planner import QuotaTracker
+from queries import QUERY_INDEXES, Queries
+from response_cache import ResponseCache
+from rollup import ROLLUP_DDL
+
+SCENARIOS = ('stages', 'monthly', 'quota', 'parallel', 'queries')
+
+
+### 벤치마크용 db (sqlite 파일 또는 지정한 mysql)
+def bench_db(work_dir: str, db_url: str = None) -> Database:
+    return Database({'url': db_url or 'sqlite:///{}/bench.db'.format(work_dir)})
+
+
+### apart, zip_code, apart_rollup 테이블 새로 만들기
+# mysql은 실제 테이블 정의(datasets.table_ddl), sqlite는 전처리 결과 컬럼 + trade_key unique (upsert용)
+def create_tables(db: Database, sample: pd.DataFrame, regions: list):
+    db.execute('drop table if exists apart')
+    db.execute('drop table if exists zip_code')
+    db.execute('drop table if exists apart_rollup')
+    db.execute(ROLLUP_DDL)
+    if db.dialect.name == 'mysql':
+        db.execute(table_ddl(APT_TRADE))
+    else:
+        sample.head(0).to_sql(name='apart', con=db.engine, index=False)
+        db.execute('alter table apart add column bas_ym text as (substr(bas_dt,1,6))')
+        db.execute('create unique index idx_apart_trade_key on apart (trade_key)')
+        db.execute('create index idx_apart_zip_ym on apart (zip_code, bas_ym)')
+    db.execute('create table zip_code (code varchar(10) primary key, name varchar(50), api_data_yn char(1))')
+    for code, name in regions:
+        db.execute("insert into zip_code (code, name, api_data_yn) values (:code, :name, '1')", code=code, name=name)
+
+
+def make_regions(n: int) -> list:
+    return [(str(11110 + i * 30), '지역{:03d}'.format(i)) for i in range(n)]
+
+
+def sample_frame(ingestor, rows: int) -> pd.DataFrame:
+    body = make_xml(make_items('11110', '202401', rows), 1, rows, rows)
+    return ingestor.transform(ingestor.get_items(io.BytesIO(body), ingestor.params('11110', '202401', rows)))
+
+
+### 1. 단계별 처리 속도 (같은 응답으로 repeat번 반복, 가장 빠른 값)
+def bench_stages(db: Database, rows: int, repeat: int):
+    ingestor = Ingestor(APT_TRADE, db, client=None)
+    body = make_xml(make_items('11110', '202401', rows), 1, rows, rows)
+    params = ingestor.params('11110', '202401', rows)
+
+    def best(fn):
+        seconds = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            seconds.append(time.perf_counter() - start)
+        return min(seconds)
+
+    data = ingestor.get_items(io.BytesIO(body), params)
+    estate_df = ingestor.transform(data)
+    results = [
+        ('get_items', best(lambda: ingestor.get_items(io.BytesIO(body), params))),
+        ('proc_df', best(lambda: ingestor.transform(data))),
+    ]
+    modes = ['to_sql', 'multi', 'upsert'] + (['load_data'] if db.dialect.name == 'mysql' else [])
+    for mode in modes:
+        # 테이블 다시 만드는 시간은 빼고 적재만
+        seconds = []
+        for _ in range(repeat):
+            create_tables(db, estate_df, [])
+            seconds.append(write_df(estate_df, db, table='apart', mode=mode)['seconds'])
+        results.append(('write ' + mode, min(seconds)))
+    # apart_fact: 차원 테이블이 빈 상태(id 새로 추가) / id 사전이 채워진 상태
+    cold, warm = [], []
+    for _ in range(repeat):
+        create_dimension_tables(db, drop=True)
+        dimensions = Dimensions(db)
+        cold.append(dimensions.write(estate_df)['seconds'])
+        warm.append(dimensions.write(estate_df)['seconds'])
+    results += [('write fact', min(cold)), ('write fact warm', min(warm))]
+
+    print('[stages] {}행 x {}회 ({})'.format(rows, repeat, db.dialect.name))
+    print('{:>16} {:>10} {:>12}'.format('단계', '초', '행/s'))
+    for name, seconds in results:
+        print('{:>16} {:>10.3f} {:>12.0f}'.format(name, seconds, rows / seconds if seconds > 0 else 0))
+
+
+### 가짜 설정 파일 (load_data_monthly가 읽는 dbinfo, api_keys pickle)
+def write_info(info_dir: str, db_url: str, keys: list):
+    os.makedirs(info_dir, exist_ok=True)
+    with open(info_dir + '/dbinfo_estate.pickle', 'wb') as f:
+        pickle.dump({'url': db_url}, f)
+    with open(info_dir + '/api_keys.pickle', 'wb') as f:
+        pickle.dump({'apart': keys if len(keys) > 1 else keys[0]}, f)
+
+
+### 2. load_data_monthly.main() 전체 흐름
+# 설정 폴더·캐시 위치와 api 주소만 바꾼 Context로 교체 (설정·연결은 main()에서 처음 쓸 때 만들어짐)
+def bench_monthly(work_dir: str, db: Database, db_url: str, regions: list, rows: int, args):
+    import load_data_monthly
+
+    server, endpoint = start_server(rows=lambda code: rows, latency=args.latency, jitter=args.jitter,
+                                    error_rate=args.error_rate)
+    info_dir = work_dir + '/info'
+    write_info(info_dir, db_url, ['bench'])
+    ctx = load_data_monthly.ctx = Context(info_dir=info_dir, cache_dir=work_dir + '/cache', endpoint=endpoint)
+    create_tables(db, sample_frame(Ingestor(APT_TRADE, db, client=None), 100), regions)
+    ctx.client.backoff = args.backoff # 5xx 재시도 대기 (실제 설정 1초는 벤치마크에 너무 김)
+
+    print('[monthly] 지역 {}개 x {}행, 지연 {}s(+{}s), 오류 비율 {}, workers {}, {}'.format(
+        len(regions), rows, args.latency, args.jitter, args.error_rate, args.workers, db.dialect.name))
+    start = time.perf_counter()
+    load_data_monthly.main(workers=args.workers, write_mode=args.write_mode, metrics_out=args.metrics_out)
+    seconds = time.perf_counter() - start
+    loaded = db.fetchall('select count(*) from apart')[0][0]
+    print('main() {:.2f}s, 적재 {}행 ({:.0f}행/s), 서버 요청 {requests}회 (5xx {errors}회)'.format(
+        seconds, loaded, loaded / seconds, **server.stats))
+    server.shutdown()
+
+
+### 3. 할당량 소진: 키당 quota회 넘으면 요청 횟수 초과 응답 -> 다음 키, 모두 소진되면 다음 실행으로
+def bench_quota(work_dir: str, db: Database, regions: list, rows: int, args):
+    server, endpoint = start_server(rows=lambda code: rows, latency=args.latency, quota=args.quota)
+    keys = ['bench{}'.format(i) for i in range(args.keys)]
+    checkpoint_path = work_dir + '/quota_checkpoint.db'
+    # 추적하는 할당량을 서버 제한보다 크게 -> 서버의 요청 횟수 초과 응답으로 키 전환
+    quota = QuotaTracker(checkpoint_path, keys, daily_limit=args.quota * 2)
+    ingestor = Ingestor(APT_TRADE, db, ApiClient(backoff=args.backoff), quota=quota, endpoint=endpoint)
+    create_tables(db, sample_frame(ingestor, 100), regions)
+
+    print('[quota] 지역 {}개 x 2개월, 키 {}개 x {}회'.format(len(regions), len(keys), args.quota))
+    start = time.perf_counter()
+    backfill(ingestor, Checkpoint(checkpoint_path), regions, '202401', '202402', write_mode=args.write_mode)
+    print('{:.2f}s, 적재 {}행, 서버 요청 {requests}회 (요청 횟수 초과 응답 {quota_exceeded}회)'.format(
+        time.perf_counter() - start, db.fetchall('select count(*) from apart')[0][0], **server.stats))
+    print(quota.summary())
+    server.shutdown()
+
+
+### 4. 멀티 프로세스 파싱·전처리: 가짜 서버에서 한 번 받아 캐시에 저장한 뒤 replay (api 대기 없이 cpu 작업만)
+def bench_parallel(work_dir: str, db: Database, regions: list, rows: int, args):
+    server, endpoint = start_server(rows=lambda code: rows)
+    cache = ResponseCache(work_dir + '/parallel_cache')
+    ingestor = Ingestor(APT_TRADE, db, ApiClient(), cache=cache, service_key='bench', endpoint=endpoint)
+    jobs = [(code, name, ym) for ym in ('202401', '202402') for code, name in regions]
+    create_tables(db, sample_frame(ingestor, 100), regions)
+    for _ in ingestor.run(jobs, write_mode='multi'):
+        pass
+    server.shutdown()
+
+    cpus = os.cpu_count() or 1
+    counts = [None] + sorted({1, 2, 4, cpus} & set(range(1, cpus + 1)) | {cpus})
+    print('[parallel] 작업 {}개 x {}행 replay, cpu {}개 ({})'.format(len(jobs), rows, cpus, db.dialect.name))
+    base = None
+    for processes in counts:
+        create_tables(db, sample_frame(ingestor, 100), regions)
+        start = time.perf_counter()
+        total = sum(n or 0 for _, n in ingestor.run(jobs, write_mode=args.write_mode, replay=True, processes=processes))
+        seconds = time.perf_counter() - start
+        base = base or seconds
+        print('{:>12} {:>8}행 {:>8.2f}s {:>10.0f}행/s (x{:.1f})'.format(
+            '파이프라인' if processes is None else '프로세스 {}'.format(processes), total, seconds, total / seconds, base / seconds))
+
+
+### 5. 조회 모음: 최근 3개월 적재 후 조회별 첫 조회(인덱스) / 반복 조회(캐시 hit) 소요 시간
+def bench_queries(work_dir: str, db: Database, regions: list, rows: int, args):
+    server, endpoint = start_server(rows=lambda code: rows)
+    ingestor = Ingestor(APT_TRADE, db, ApiClient(), service_key='bench', endpoint=endpoint)
+    jobs = [(code, name, ym) for ym in recent_months(3) for code, name in regions]
+    create_tables(db, sample_frame(ingestor, 100), regions)
+    for name, cols in QUERY_INDEXES:
+        db.execute('create index {} on apart ({})'.format(name, cols))
+    for _ in ingestor.run(jobs, write_mode='multi'):
+        pass
+    server.shutdown()
+
+    queries = Queries(db, check_seconds=0) # 조회마다 max(load_dh) 확인 (가장 느린 설정)
+    samples = db.fetchall('select distinct zip_code, dong, reg_no from apart order by reg_no limit :n', n=args.repeat * 10)
+    calls = [
+        ('price_history', lambda z, d, r: queries.price_history(r)),
+        ('recent_trades', lambda z, d, r: queries.recent_trades(z, d)),
+        ('comparables', lambda z, d, r: queries.comparables(z, 40 + int(r.split('-')[1]) % 100, floor=10, build_year=2005)),
+    ]
+    print('[queries] {}행, 표본 {}개 ({})'.format(db.fetchall('select count(*) from apart')[0][0], len(samples), db.dialect.name))
+    print('{:>16} {:>12} {:>12}'.format('조회', '첫 조회(ms)', '캐시(ms)'))
+    for name, call in calls:
+        cold, warm = [], []
+        for sample in samples:
+            for seconds in (cold, warm):
+                start = time.perf_counter()
+                call(*sample)
+                seconds.append(time.perf_counter() - start)
+        print('{:>16} {:>12.2f} {:>12.2f}'.format(name, sum(cold) / len(cold) * 1000, sum(warm) / len(warm) * 1000))
+    print(queries.summary())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('scenarios', nargs='*', help='{} 중 실행할 것 (없으면 전부)'.format(', '.join(SCENARIOS)))
+    parser.add_argument('--db-url', default=None, help='임시 mysql (없으면 sqlite 파일)')
+    parser.add_argument('--regions', type=int, default=20)
+    parser.add_argument('--rows', type=int, default=3000, help='지역·계약월 하나의 행 수')
+    parser.add_argument('--repeat', type=int, default=3, help='stages 반복 횟수')
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--jitter', type=float, default=0.05)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--backoff', type=float, default=0.05, help='5xx 재시도 대기 기준(초)')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--write-mode', default='upsert', choices=WRITE_MODES + (EXCHANGE,))
+    parser.add_argument('--quota', type=int, default=20, help='quota 시나리오: 서비스키당 요청 수 제한')
+    parser.add_argument('--keys', type=int, default=2, help='quota 시나리오: 서비스키 수')
+    parser.add_argument('--metrics-out', default=None, help='monthly 단계별 소요 시간 저장 (.json 또는 .prom)')
+    args = parser.parse_args()
+    warnings.simplefilter('ignore')
+
+    scenarios = args.scenarios or SCENARIOS
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error('알 수 없는 시나리오: {}'.format(', '.join(sorted(unknown))))
+    work_dir = tempfile.mkdtemp(prefix='estate_bench_')
+    db_url = args.db_url or 'sqlite:///{}/bench.db'.format(work_dir)
+    db = bench_db(work_dir, db_url)
+    regions = make_regions(args.regions)
+
+    if 'stages' in scenarios:
+        bench_stages(db, args.rows, args.repeat)
+    if 'monthly' in scenarios:
+        bench_monthly(work_dir, db, db_url, regions, args.rows, args)
+    if 'quota' in scenarios:
+        bench_quota(work_dir, db, regions, args.rows, args)
+    if 'parallel' in scenarios:
+        bench_parallel(work_dir, db, regions, args.rows, args)
+    if 'queries' in scenarios:
+        bench_queries(work_dir, db, regions, args.rows, args)
+    print('작업 폴더: {}'.format(work_dir))
+
+
+if __name__ == '__main__':
+    main()
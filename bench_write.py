@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+'''
+적재 방식별 속도 비교 (기본: 메모리 sqlite, --url로 테스트용 mysql 지정 가능)
+적재 후 컬럼별 null 수가 적재 전과 같은지 확인 (load_data의 null 표기 등)
+실행: python bench_write.py --rows 100000 [--url mysql+pymysql://user:pw@host/test_db]
+create: 2026.10.18
+'''
+
+import argparse
+import warnings
+
+from sqlalchemy import create_engine, text
+
+from bench_proc_df import make_frame
+from bulk_writer import WRITE_MODES, sqlite_engine, write_df
+from transform import proc_df
+
+
+### 컬럼별 null 수가 DataFrame과 다른 컬럼 목록 (적재 후 null이 문자열 등으로 바뀌지 않았는지)
+def null_mismatch(engine, data) -> list:
+    quote = engine.dialect.identifier_preparer.quote
+    sql = 'select {} from bench_apart'.format(', '.join('sum({} is null)'.format(quote(col)) for col in data.columns))
+    with engine.connect() as conn:
+        stored = conn.execute(text(sql)).fetchone()
+    expected = data.isna().sum()
+    return [col for col, count in zip(data.columns, stored) if int(count or 0) != expected[col]]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--url', default=None, help='비우면 메모리 sqlite')
+    args = parser.parse_args()
+    warnings.simplefilter('ignore')
+
+    data = proc_df(make_frame(args.rows))
+    data.loc[data.index[::97], ['floor', 'size']] = None # 숫자 컬럼 null도 확인
+    if args.url:
+        engine = create_engine(args.url, connect_args={'local_infile': True})
+    else:
+        engine = sqlite_engine()
+
+    for mode in WRITE_MODES:
+        if mode == 'load_data' and engine.dialect.name != 'mysql':
+            continue
+        # 매번 빈 테이블에 적재
+        with engine.begin() as conn:
+            conn.execute(text('drop table if exists bench_apart'))
+        data.head(0).to_sql(name='bench_apart', con=engine, index=False)
+        # upsert 기준 trade_key unique (bench_suite.create_tables와 같게. mysql은 to_sql이 text 컬럼으로 만들어서 길이 지정)
+        key_col = 'trade_key(40)' if engine.dialect.name == 'mysql' else 'trade_key'
+        with engine.begin() as conn:
+            conn.execute(text('create unique index idx_bench_apart_trade_key on bench_apart ({})'.format(key_col)))
+
+        stats = write_df(data, engine, table='bench_apart', mode=mode)
+        print('{:<10} {}행 {:.2f}s {:.0f}행/s'.format(mode, stats['rows'], stats['seconds'], stats['rows_per_sec']))
+        mismatch = null_mismatch(engine, data)
+        if mismatch:
+            raise SystemExit('{}: null 수가 다른 컬럼 {}'.format(mode, ', '.join(mismatch)))
+
+    with engine.begin() as conn:
+        conn.execute(text('drop table if exists bench_apart'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+'''
+DataFrame -> db 대량 적재
+- to_sql: 기존 방식 (pandas 기본 설정)
+- multi: 청크 단위 executemany (pymysql은 여러 행을 insert 한 문장으로 묶어서 전송)
+- load_data: 임시 csv 파일로 LOAD DATA LOCAL INFILE (mysql 전용. 엔진에 local_infile=True 필요)
+- upsert: multi와 같은 방식 + 키 중복 시 update (mysql on duplicate key update, sqlite on conflict)
+  값이 바뀐 행만 실제로 갱신 (load_dh도 바뀐 행만 새 값)
+engine 자리에는 sqlalchemy 엔진 또는 db.Database 모두 가능
+테스트용으로 메모리 sqlite 엔진도 제공
+create: 2026.10.18
+'''
+
+import csv
+import os
+import tempfile
+import time
+
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+WRITE_MODES = ('to_sql', 'multi', 'load_data', 'upsert')
+
+UPSERT_KEY = 'trade_key' # upsert 기준 키
+UPSERT_KEEP = ('no',) # 최초 적재 값 유지 (update 하지 않음)
+UPSERT_TOUCH = 'load_dh' # 다른 값이 바뀐 경우에만 갱신
+NULL_MARKER = 'NULL' # load_data csv의 null
+
+
+### 테스트용 메모리 sqlite (연결을 하나로 고정해야 테이블이 유지됨)
+def sqlite_engine():
+    return create_engine('sqlite://', poolclass=StaticPool, connect_args={'check_same_thread': False})
+
+
+### 행 목록으로 변환. null(NaN, NA)은 None, category·nullable int는 파이썬 값으로
+def to_rows(data: pd.DataFrame) -> list:
+    values = data.astype(object).where(data.notna(), None)
+    return list(values.itertuples(index=False, name=None))
+
+
+def write_to_sql(data: pd.DataFrame, engine, table: str, chunksize: int):
+    data.to_sql(name=table, con=engine.engine, if_exists='append', index=False) # Database면 내부 엔진 사용
+
+
+def insert_sql(data: pd.DataFrame, engine, table: str) -> str:
+    quote = engine.dialect.identifier_preparer.quote
+    mark = '?' if engine.dialect.paramstyle == 'qmark' else '%s'
+    return 'insert into {} ({}) values ({})'.format(
+        quote(table), ', '.join(quote(col) for col in data.columns), ', '.join([mark] * data.shape[1]))
+
+
+### insert ... 뒤에 붙일 중복 키 처리 구문
+def upsert_clause(data: pd.DataFrame, engine) -> str:
+    quote = engine.dialect.identifier_preparer.quote
+    cols = [col for col in data.columns if col not in (UPSERT_KEY, UPSERT_TOUCH) + UPSERT_KEEP]
+    touch = UPSERT_TOUCH in data.columns
+
+    if engine.dialect.name == 'mysql':
+        # mysql은 왼쪽 할당부터 적용 -> load_dh 비교를 먼저 (<=>: null 안전 비교)
+        same = ' and '.join('{0} <=> values({0})'.format(quote(col)) for col in cols)
+        sets = ['{0} = values({0})'.format(quote(col)) for col in cols]
+        if touch:
+            sets.insert(0, '{0} = if({1}, {0}, values({0}))'.format(quote(UPSERT_TOUCH), same))
+        return ' on duplicate key update ' + ', '.join(sets)
+
+    # sqlite: 바뀐 값이 없으면 where 조건으로 update 생략
+    changed = ' or '.join('{0} is not excluded.{0}'.format(quote(col)) for col in cols)
+    sets = ['{0} = excluded.{0}'.format(quote(col)) for col in cols + ([UPSERT_TOUCH] if touch else [])]
+    return ' on conflict ({}) do update set {} where {}'.format(quote(UPSERT_KEY), ', '.join(sets), changed)
+
+
+def executemany(engine, sql: str, data: pd.DataFrame, chunksize: int):
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        for i in range(0, data.shape[0], chunksize):
+            cursor.executemany(sql, to_rows(data.iloc[i:i + chunksize]))
+        raw.commit()
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        raw.close()
+
+
+def write_multi(data: pd.DataFrame, engine, table: str, chunksize: int):
+    executemany(engine, insert_sql(data, engine, table), data, chunksize)
+
+
+def write_upsert(data: pd.DataFrame, engine, table: str, chunksize: int):
+    if UPSERT_KEY not in data.columns:
+        raise ValueError('upsert 모드는 {} 컬럼 필요'.format(UPSERT_KEY))
+    executemany(engine, insert_sql(data, engine, table) + upsert_clause(data, engine), data, chunksize)
+
+
+def write_load_data(data: pd.DataFrame, engine, table: str, chunksize: int):
+    if engine.dialect.name != 'mysql':
+        raise ValueError('load_data 모드는 mysql만 가능: {}'.format(engine.dialect.name))
+
+    # 이스케이프 문자 없이 (escaped by ''): null은 따옴표 없는 NULL, 값 안의 따옴표는 ""
+    # (\N은 escapechar가 \\N으로 바꿔서 문자열로 적재됨). 문자열 'NULL'은 null과 구분할 수 없으므로 거부
+    texts = data.select_dtypes(include=['object', 'string', 'category'])
+    found = (texts == NULL_MARKER).any()
+    if found.any():
+        raise ValueError('load_data 모드는 {} 문자열 불가: {}'.format(NULL_MARKER, ', '.join(found.index[found])))
+
+    # pymysql은 파일 경로만 지원 -> 임시 csv 파일 사용
+    fd, path = tempfile.mkstemp(suffix='.csv')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+            data.to_csv(f, index=False, header=False, na_rep=NULL_MARKER, lineterminator='\n',
+                        quoting=csv.QUOTE_MINIMAL, doublequote=True)
+
+        quote = engine.dialect.identifier_preparer.quote
+        sql = '''
+            load data local infile %s into table {}
+            character set utf8mb4
+            fields terminated by ',' optionally enclosed by '"' escaped by ''
+            lines terminated by '\\n'
+            ({})
+        '''.format(quote(table), ', '.join(quote(col) for col in data.columns))
+
+        raw = engine.raw_connection()
+        try:
+            raw.cursor().execute(sql, (path,))
+            raw.commit()
+        finally:
+            raw.close()
+    finally:
+        os.remove(path)
+
+
+WRITERS = {
+    'to_sql': write_to_sql,
+    'multi': write_multi,
+    'load_data': write_load_data,
+    'upsert': write_upsert,
+}
+
+
+### 적재 후 {'mode', 'rows', 'seconds', 'rows_per_sec'} 반환
+def write_df(data: pd.DataFrame, engine, table: str = 'apart', mode: str = 'multi', chunksize: int = 5000) -> dict:
+    if mode not in WRITERS:
+        raise ValueError('지원하지 않는 적재 방식: {} ({})'.format(mode, ', '.join(WRITE_MODES)))
+
+    start = time.perf_counter()
+    WRITERS[mode](data, engine, table, chunksize)
+    seconds = time.perf_counter() - start
+
+    return {
+        'mode': mode,
+        'rows': data.shape[0],
+        'seconds': seconds,
+        'rows_per_sec': data.shape[0] / seconds if seconds > 0 else 0.0,
+    }
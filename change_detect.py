@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+'''
+변경분만 적재 (최근 n개월 rolling refresh)
+국토부는 지난 달 데이터도 나중에 수정함 (해제여부/해제사유발생일, 등기일자 등)
+-> api 결과의 row_hash를 db에 저장된 값과 비교해서 신규/변경/해제 행만 반환
+create: 2026.10.18
+'''
+
+from datetime import date
+
+import pandas as pd
+
+
+### 최근 n개월 (지난달부터 거꾸로). ['202409', '202408', ...]
+def recent_months(n: int, today: date = None) -> list:
+    today = today or date.today()
+    year, month = today.year, today.month
+    months = []
+    for _ in range(n):
+        month -= 1
+        if month == 0:
+            year, month = year - 1, 12
+        months.append('{}{:02d}'.format(year, month))
+    return months
+
+
+# 지역·계약월 조회. bas_ym은 생성 컬럼 (zip_code, bas_ym) 인덱스 사용 (schema.py 003_bas_ym)
+# table: apart 또는 apart_fact (차원 테이블로 적재할 때. 같은 컬럼, 같은 인덱스)
+STORED_SQL = '''
+    select trade_key, row_hash, cancel_deal_yn from {table}
+    where zip_code = :zip_code and bas_ym = :bas_ym
+'''
+
+
+### db에 저장된 지역·계약월의 키와 해시
+def load_stored(db, zip_code: str, bas_ym: str, table: str = 'apart') -> pd.DataFrame:
+    return pd.DataFrame(db.fetchall(STORED_SQL.format(table=table), zip_code=zip_code, bas_ym=bas_ym),
+                        columns=['trade_key', 'row_hash', 'cancel_deal_yn'])
+
+
+### 신규/변경/해제 구분
+# 반환: {'rows': 적재할 행(신규+변경+해제), 'inserts': n, 'updates': n, 'cancels': n, 'missing': n}
+# missing: db에는 있는데 api 결과에 없는 행 (삭제하지 않고 건수만 보고)
+def diff_rows(data: pd.DataFrame, stored: pd.DataFrame) -> dict:
+    old = stored.set_index('trade_key')
+    old_hash = data['trade_key'].map(old['row_hash'])
+    old_cancel = data['trade_key'].map(old['cancel_deal_yn'])
+
+    is_new = ~data['trade_key'].isin(old.index)
+    is_changed = ~is_new & (old_hash.isna() | (old_hash != data['row_hash']))
+    now_cancel = (data['cancel_deal_yn'].astype('string') == '1').fillna(False).astype(bool)
+    was_cancel = (old_cancel.astype('string') == '1').fillna(False).astype(bool)
+    is_cancel = is_changed & now_cancel & ~was_cancel
+
+    return {
+        'rows': data[is_new | is_changed],
+        'inserts': int(is_new.sum()),
+        'updates': int((is_changed & ~is_cancel).sum()),
+        'cancels': int(is_cancel.sum()),
+        'missing': int((~old.index.isin(data['trade_key'])).sum()),
+    }
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+'''
+작업 진행 상태 기록 (로컬 sqlite)
+(LAWD_CD, DEAL_YMD) 작업마다 pending -> fetched -> loaded / failed 기록
+중간에 끊기거나 api 요청 횟수 초과로 멈춰도, 다음 실행 때 loaded 아닌 작업부터 이어서 수행
+(apart 테이블에 distinct 조회할 필요 없음)
+create: 2026.10.18
+'''
+
+import sqlite3
+import threading
+from datetime import datetime
+
+PENDING = 'pending'
+FETCHED = 'fetched'
+LOADED = 'loaded'
+FAILED = 'failed'
+
+
+class Checkpoint:
+    # dataset: 작업 구분 (같은 파일에 여러 스크립트·모드 기록)
+    def __init__(self, path: str, dataset: str = 'apart'):
+        self.dataset = dataset
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None) # autocommit
+        self.conn.execute('pragma journal_mode=wal')
+        self.conn.execute('''
+            create table if not exists jobs (
+                dataset text not null,
+                lawd_cd text not null,
+                deal_ymd text not null,
+                status text not null,
+                rows integer,
+                error text,
+                updated_dh text not null,
+                primary key (dataset, lawd_cd, deal_ymd)
+            )
+        ''')
+
+    def _now(self) -> str:
+        return datetime.now().strftime('%Y%m%d%H%M%S')
+
+    ### 작업 등록 (이미 있으면 상태 유지)
+    def add(self, jobs: list):
+        now = self._now()
+        with self.lock:
+            self.conn.executemany('''
+                insert or ignore into jobs (dataset, lawd_cd, deal_ymd, status, updated_dh)
+                values (?, ?, ?, ?, ?)
+            ''', [(self.dataset, lawd_cd, deal_ymd, PENDING, now) for lawd_cd, deal_ymd in jobs])
+
+    def mark(self, lawd_cd: str, deal_ymd: str, status: str, rows: int = None, error: str = None):
+        with self.lock:
+            self.conn.execute('''
+                insert into jobs (dataset, lawd_cd, deal_ymd, status, rows, error, updated_dh)
+                values (?, ?, ?, ?, ?, ?, ?)
+                on conflict (dataset, lawd_cd, deal_ymd) do update set
+                    status = excluded.status,
+                    rows = coalesce(excluded.rows, rows),
+                    error = excluded.error,
+                    updated_dh = excluded.updated_dh
+            ''', (self.dataset, lawd_cd, deal_ymd, status, rows, error, self._now()))
+
+    ### 적재 완료된 (lawd_cd, deal_ymd)
+    def loaded(self) -> set:
+        with self.lock:
+            rows = self.conn.execute('select lawd_cd, deal_ymd from jobs where dataset = ? and status = ?',
+                                     (self.dataset, LOADED)).fetchall()
+        return set(rows)
+
+    ### 지역별 과거 평균 행 수 (작업 우선순위, 페이지 크기 결정용). dataset 없으면 이 작업 구분 기준
+    def volumes(self, dataset: str = None) -> dict:
+        with self.lock:
+            rows = self.conn.execute('select lawd_cd, avg(rows) from jobs where dataset = ? and rows is not null group by lawd_cd',
+                                     (dataset or self.dataset,)).fetchall()
+        return dict(rows)
+
+    def summary(self) -> str:
+        with self.lock:
+            rows = self.conn.execute('select status, count(*) from jobs where dataset = ? group by status order by status',
+                                     (self.dataset,)).fetchall()
+        return '작업 상태 ({}): '.format(self.dataset) + ', '.join('{} {}'.format(status, cnt) for status, cnt in rows)
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+'''
+실행 설정·연결 모음 (처음 사용할 때 만듦)
+import나 Context() 생성만으로는 설정 파일(pickle)을 읽거나 db에 연결하지 않음
+-> 파싱·전처리 함수(ingest.Ingestor.get_items, transform.proc_df)를 워커 프로세스, 노트북에서 부담 없이 import
+- info 폴더: dbinfo_estate.pickle, api_keys.pickle, checkpoint.db, region_catalog.db
+- 조회 모음(queries.py)도 같은 db 연결 사용
+- 환경 변수로 위치 변경: ESTATE_INFO_DIR, ESTATE_CACHE_DIR, ESTATE_API_ENDPOINT (bench_suite 등)
+create: 2026.10.18
+'''
+
+import os
+import pickle
+import threading
+import time
+
+from api_client import ApiClient
+from checkpoint import Checkpoint
+from db import Database
+from dimensions import Dimensions
+from ingest import Ingestor
+from metrics import Metrics
+from queries import Queries
+from region_catalog import RegionCatalog
+from response_cache import ResponseCache
+
+BASE_DIR = os.path.dirname(os.path.realpath(__file__))
+
+
+class Context:
+    # info_dir: 설정 파일 폴더 (없으면 ESTATE_INFO_DIR, 그것도 없으면 이 파일 옆 info 폴더)
+    # endpoint: api 주소 변경 (없으면 데이터셋 기본 주소)
+    def __init__(self, info_dir: str = None, cache_dir: str = None, endpoint: str = None):
+        self.info_dir = info_dir or os.environ.get('ESTATE_INFO_DIR', BASE_DIR + '/info')
+        self.cache_dir = cache_dir or os.environ.get('ESTATE_CACHE_DIR', BASE_DIR + '/cache')
+        self.endpoint = endpoint or os.environ.get('ESTATE_API_ENDPOINT')
+        self.started = time.time() # 스크립트 소요 시간 기준
+        self.objects = {}
+        self.lock = threading.RLock() # 워커 스레드에서 처음 사용해도 하나만 만들어지도록
+
+    def _get(self, name: str, factory):
+        with self.lock:
+            if name not in self.objects:
+                self.objects[name] = factory()
+            return self.objects[name]
+
+    def _load(self, file_name: str):
+        with open(os.path.join(self.info_dir, file_name), 'rb') as f:
+            return pickle.load(f)
+
+    @property
+    def checkpoint_path(self) -> str:
+        return os.path.join(self.info_dir, 'checkpoint.db')
+
+    ### db connection info ('url'이 있으면 그대로 사용. sqlite 등)
+    @property
+    def dbinfo(self) -> dict:
+        return self._get('dbinfo', lambda: self._load('dbinfo_estate.pickle'))
+
+    ### 정부 api key
+    @property
+    def api_keys(self) -> dict:
+        return self._get('api_keys', lambda: self._load('api_keys.pickle'))
+
+    ### 서비스키 목록 (여러 개면 list로 저장. 데이터셋별 키가 없으면 아파트 키 사용)
+    def service_keys(self, dataset: str = 'apart') -> list:
+        keys = self.api_keys.get(dataset, self.api_keys['apart'])
+        return keys if isinstance(keys, list) else [keys]
+
+    ### MySQL (엔진·커넥션 풀 하나를 읽기/쓰기에 공용. 실제 연결은 첫 쿼리 때)
+    @property
+    def db(self):
+        return self._get('db', lambda: Database(self.dbinfo))
+
+    ### 단계별(http, parse, transform, write) 소요 시간
+    @property
+    def metrics(self):
+        return self._get('metrics', Metrics)
+
+    ### keep-alive 세션, timeout, 재시도
+    @property
+    def client(self):
+        return self._get('client', lambda: ApiClient(metrics=self.metrics))
+
+    ### api 원본 응답 캐시 (전처리 바뀌면 --replay로 api 호출 없이 다시 적재)
+    @property
+    def cache(self):
+        return self._get('cache', lambda: ResponseCache(self.cache_dir, ttl_days=None, max_mb=2048))
+
+    ### apart 조회 (결과 캐시는 이 Context 안에서 공용)
+    @property
+    def queries(self):
+        return self._get('queries', lambda: Queries(self.db))
+
+    ### 단지·도로명·중개사 소재지 id 사전 (차원 테이블은 처음 id가 필요할 때 읽음)
+    @property
+    def dimensions(self):
+        return self._get('dimensions', lambda: Dimensions(self.db))
+
+    ### 수집 대상 지역 목록 + 지역·계약월별 행 수 (db zip_code는 일주일에 한 번만 조회)
+    @property
+    def catalog(self):
+        def factory():
+            catalog = RegionCatalog(os.path.join(self.info_dir, 'region_catalog.db'))
+            catalog.sync(self.db)
+            return catalog
+        return self._get('catalog', factory)
+
+    def checkpoint(self, dataset: str = 'apart'):
+        return Checkpoint(self.checkpoint_path, dataset=dataset)
+
+    ### 데이터셋 수집·적재 엔진. 캐시 안 쓰려면 cache=None. apart 대신 apart_fact에 적재하려면 dimensions=ctx.dimensions
+    def ingestor(self, spec, **kwargs):
+        for name in ('cache', 'metrics'):
+            if name not in kwargs:
+                kwargs[name] = getattr(self, name)
+        kwargs.setdefault('endpoint', self.endpoint)
+        return Ingestor(spec, self.db, self.client, **kwargs)
+
+    ### 소요 시간 기준 시각 (모듈에서 Context를 만들어 두면 import 시각이 되므로 main 시작 때 다시 설정)
+    def start(self):
+        self.started = time.time()
+
+    def elapsed(self) -> float:
+        return time.time() - self.started
+
+    ### 만든 것만 정리 (만들지 않은 연결은 그대로)
+    def close(self):
+        with self.lock:
+            objects, self.objects = self.objects, {}
+        for name in ('client', 'db', 'cache', 'catalog'):
+            if name in objects:
+                objects[name].close()
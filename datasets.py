@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+'''
+국토부 실거래가 api 데이터셋 정의
+데이터셋마다 endpoint, xml 태그 -> 컬럼명, 타입, 자연키, 적재 테이블만 적어두면
+수집·전처리·적재는 ingest.Ingestor가 똑같이 처리 (새 데이터셋은 여기에 정의 하나 추가)
+create: 2026.10.18
+'''
+
+from xml_parser import APT_TRADE_COLUMNS, APT_TRADE_COLUMNS_OLD, parse_columns
+
+API_BASE = 'http://apis.data.go.kr/1613000'
+
+# 날짜 컬럼 (년월일 합쳐서 bas_dt)
+DEAL_DATE_PARTS = ('dealYear', 'dealMonth', 'dealDay')
+
+# 해제여부 O/X -> 1/0
+CANCEL_FLAG = {'O': '1', 'X': '0'}
+
+
+class DatasetSpec:
+    # name: 데이터셋 이름 (캐시·checkpoint·parquet 구분)
+    # columns: 응답 item의 xml 태그 (파싱 순서)
+    # rename: 태그 -> db 컬럼명 (없으면 태그 그대로)
+    # key_columns: 자연키 컬럼 (db 컬럼명 기준. 같은 값의 거래가 여러 건이면 순번으로 구분)
+    # dtypes: 숫자 변환할 태그 -> pandas 타입. comma_columns는 변환 전에 ',' 제거
+    # flag_columns: 태그 -> 값 치환 dict. short_date_columns: yy.mm.dd -> yyyymmdd
+    # date_parts: (년, 월, 일) 태그 -> bas_dt. drop_columns: 적재하지 않는 태그
+    # zip_code_from_request: 응답에 지역코드 컬럼이 없으면 요청한 LAWD_CD로 zip_code 채움
+    def __init__(self, name: str, endpoint: str, columns: tuple, rename: dict, key_columns: list, table: str,
+                 dtypes: dict = None, comma_columns: tuple = (), flag_columns: dict = None,
+                 short_date_columns: tuple = (), date_parts: tuple = DEAL_DATE_PARTS, category_columns: list = (),
+                 drop_columns: tuple = (), zip_code_from_request: bool = False):
+        self.name = name
+        self.endpoint = endpoint
+        self.columns = tuple(columns)
+        self.rename = dict(rename)
+        self.key_columns = list(key_columns)
+        self.table = table
+        self.dtypes = dict(dtypes or {})
+        self.comma_columns = tuple(comma_columns)
+        self.flag_columns = dict(flag_columns or {})
+        self.short_date_columns = tuple(short_date_columns)
+        self.date_parts = tuple(date_parts)
+        self.category_columns = list(category_columns)
+        self.drop_columns = tuple(drop_columns)
+        self.zip_code_from_request = zip_code_from_request
+
+    def output_name(self, tag: str) -> str:
+        return self.rename.get(tag, tag)
+
+    ### 자연키 계산 시 정수·실수로 정규화할 컬럼 (db 컬럼명 기준)
+    def key_int_columns(self) -> tuple:
+        return tuple(self.output_name(tag) for tag, dtype in self.dtypes.items() if 'int' in dtype.lower())
+
+    def key_float_columns(self) -> tuple:
+        return tuple(self.output_name(tag) for tag, dtype in self.dtypes.items() if 'float' in dtype)
+
+    ### 적재 테이블 컬럼 (no, zip_code 먼저, 처리 후 추가되는 컬럼은 뒤)
+    def output_columns(self) -> list:
+        skip = set(self.date_parts) | set(self.drop_columns)
+        cols = ['no'] + (['zip_code'] if self.zip_code_from_request else [])
+        cols += [self.output_name(tag) for tag in self.columns if tag not in skip]
+        return cols + ['bas_dt', 'load_dh', 'trade_key', 'row_hash']
+
+    def __repr__(self):
+        return 'DatasetSpec({})'.format(self.name)
+
+
+### 아파트 매매 (240816 변경된 api)
+APT_TRADE = DatasetSpec(
+    name='apart',
+    endpoint=API_BASE + '/RTMSDataSvcAptTradeDev/getRTMSDataSvcAptTradeDev',
+    columns=APT_TRADE_COLUMNS,
+    rename={
+        'aptDong': 'apartment_dong', # 신규(아파트 동명)
+        'aptNm': 'apartment_name',
+        'aptSeq': 'reg_no', # 단지 일련번호(new): 일련번호(old)
+        'buildYear': 'build_year',
+        'buyerGbn': 'buyer',
+        'cdealDay': 'cancel_deal_type', # 해제사유발생일. sql 컬럼명 cancel_deal_type -> cancel_deal_day 변경 필요!!!
+        'cdealType': 'cancel_deal_yn', # 해제여부
+        'dealAmount': 'deal_amount',
+        'dealingGbn': 'dealing_gbn', # 거래유형. 컬럼명 변경하기 (req_gbn -> dealing_gbn)
+        'estateAgentSggNm': 'dealer_sigungu',
+        'excluUseAr': 'size', # 전용면적
+        'landCd': 'land_code',
+        'landLeaseholdGbn': 'land_lease_hold_yn', # 신규(토지임대부 아파트 여부)
+        'rgstDate': 'reg_dt', # 신규(등기일자)
+        'roadNm': 'road_name',
+        'roadNmBonbun': 'road_name_bonbun',
+        'roadNmBubun': 'road_name_bubun',
+        'roadNmCd': 'road_name_code',
+        'roadNmSeq': 'road_name_seq',
+        'roadNmSggCd': 'road_name_sigungu_code',
+        'roadNmbCd': 'road_name_basement_code',
+        'sggCd': 'zip_code',
+        'slerGbn': 'seller',
+        'umdCd': 'emd_code',
+        'umdNm': 'dong', # 읍면동
+    },
+    # zip_code 포함: 예전 api 행은 reg_no가 빈 값인 경우가 있어서 지역이 다르면 키가 겹칠 수 있음
+    key_columns=['zip_code', 'reg_no', 'bas_dt', 'floor', 'size', 'deal_amount', 'apartment_dong'],
+    table='apart',
+    dtypes={'dealAmount': 'int32', 'floor': 'Int16', 'excluUseAr': 'float64'}, # 만원 단위 / null 있는 행 있음 / m^2
+    comma_columns=('dealAmount',),
+    flag_columns={'cdealType': CANCEL_FLAG},
+    short_date_columns=('rgstDate',),
+    category_columns=['umdNm', 'dealingGbn', 'buyerGbn', 'slerGbn', 'estateAgentSggNm', 'landLeaseholdGbn', 'cdealType'],
+)
+
+### 아파트 매매 (예전 api, 한글 태그. backfill용)
+APT_TRADE_OLD = DatasetSpec(
+    name='apart_old',
+    endpoint='http://openapi.molit.go.kr/OpenAPI_ToolInstallPackage/service/rest/RTMSOBJSvc/getRTMSDataSvcAptTradeDev',
+    columns=APT_TRADE_COLUMNS_OLD,
+    rename={
+        '거래금액': 'deal_amount',
+        '거래유형': 'req_gbn',
+        '건축년도': 'build_year',
+        '도로명': 'road_name',
+        '도로명건물본번호코드': 'road_name_bonbun',
+        '도로명건물부번호코드': 'road_name_bubun',
+        '도로명시군구코드': 'road_name_sigungu_code',
+        '도로명일련번호코드': 'road_name_seq',
+        '도로명지상지하코드': 'road_name_basement_code',
+        '도로명코드': 'road_name_code',
+        '법정동': 'dong',
+        '법정동본번코드': 'bonbun',
+        '법정동부번코드': 'bubun',
+        '법정동시군구코드': 'sigungu_cd',
+        '법정동읍면동코드': 'emd_code',
+        '법정동지번코드': 'land_code',
+        '아파트': 'apartment_name',
+        '일련번호': 'reg_no',
+        '전용면적': 'size',
+        '중개사소재지': 'dealer_sigungu',
+        '지번': 'jibun',
+        '층': 'floor',
+        '해제사유발생일': 'cancel_deal_type',
+        '해제여부': 'cancel_deal_yn',
+    },
+    key_columns=['zip_code', 'reg_no', 'bas_dt', 'floor', 'size', 'deal_amount', 'apartment_dong'], # apartment_dong 없음 -> ''
+    table='apart',
+    dtypes={'거래금액': 'int32', '층': 'Int16', '전용면적': 'float64'},
+    comma_columns=('거래금액',),
+    flag_columns={'해제여부': CANCEL_FLAG},
+    date_parts=('년', '월', '일'),
+    drop_columns=('지역코드',),
+    zip_code_from_request=True,
+)
+
+### 아파트 전월세
+APT_RENT = DatasetSpec(
+    name='apart_rent',
+    endpoint=API_BASE + '/RTMSDataSvcAptRent/getRTMSDataSvcAptRent',
+    columns=(
+        'aptNm', 'aptSeq', 'buildYear', 'contractTerm', 'contractType', 'dealDay', 'dealMonth', 'dealYear',
+        'deposit', 'excluUseAr', 'floor', 'jibun', 'monthlyRent', 'preDeposit', 'preMonthlyRent', 'sggCd',
+        'umdNm', 'useRRRight',
+    ),
+    rename={
+        'aptNm': 'apartment_name',
+        'aptSeq': 'reg_no',
+        'buildYear': 'build_year',
+        'contractTerm': 'contract_term', # 계약기간
+        'contractType': 'contract_type', # 신규/갱신
+        'excluUseAr': 'size',
+        'monthlyRent': 'monthly_rent', # 월세 (만원)
+        'preDeposit': 'pre_deposit', # 종전 보증금
+        'preMonthlyRent': 'pre_monthly_rent', # 종전 월세
+        'sggCd': 'zip_code',
+        'umdNm': 'dong',
+        'useRRRight': 'use_renewal_right', # 갱신요구권 사용
+    },
+    key_columns=['zip_code', 'reg_no', 'bas_dt', 'floor', 'size', 'deposit', 'monthly_rent', 'contract_term'],
+    table='apart_rent',
+    dtypes={'deposit': 'Int32', 'monthlyRent': 'Int32', 'preDeposit': 'Int32', 'preMonthlyRent': 'Int32',
+            'floor': 'Int16', 'excluUseAr': 'float64'},
+    comma_columns=('deposit', 'monthlyRent', 'preDeposit', 'preMonthlyRent'),
+    category_columns=['umdNm', 'contractType', 'useRRRight'],
+)
+
+### 오피스텔 매매
+OFFICETEL_TRADE = DatasetSpec(
+    name='officetel_trade',
+    endpoint=API_BASE + '/RTMSDataSvcOffiTrade/getRTMSDataSvcOffiTrade',
+    columns=(
+        'buildYear', 'buyerGbn', 'cdealDay', 'cdealType', 'dealAmount', 'dealDay', 'dealMonth', 'dealYear',
+        'dealingGbn', 'estateAgentSggNm', 'excluUseAr', 'floor', 'jibun', 'offiNm', 'sggCd', 'sggNm', 'slerGbn',
+        'umdNm',
+    ),
+    rename={
+        'buildYear': 'build_year',
+        'buyerGbn': 'buyer',
+        'cdealDay': 'cancel_deal_day',
+        'cdealType': 'cancel_deal_yn',
+        'dealAmount': 'deal_amount',
+        'dealingGbn': 'dealing_gbn',
+        'estateAgentSggNm': 'dealer_sigungu',
+        'excluUseAr': 'size',
+        'offiNm': 'officetel_name',
+        'sggCd': 'zip_code',
+        'sggNm': 'sigungu_name',
+        'slerGbn': 'seller',
+        'umdNm': 'dong',
+    },
+    key_columns=['zip_code', 'dong', 'jibun', 'officetel_name', 'bas_dt', 'floor', 'size', 'deal_amount'],
+    table='officetel_trade',
+    dtypes={'dealAmount': 'int32', 'floor': 'Int16', 'excluUseAr': 'float64'},
+    comma_columns=('dealAmount',),
+    flag_columns={'cdealType': CANCEL_FLAG},
+    category_columns=['umdNm', 'sggNm', 'dealingGbn', 'buyerGbn', 'slerGbn', 'estateAgentSggNm', 'cdealType'],
+)
+
+### 연립다세대 매매
+ROWHOUSE_TRADE = DatasetSpec(
+    name='rowhouse_trade',
+    endpoint=API_BASE + '/RTMSDataSvcRHTrade/getRTMSDataSvcRHTrade',
+    columns=(
+        'buildYear', 'buyerGbn', 'cdealDay', 'cdealType', 'dealAmount', 'dealDay', 'dealMonth', 'dealYear',
+        'dealingGbn', 'estateAgentSggNm', 'excluUseAr', 'floor', 'houseType', 'jibun', 'landAr', 'mhouseNm',
+        'rgstDate', 'sggCd', 'slerGbn', 'umdNm',
+    ),
+    rename={
+        'buildYear': 'build_year',
+        'buyerGbn': 'buyer',
+        'cdealDay': 'cancel_deal_day',
+        'cdealType': 'cancel_deal_yn',
+        'dealAmount': 'deal_amount',
+        'dealingGbn': 'dealing_gbn',
+        'estateAgentSggNm': 'dealer_sigungu',
+        'excluUseAr': 'size',
+        'houseType': 'house_type', # 연립/다세대
+        'landAr': 'land_size', # 대지권면적
+        'mhouseNm': 'house_name',
+        'rgstDate': 'reg_dt',
+        'sggCd': 'zip_code',
+        'slerGbn': 'seller',
+        'umdNm': 'dong',
+    },
+    key_columns=['zip_code', 'dong', 'jibun', 'house_name', 'bas_dt', 'floor', 'size', 'deal_amount'],
+    table='rowhouse_trade',
+    dtypes={'dealAmount': 'int32', 'floor': 'Int16', 'excluUseAr': 'float64', 'landAr': 'float64'},
+    comma_columns=('dealAmount',),
+    flag_columns={'cdealType': CANCEL_FLAG},
+    short_date_columns=('rgstDate',),
+    category_columns=['umdNm', 'houseType', 'dealingGbn', 'buyerGbn', 'slerGbn', 'estateAgentSggNm', 'cdealType'],
+)
+
+DATASETS = {spec.name: spec for spec in (APT_TRADE, APT_TRADE_OLD, APT_RENT, OFFICETEL_TRADE, ROWHOUSE_TRADE)}
+
+
+def get_dataset(name: str) -> DatasetSpec:
+    if name not in DATASETS:
+        raise KeyError('없는 데이터셋: {} (가능: {})'.format(name, ', '.join(DATASETS)))
+    return DATASETS[name]
+
+
+### 응답 한 페이지 파싱 (응답 파일 객체를 읽으면서 item 단위). 컬럼별 list로 반환
+# no: 일련번호. 202208_0003 형식 (offset은 앞 페이지까지의 행 수)
+# db·api 연결이 필요 없어서 워커 프로세스에서도 그대로 사용 (parallel.py)
+def parse_page(spec: DatasetSpec, source, params: dict, meta: dict = None, offset: int = 0) -> dict:
+    columns = parse_columns(source, spec.columns, meta)
+    n_rows = len(columns[spec.columns[0]])
+    bas_ym = params['DEAL_YMD']
+
+    data = {'no': ['{}_{:04d}'.format(bas_ym, i) for i in range(offset + 1, offset + n_rows + 1)]}
+    if spec.zip_code_from_request:
+        data['zip_code'] = [params['LAWD_CD']] * n_rows
+    data.update(columns)
+    return data
+
+
+### 적재 테이블 생성 sql (mysql). 숫자 타입은 dtypes 기준, 나머지는 문자열
+# bas_ym은 생성 컬럼 + (zip_code, bas_ym) 인덱스 (schema.py 003_bas_ym과 같은 구성)
+def table_ddl(spec: DatasetSpec) -> str:
+    sql_types = {'int32': 'int', 'Int32': 'int', 'Int16': 'smallint', 'float64': 'double'}
+    types = {spec.output_name(tag): sql_types[dtype] for tag, dtype in spec.dtypes.items()}
+    types.update({'no': 'varchar(20) not null', 'bas_dt': 'char(8)', 'load_dh': 'char(14)',
+                  'trade_key': 'char(40) not null', 'row_hash': 'char(40)'})
+    cols = ['    {} {}'.format(col, types.get(col, 'varchar(100)')) for col in spec.output_columns()]
+    cols.append('    bas_ym char(6) as (substr(bas_dt,1,6)) stored')
+    cols.append('    primary key (trade_key)')
+    cols.append('    index idx_{}_zip_ym (zip_code, bas_ym)'.format(spec.table))
+    return 'create table if not exists {} (\n{}\n)'.format(spec.table, ',\n'.join(cols))
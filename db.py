@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+'''
+db 접근 모듈 (프로세스당 엔진·커넥션 풀 하나를 읽기/쓰기에 같이 사용)
+- pool_pre_ping으로 끊어진 연결 자동 교체, 종료 시 풀 정리
+- 연결 획득 시간 기록 (풀 부족 여부 확인용)
+create: 2026.10.18
+'''
+
+import atexit
+import threading
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import URL
+
+
+class Database:
+    # dbinfo: host, username, password, database, port. 'url'이 있으면 그대로 사용 (테스트용 sqlite 등)
+    def __init__(self, dbinfo: dict, pool_size: int = 5, max_overflow: int = 5, pool_recycle: int = 3600):
+        url = dbinfo.get('url') or URL.create(
+            'mysql+pymysql',
+            username=dbinfo['username'],
+            password=dbinfo['password'],
+            host=dbinfo['host'],
+            port=dbinfo['port'],
+            database=dbinfo['database'],
+            query={'charset': 'utf8'},
+        )
+        if str(url).startswith('sqlite'):
+            self.engine = create_engine(url)
+        else:
+            self.engine = create_engine(
+                url,
+                pool_size=pool_size,
+                max_overflow=max_overflow,
+                pool_pre_ping=True,
+                pool_recycle=pool_recycle,
+                connect_args={'local_infile': True}, # bulk_writer load_data 모드용
+            )
+
+        self.acquire_times = [] # 연결 획득 소요 시간(초)
+        self.lock = threading.Lock()
+        atexit.register(self.close)
+
+    @property
+    def dialect(self):
+        return self.engine.dialect
+
+    def _record(self, start: float):
+        with self.lock:
+            self.acquire_times.append(time.perf_counter() - start)
+
+    @contextmanager
+    def connect(self):
+        start = time.perf_counter()
+        conn = self.engine.connect()
+        self._record(start)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    ### dbapi 연결 (bulk_writer에서 executemany 등에 사용)
+    def raw_connection(self):
+        start = time.perf_counter()
+        raw = self.engine.raw_connection()
+        self._record(start)
+        return raw
+
+    ### 조회. 파라미터는 :name 형식
+    def fetchall(self, sql: str, **params) -> list:
+        with self.connect() as conn:
+            return [tuple(row) for row in conn.execute(text(sql), params)]
+
+    def execute(self, sql: str, **params) -> int:
+        with self.connect() as conn:
+            result = conn.execute(text(sql), params)
+            conn.commit()
+            return result.rowcount
+
+    def summary(self) -> str:
+        with self.lock:
+            times = list(self.acquire_times)
+        if not times:
+            return 'db 연결 획득 0회'
+        return 'db 연결 획득 {}회, 평균 {:.1f}ms, 최대 {:.1f}ms | {}'.format(
+            len(times), sum(times) / len(times) * 1000, max(times) * 1000, self.engine.pool.status())
+
+    def close(self):
+        self.engine.dispose()
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+'''
+아파트 매매 차원 테이블 (단지, 도로명 주소, 중개사 소재지) + 정수 id만 가진 거래 테이블(apart_fact)
+- apart 행마다 반복되는 긴 문자열(단지명, 도로명, 도로명 코드 6개, 중개사 소재지 등)을 차원 테이블로 분리
+  apart_fact는 id(int)와 거래 값만 -> 행 크기, 인덱스 크기가 작아서 적재·조회가 빠름
+- 자연키 -> id 사전을 프로세스 안에 유지 (처음 한 번 차원 테이블 전체를 읽고, 이후에는 새로 생긴 id만 읽음)
+  청크마다 사전에 없는 값만 모아서 한 번에 insert (중복은 무시) -> 새 id 한 번에 읽기
+  여러 프로세스가 동시에 적재해도 같은 자연키는 같은 id
+- 차원 속성(단지명 등)은 처음 들어온 값 유지
+- 예전 api 행은 단지 일련번호(reg_no)가 빈 값일 수 있음 -> 지역·단지명·지번으로 단지 구분 (Dimension fallback)
+- 조회는 apart_fact_v (apart와 같은 컬럼)
+- 차원 테이블로 적재하면(ingest.Ingestor dimensions) apart에는 적재하지 않고 apart_fact에만 적재 (행 하나를 두 번 쓰지 않음)
+  파티션 교체 적재(exchange)도 apart_fact를 계약월 파티션으로 (schema.py 010_partition_fact)
+  요약 테이블·변경 감지·조회(queries --dimensions)는 apart_fact_v 기준
+create: 2026.10.18
+'''
+
+import threading
+import time
+
+import pandas as pd
+from sqlalchemy import text
+
+from bulk_writer import WRITE_MODES, executemany, write_df
+
+
+class Dimension:
+    # key_columns: 자연키 (apart 컬럼명). attributes: 자연키가 같으면 같은 값인 컬럼
+    # fallback: 자연키가 빈 값인 행을 구분할 컬럼 (attributes 중에서)
+    # -> 있으면 자연키를 natural_key 컬럼 하나로 저장 (자연키 값 또는 '|'로 이은 fallback 값)
+    def __init__(self, table: str, id_column: str, key_columns: list, attributes: list = (), fallback: list = ()):
+        self.table = table
+        self.id_column = id_column
+        self.key_columns = list(key_columns)
+        self.attributes = list(attributes)
+        self.fallback = list(fallback)
+
+    @property
+    def columns(self) -> list:
+        return self.key_columns + self.attributes
+
+    ### id를 찾는 컬럼 (차원 테이블 unique 키)
+    @property
+    def lookup_columns(self) -> list:
+        return [NATURAL_KEY] if self.fallback else self.key_columns
+
+    def ddl(self, dialect: str) -> str:
+        if dialect == 'mysql':
+            id_col = '{} int not null auto_increment primary key'.format(self.id_column)
+        else:
+            id_col = '{} integer primary key autoincrement'.format(self.id_column)
+        cols = [id_col]
+        if self.fallback:
+            cols.append('{} varchar(200) not null'.format(NATURAL_KEY))
+        cols += ['{} varchar(100){}'.format(col, '' if self.fallback else ' not null') for col in self.key_columns]
+        cols += ['{} varchar(100)'.format(col) for col in self.attributes]
+        cols.append('unique ({})'.format(', '.join(self.lookup_columns)))
+        return 'create table if not exists {} (\n    {}\n)'.format(self.table, ',\n    '.join(cols))
+
+
+NATURAL_KEY = 'natural_key'
+
+
+# 단지 (aptSeq). 주소·건축년도 등은 단지마다 하나. 일련번호가 없으면(예전 api) 지역·단지명·지번
+COMPLEX = Dimension('dim_complex', 'complex_id', ['reg_no'],
+                    ['apartment_name', 'build_year', 'zip_code', 'emd_code', 'dong', 'jibun', 'bonbun', 'bubun',
+                     'land_code', 'land_lease_hold_yn'],
+                    fallback=['zip_code', 'apartment_name', 'jibun'])
+# 도로명 주소 (도로명 코드 조합)
+ROAD = Dimension('dim_road', 'road_id',
+                 ['road_name_sigungu_code', 'road_name_code', 'road_name_seq', 'road_name_basement_code',
+                  'road_name_bonbun', 'road_name_bubun'],
+                 ['road_name'])
+# 중개사 소재지 (여러 지역이면 ', '로 이어진 문자열 그대로)
+DEALER_REGION = Dimension('dim_dealer_region', 'dealer_region_id', ['dealer_sigungu'])
+
+DIMENSIONS = [COMPLEX, ROAD, DEALER_REGION]
+
+FACT_TABLE = 'apart_fact'
+FACT_VIEW = 'apart_fact_v'
+FACT_TYPES = {
+    'trade_key': 'char(40) not null', 'no': 'varchar(20) not null', 'zip_code': 'varchar(10)', 'bas_dt': 'char(8)',
+    'complex_id': 'int', 'road_id': 'int', 'dealer_region_id': 'int',
+    'apartment_dong': 'varchar(20)', 'size': 'double', 'floor': 'smallint', 'deal_amount': 'int',
+    'buyer': 'varchar(10)', 'seller': 'varchar(10)', 'dealing_gbn': 'varchar(10)',
+    'cancel_deal_yn': 'char(1)', 'cancel_deal_type': 'char(8)', 'reg_dt': 'char(8)',
+    'req_gbn': 'varchar(10)', 'sigungu_cd': 'varchar(10)', # 예전 api 컬럼 (apart와 같게)
+    'load_dh': 'char(14)', 'row_hash': 'char(40)',
+}
+FACT_COLUMNS = list(FACT_TYPES)
+
+
+def fact_ddl(dialect: str) -> str:
+    cols = ['{} {}'.format(col, sql_type) for col, sql_type in FACT_TYPES.items()]
+    if dialect == 'mysql':
+        cols.append('bas_ym char(6) as (substr(bas_dt,1,6)) stored')
+        cols += ['primary key (trade_key)', 'index idx_{}_zip_ym (zip_code, bas_ym)'.format(FACT_TABLE),
+                 'index idx_{}_complex (complex_id, bas_dt)'.format(FACT_TABLE)]
+    else:
+        cols.append('bas_ym char(6) as (substr(bas_dt,1,6))')
+        cols.append('primary key (trade_key)')
+    return 'create table if not exists {} (\n    {}\n)'.format(FACT_TABLE, ',\n    '.join(cols))
+
+
+### apart와 같은 컬럼으로 보는 view (차원 테이블 join). bas_ym(생성 컬럼)도 포함 (지역·계약월 조회용)
+def view_sql() -> str:
+    cols = ['f.{}'.format(col) for col in FACT_COLUMNS if not col.endswith('_id')] + ['f.bas_ym']
+    joins = []
+    for i, dim in enumerate(DIMENSIONS):
+        alias = 'd{}'.format(i)
+        cols += ['{}.{}'.format(alias, col) for col in dim.columns if col != 'zip_code']
+        joins.append('left join {0} {1} on f.{2} = {1}.{2}'.format(dim.table, alias, dim.id_column))
+    return 'create view {} as\nselect {}\nfrom {} f\n{}'.format(FACT_VIEW, ', '.join(cols), FACT_TABLE, '\n'.join(joins))
+
+
+### 차원 테이블, apart_fact, view 만들기 (drop=True면 지우고 새로)
+def create_tables(db, drop: bool = False):
+    dialect = db.dialect.name
+    if drop:
+        db.execute('drop view if exists {}'.format(FACT_VIEW))
+        for table in [FACT_TABLE] + [dim.table for dim in DIMENSIONS]:
+            db.execute('drop table if exists {}'.format(table))
+    for dim in DIMENSIONS:
+        db.execute(dim.ddl(dialect))
+    db.execute(fact_ddl(dialect))
+    if dialect != 'mysql':
+        db.execute('create index if not exists idx_{0}_zip_ym on {0} (zip_code, bas_ym)'.format(FACT_TABLE))
+        db.execute('create index if not exists idx_{0}_complex on {0} (complex_id, bas_dt)'.format(FACT_TABLE))
+    create_view(db)
+
+
+### apart_fact_v 다시 만들기 (view 컬럼이 바뀐 뒤에도)
+def create_view(db):
+    db.execute('drop view if exists {}'.format(FACT_VIEW))
+    db.execute(view_sql())
+
+
+### 컬럼 값을 '|'로 이은 문자열 (natural_key)
+def joined(values: pd.DataFrame, columns: list) -> pd.Series:
+    first = values[columns[0]]
+    return first.str.cat([values[col] for col in columns[1:]], sep='|') if len(columns) > 1 else first
+
+
+### 차원 하나의 자연키 -> id 사전
+class IdCache:
+    def __init__(self, db, dim: Dimension):
+        self.db = db
+        self.dim = dim
+        self.ids = {}
+        self.max_id = 0
+        self.stats = {'hits': 0, 'inserts': 0}
+        self.lock = threading.Lock()
+
+    ### 마지막으로 읽은 id 이후 행만 읽기 (처음에는 전체)
+    def refresh(self):
+        sql = 'select {}, {} from {} where {} > :max_id'.format(
+            self.dim.id_column, ', '.join(self.dim.lookup_columns), self.dim.table, self.dim.id_column)
+        for row in self.db.fetchall(sql, max_id=self.max_id):
+            self.ids[tuple(row[1:])] = row[0]
+            self.max_id = max(self.max_id, row[0])
+
+    ### 행마다 id (자연키가 모두 빈 값이면 null. fallback이 있으면 fallback까지 모두 빈 값일 때). 사전에 없는 자연키는 한 번에 insert
+    # 사전 조회는 자연키 종류마다 한 번 (행마다 tuple을 만들지 않고 ngroup 번호로 다시 펼침)
+    def assign(self, data: pd.DataFrame) -> pd.Series:
+        values = pd.DataFrame({col: data[col].astype('string').fillna('').str.strip() if col in data.columns
+                               else pd.Series('', index=data.index, dtype='string') for col in self.dim.columns})
+        if self.dim.fallback:
+            key, other = joined(values, self.dim.key_columns), joined(values, self.dim.fallback)
+            values[NATURAL_KEY] = key.where(key.str.strip('|') != '', other.where(other.str.strip('|') != '', ''))
+        lookup = self.dim.lookup_columns
+        codes = values.groupby(lookup, sort=False).ngroup().to_numpy() # 처음 나온 순서대로 0, 1, 2...
+        first = values.drop_duplicates(lookup)
+        keys = list(zip(*[first[col].tolist() for col in lookup]))
+        blank = (first[lookup] == '').all(axis=1).to_numpy(dtype=bool)
+
+        with self.lock:
+            missing = [i for i, key in enumerate(keys) if not blank[i] and key not in self.ids]
+            if missing:
+                self.refresh() # 다른 프로세스가 넣은 id 먼저
+                missing = [i for i in missing if keys[i] not in self.ids]
+            if missing:
+                mark = '?' if self.db.dialect.paramstyle == 'qmark' else '%s'
+                cols = list(dict.fromkeys(lookup + self.dim.columns))
+                insert = 'insert {} into {} ({}) values ({})'.format(
+                    'ignore' if self.db.dialect.name == 'mysql' else 'or ignore', self.dim.table,
+                    ', '.join(cols), ', '.join([mark] * len(cols)))
+                executemany(self.db, insert, first.iloc[missing][cols], chunksize=5000)
+                self.stats['inserts'] += len(missing)
+                self.refresh()
+            self.stats['hits'] += int((~blank).sum()) - len(missing)
+            ids = pd.array([None if blank[i] else self.ids.get(key) for i, key in enumerate(keys)], dtype='Int64')
+        return pd.Series(ids[codes], index=data.index)
+
+
+class Dimensions:
+    def __init__(self, db):
+        self.db = db
+        self.caches = {dim.table: IdCache(db, dim) for dim in DIMENSIONS}
+
+    ### 처음 사용 전 차원 테이블 전체 읽기 (이후 청크는 대부분 사전에서 바로)
+    def warm(self):
+        for cache in self.caches.values():
+            with cache.lock:
+                cache.refresh()
+
+    ### 전처리 결과(apart 컬럼) -> apart_fact 컬럼
+    def to_fact(self, estate_df: pd.DataFrame) -> pd.DataFrame:
+        fact = pd.DataFrame(index=estate_df.index)
+        for col in FACT_COLUMNS:
+            if col in estate_df.columns:
+                fact[col] = estate_df[col]
+        for dim in DIMENSIONS:
+            fact[dim.id_column] = self.caches[dim.table].assign(estate_df)
+        return fact.reindex(columns=FACT_COLUMNS)
+
+    ### apart_fact에 바로 적재 (기존 apart 행 옮기기, 벤치마크). to_sql, multi, load_data는 그대로, 나머지(upsert, exchange)는 upsert
+    # 소요 시간은 id 변환 포함. 수집 적재는 ingest.Ingestor.write (to_fact 후 적재 방식대로)
+    def write(self, estate_df: pd.DataFrame, write_mode: str = 'upsert') -> dict:
+        start = time.perf_counter()
+        mode = write_mode if write_mode in WRITE_MODES else 'upsert'
+        stats = write_df(self.to_fact(estate_df), self.db, table=FACT_TABLE, mode=mode)
+        stats['seconds'] = time.perf_counter() - start
+        stats['rows_per_sec'] = stats['rows'] / stats['seconds'] if stats['seconds'] > 0 else 0.0
+        return stats
+
+    def summary(self) -> str:
+        return '차원 테이블: ' + ', '.join('{} {}개 (새로 추가 {inserts}, 사전 hit {hits})'.format(
+            table, len(cache.ids), **cache.stats) for table, cache in self.caches.items())
+
+
+### 기존 apart 행으로 차원·apart_fact 채우기 (계약월 단위. schema.py 008_dimensions)
+# condition: 옮길 apart 행 조건 (sql. 없으면 전체)
+def backfill_fact(db, condition: str = None):
+    where = ' where {}'.format(condition) if condition else ''
+    dimensions = Dimensions(db)
+    dimensions.warm()
+    for bas_ym, in db.fetchall('select distinct bas_ym from apart{} order by bas_ym'.format(where)):
+        sql = 'select * from apart where bas_ym = :bas_ym{}'.format(' and ({})'.format(condition) if condition else '')
+        with db.connect() as conn:
+            estate_df = pd.read_sql(text(sql), conn, params={'bas_ym': bas_ym})
+        dimensions.write(estate_df, 'upsert')
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+'''
+아파트 매매 실거래가 api 동시 수집 모듈
+(LAWD_CD, DEAL_YMD) 작업을 스레드 풀로 요청·파싱하고, 결과는 호출한 쪽 한 곳에서 순서대로 적재
+create: 2026.10.18
+'''
+
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+### 초당 요청 수 제한 (rps 없으면 제한 없음)
+class RateLimiter:
+    def __init__(self, rps: float = None):
+        self.interval = 1.0 / rps if rps else 0.0
+        self.next_at = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            wait_sec = self.next_at - now
+            self.next_at = max(now, self.next_at) + self.interval
+        if wait_sec > 0:
+            time.sleep(wait_sec)
+
+
+### 작업 병렬 수행
+# fetch(job)은 워커 스레드에서 실행 (api 요청 + 파싱 + 전처리)
+# 결과는 jobs 순서대로 (job, 결과) 형태로 반환 -> db insert는 한 스레드에서 순서대로 처리됨
+# 진행 중인 작업은 window개(기본 workers * 2)까지만 유지 (결과가 메모리에 쌓이지 않도록)
+def fetch_concurrent(jobs, fetch, workers: int = 4, rps: float = None, window: int = None):
+    limiter = RateLimiter(rps)
+    window = window or workers * 2
+
+    def run(job):
+        limiter.wait()
+        return fetch(job)
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    pending = deque()
+    try:
+        for job in jobs:
+            pending.append((job, executor.submit(run, job)))
+            if len(pending) >= window:
+                done_job, future = pending.popleft()
+                yield done_job, future.result()
+
+        while pending:
+            done_job, future = pending.popleft()
+            yield done_job, future.result()
+    finally:
+        # 중간에 예외(api 요청 횟수 초과 등)로 끝나면 대기 중인 작업은 취소
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+### 첫 페이지 기준 (페이지 크기, 페이지 수)
+# 요청한 numOfRows보다 적게 주면 서버 최대치에 걸린 것 -> 실제 받은 행 수를 페이지 크기로
+def page_count(total: int, n_rows: int, page_size: int) -> tuple:
+    if 0 < n_rows < min(page_size, total):
+        page_size = n_rows
+    return page_size, max(math.ceil(total / page_size), 1)
+
+
+### 페이지 나눠 받기 (totalCount 기준이라 잘리는 일 없음)
+# get_page(params, meta) -> {컬럼: list}. meta에 응답의 totalCount가 채워짐
+# 첫 페이지로 전체 건수 확인 후 나머지 페이지는 동시 요청. 페이지 순서대로 하나씩 반환 (pipeline에서 청크로 사용)
+# window: 미리 받아 두는 페이지 수 (fetch_concurrent 참고. 파이프라인은 workers로 줄여서 메모리 일정하게)
+def iter_pages(get_page, params: dict, workers: int = 4, meta: dict = None, window: int = None):
+    meta = {} if meta is None else meta
+    data = get_page(params, meta)
+    n_rows = len(next(iter(data.values()), []))
+    page_size, n_pages = page_count(int(meta.get('totalCount') or 0), n_rows, int(params['numOfRows']))
+    meta['pages'] = n_pages
+    yield data
+
+    pages = [dict(params, numOfRows=str(page_size), pageNo=str(page_no)) for page_no in range(2, n_pages + 1)]
+    for page_params, page_data in fetch_concurrent(pages, lambda page: get_page(page, {}), workers=workers,
+                                                      window=window):
+        yield page_data
+
+
+### 전체 페이지를 하나로 합쳐서 반환 (데이터, 페이지 수)
+def fetch_pages(get_page, params: dict, workers: int = 4) -> tuple:
+    meta = {}
+    data = None
+    for page_data in iter_pages(get_page, params, workers=workers, meta=meta):
+        if data is None:
+            data = page_data
+        else:
+            for col, values in page_data.items():
+                data[col].extend(values)
+    return data, meta['pages']
@@ -0,0 +1,403 @@
+# -*- coding: utf-8 -*-
+'''
+실거래가 데이터셋 공통 수집·적재 엔진
+datasets.DatasetSpec 하나로 요청(keep-alive, 재시도) -> 페이지 나눠 받기 -> 응답 캐시 -> 파싱 -> 전처리 -> bulk 적재
+- 아파트 매매(새/예전 api), 전월세, 오피스텔, 연립다세대 모두 같은 경로
+- 적재는 pipeline(청크 단위, 메모리 일정) 또는 지역·계약월 전체 (변경분 비교가 필요할 때)
+- 단계별(parse, transform, write) 소요 시간·행 수와 작업별 소요 시간은 metrics에 기록
+- processes를 지정하면 파싱·전처리는 워커 프로세스에서 (parallel.py. 부모는 응답 원본 준비와 적재만)
+실행: python ingest.py --dataset officetel_trade --start 202401 --end 202406
+create: 2026.10.18
+'''
+
+import argparse
+import io
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from api_client import ApiClient
+from bulk_writer import WRITE_MODES, write_df
+from checkpoint import LOADED, Checkpoint
+from datasets import DATASETS, DatasetSpec, get_dataset, parse_page
+from db import Database
+from dimensions import FACT_TABLE, FACT_VIEW
+from fetcher import fetch_concurrent, iter_pages, page_count
+from metrics import Metrics
+from parallel import process_jobs
+from parquet_sink import PartitionWriter, write_partition
+from partitions import EXCHANGE, clear_stage_region, exchange, stage_exists, stage_table
+from pipeline import CHUNK_ROWS, PREFETCH_PAGES, coalesce, run_pipeline
+from planner import DAILY_LIMIT, MAX_PAGE_SIZE, QuotaExhausted, QuotaTracker, calls_needed, days_needed, month_range, page_size_for, plan_jobs
+from response_cache import CacheMiss, ResponseCache
+from rollup import refresh_month, refresh_rollup
+from transform import KeyCounts, proc_spec
+from xml_parser import peek_meta
+
+
+class Ingestor:
+    # quota가 있으면 요청마다 할당량 남은 키 사용 (요청 횟수 초과 시 다른 키로, 전부 소진 시 QuotaExhausted)
+    # 없으면 service_key 하나로 요청 (요청 횟수 초과 시 QuotaExceeded)
+    # endpoint: 요청 주소만 바꿀 때 (로컬 가짜 api 서버 등). 캐시는 spec.endpoint 기준 그대로
+    # dimensions: 있으면 apart 대신 차원 테이블 id로 바꾼 apart_fact에 적재 (dimensions.py)
+    # -> 적재·준비 테이블·파티션 교체는 apart_fact, 요약 테이블·변경 감지는 apart_fact_v 기준
+    def __init__(self, spec: DatasetSpec, db: Database, client: ApiClient, cache: ResponseCache = None,
+                 quota: QuotaTracker = None, service_key: str = None, metrics: Metrics = None, endpoint: str = None,
+                 dimensions=None):
+        self.spec = spec
+        self.endpoint = endpoint or spec.endpoint
+        self.db = db
+        self.client = client
+        self.cache = cache
+        self.quota = quota
+        self.service_key = service_key
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.stages = set() # 이번 실행에서 만든 준비 테이블 계약월 (write_mode='exchange')
+        self.staged = set() # 이번 실행에서 준비 테이블에 다시 적재하기 시작한 (지역, 계약월)
+        self.dimensions = dimensions if spec.table == 'apart' else None
+        self.table = FACT_TABLE if self.dimensions is not None else spec.table # 적재 테이블
+        self.source = FACT_VIEW if self.dimensions is not None else spec.table # 적재한 거래를 읽을 테이블 (apart 컬럼)
+
+    ### xml 데이터 파싱 (datasets.parse_page). 컬럼별 list로 반환
+    # no: 일련번호. 202208_0003 형식 (offset은 앞 페이지까지의 행 수)
+    def get_items(self, source, params: dict, meta: dict = None, offset: int = 0) -> dict:
+        with self.metrics.timer('parse') as record:
+            data = parse_page(self.spec, source, params, meta, offset)
+            record['rows'] = len(data['no'])
+        return data
+
+    ### 5xx 등으로 재시도하면 재시도한 호출도 할당량에 기록
+    def _on_retry(self, key: str):
+        if self.quota is None:
+            return None
+        return lambda: self.quota.spend(key)
+
+    # 캐시가 없으면 응답을 받으면서 바로 파싱 (stream, 본문 전체를 메모리에 두지 않음)
+    # 캐시가 있으면 본문을 저장해야 하므로 한 번에 받은 뒤 파싱
+    def _request(self, params: dict, meta: dict, key: str) -> dict:
+        offset = (int(params['pageNo']) - 1) * int(params['numOfRows'])
+        if self.cache is None:
+            r = self.client.get(self.endpoint, params=dict(params, serviceKey=key), stream=True, on_retry=self._on_retry(key))
+            r.raw.decode_content = True # gzip 응답일 경우
+            try:
+                return self.get_items(r.raw, params, meta=meta, offset=offset)
+            finally:
+                r.close()
+        r = self.client.get(self.endpoint, params=dict(params, serviceKey=key), on_retry=self._on_retry(key))
+        item_list = self.get_items(io.BytesIO(r.content), params, meta=meta, offset=offset)
+        self.cache.put(self.spec.endpoint, params, r.content) # 파싱까지 성공한 응답만 저장
+        return item_list
+
+    ### 한 페이지 요청
+    def get_page(self, params: dict, meta: dict) -> dict:
+        if self.quota is not None:
+            return self.quota.call(lambda key: self._request(params, meta, key))
+        return self._request(params, meta, self.service_key)
+
+    ### 한 페이지 요청, 파싱 없이 응답 원본 그대로 (멀티 프로세스 모드). (body, meta) 반환
+    # totalCount 등은 원본에서 바로 확인 (요청 횟수 초과 응답이면 QuotaExceeded -> quota가 있으면 다른 키로)
+    def _request_raw(self, params: dict, key: str) -> tuple:
+        r = self.client.get(self.endpoint, params=dict(params, serviceKey=key), on_retry=self._on_retry(key))
+        meta = peek_meta(r.content)
+        if self.cache is not None:
+            self.cache.put(self.spec.endpoint, params, r.content)
+        return r.content, meta
+
+    def get_raw_page(self, params: dict) -> tuple:
+        if self.quota is not None:
+            return self.quota.call(lambda key: self._request_raw(params, key))
+        return self._request_raw(params, self.service_key)
+
+    ### 지역·계약월 전체 페이지 원본 [(page_no, num_of_rows, body)] (첫 페이지 totalCount 기준, 나머지는 동시 요청)
+    def fetch_raw(self, lawd_cd: str, deal_ymd: str, page_size: int = MAX_PAGE_SIZE) -> list:
+        params = self.params(lawd_cd, deal_ymd, page_size)
+        body, meta = self.get_raw_page(params)
+        page_size, n_pages = page_count(int(meta.get('totalCount') or 0), meta['items'], page_size)
+        pages = [(1, page_size, body)]
+        rest = [dict(params, numOfRows=str(page_size), pageNo=str(page_no)) for page_no in range(2, n_pages + 1)]
+        for page_params, (body, _) in fetch_concurrent(rest, self.get_raw_page):
+            pages.append((int(page_params['pageNo']), page_size, body))
+        return pages
+
+    def params(self, lawd_cd: str, deal_ymd: str, page_size: int = MAX_PAGE_SIZE) -> dict:
+        return {
+            'DEAL_YMD': deal_ymd, # 계약월
+            'LAWD_CD': lawd_cd,
+            'pageNo': '1',
+            'numOfRows': str(page_size), # 넘치는 건 다음 페이지로 (totalCount 기준)
+        }
+
+    ### 지역·계약월 페이지 단위 generator. replay면 api 대신 캐시에서 (없으면 CacheMiss)
+    # window: 미리 받아 두는 페이지 수 (fetcher.iter_pages. 없으면 기본값)
+    def iter_chunks(self, lawd_cd: str, deal_ymd: str, page_size: int = MAX_PAGE_SIZE, replay: bool = False,
+                    window: int = None):
+        params = self.params(lawd_cd, deal_ymd, page_size)
+        if replay:
+            return self.cache.iter_replay(self.spec.endpoint, lawd_cd, deal_ymd,
+                                          lambda source, offset: self.get_items(source, params, offset=offset))
+        return iter_pages(self.get_page, params, window=window)
+
+    ### 지역·계약월 전체를 하나로 (변경분 비교 등 전체가 필요할 때)
+    def fetch_month(self, lawd_cd: str, deal_ymd: str, page_size: int = MAX_PAGE_SIZE, replay: bool = False) -> dict:
+        data = None
+        for chunk in self.iter_chunks(lawd_cd, deal_ymd, page_size, replay):
+            if data is None:
+                data = chunk
+            else:
+                for col, values in chunk.items():
+                    data[col].extend(values)
+        return data
+
+    ### 전처리 (빈 결과면 빈 DataFrame 그대로)
+    def transform(self, data: dict, key_counts: KeyCounts = None) -> pd.DataFrame:
+        estate_df = pd.DataFrame(data)
+        if estate_df.shape[0] == 0:
+            return estate_df
+        with self.metrics.timer('transform') as record:
+            estate_df = proc_spec(estate_df, self.spec, key_counts)
+            record['rows'] = estate_df.shape[0]
+        return estate_df
+
+    ### 적재 (write_df 결과의 소요 시간 기록)
+    # write_mode='exchange': 계약월별 준비 테이블에 upsert (exchange_month 전까지 테이블에는 안 보임)
+    # dimensions가 있으면 사전에 없는 단지·도로명·중개사 소재지만 차원 테이블에 추가 후 id로 바꿔서 apart_fact에만 적재
+    def write(self, estate_df: pd.DataFrame, write_mode: str = 'upsert') -> dict:
+        if self.dimensions is not None:
+            with self.metrics.timer('fact') as record:
+                estate_df = self.dimensions.to_fact(estate_df)
+                record['rows'] = estate_df.shape[0]
+        if write_mode == EXCHANGE:
+            stats = self._write_stage(estate_df)
+        else:
+            stats = write_df(estate_df, self.db, table=self.table, mode=write_mode)
+            self.metrics.observe('write', stats['seconds'], rows=stats['rows'])
+        return stats
+
+    def _write_stage(self, estate_df: pd.DataFrame) -> dict:
+        start = time.perf_counter()
+        for ym, part in estate_df.groupby(estate_df['bas_dt'].str[:6], sort=False):
+            for zip_code in part['zip_code'].unique():
+                self.stage_region(zip_code, ym)
+            write_df(part, self.db, table=stage_table(self.table, ym), mode='upsert')
+        seconds = time.perf_counter() - start
+        self.metrics.observe('write', seconds, rows=estate_df.shape[0])
+        return {'mode': EXCHANGE, 'rows': estate_df.shape[0], 'seconds': seconds,
+                'rows_per_sec': estate_df.shape[0] / seconds if seconds > 0 else 0.0}
+
+    ### 지역·계약월 다시 적재 시작: 준비 테이블(없으면 만듦)의 지역 목록에 추가하고 그 지역 행 지우기
+    # 실행마다 지역·계약월당 한 번만 (청크로 나눠 쓸 때 앞 청크를 지우지 않도록). 적재 행이 없는 작업도 호출해야 없어진 거래가 반영됨
+    # 이후 write(..., 'exchange'), exchange_month
+    def stage_region(self, zip_code: str, ym: str) -> int:
+        if (zip_code, ym) in self.staged:
+            return 0
+        rows = clear_stage_region(self.db, self.table, ym, zip_code)
+        self.staged.add((zip_code, ym))
+        self.stages.add(ym)
+        return rows
+
+    ### 준비 테이블로 계약월 교체 + 요약 테이블 다시 계산. 준비 테이블이 없으면(적재한 행 없음) None
+    def exchange_month(self, ym: str) -> int:
+        if not stage_exists(self.db, self.table, ym):
+            return None
+        with self.metrics.timer('exchange') as record:
+            rows = record['rows'] = exchange(self.db, self.table, ym)
+        self.stages.discard(ym)
+        self.staged = {(code, month) for code, month in self.staged if month != ym}
+        if self.spec.table == 'apart':
+            with self.metrics.timer('rollup') as record:
+                record['rows'] = refresh_month(self.db, ym, self.source)
+        return rows
+
+    ### 적재한 지역·계약월의 요약 테이블(apart_rollup) 다시 계산. apart만 (다른 데이터셋은 요약 테이블 없음)
+    def update_rollup(self, zip_code: str, bas_ym: str) -> int:
+        if self.spec.table != 'apart':
+            return 0
+        with self.metrics.timer('rollup') as record:
+            record['rows'] = refresh_rollup(self.db, zip_code, bas_ym, self.source)
+        return record['rows']
+
+    ### 작업 [(code, name, ym)]을 청크 단위로 수집 -> 전처리 -> 적재. 작업이 끝날 때마다 (job, 행 수) 반환
+    # 캐시에 없는 작업(replay)은 행 수 None. 적재하다 끊긴 작업은 반환되지 않음 (다음 실행 때 처음부터, upsert라 중복 없음)
+    # processes: 파싱·전처리를 워커 프로세스 여러 개로 (지역·계약월 단위. 작업 하나는 메모리에 한 번에)
+    def run(self, jobs: list, write_mode: str = 'upsert', parquet_dir: str = None, replay: bool = False,
+            volumes: dict = None, processes: int = None):
+        volumes = volumes or {}
+        if processes:
+            yield from self._run_processes(jobs, processes, write_mode, parquet_dir, replay, volumes)
+            return
+        skipped = set()
+
+        # 페이지는 CHUNK_ROWS행씩 묶어서 전처리·적재, 미리 받는 페이지는 PREFETCH_PAGES개까지 (지역 크기와 관계없이 메모리 일정)
+        def fetch_chunks(job):
+            code, name, ym = job
+            try:
+                pages = self.iter_chunks(code, ym, page_size_for(volumes.get(code)), replay, window=PREFETCH_PAGES)
+                yield from coalesce(pages, CHUNK_ROWS)
+            except CacheMiss:
+                skipped.add(job)
+
+        # 같은 지역·계약월의 청크끼리 trade_key 순번 이어서 계산 (state는 작업마다 새로)
+        def transform(job, chunk, state):
+            estate_df = self.transform(chunk, state.setdefault('key_counts', KeyCounts()))
+            return estate_df if estate_df.shape[0] > 0 else None
+
+        parquet_writers = {}
+        def write(job, estate_df):
+            code, name, ym = job
+            if parquet_dir:
+                # 분석용 parquet. 지역·계약월 파일 하나에 청크 이어 쓰고 끝나면 교체
+                if job not in parquet_writers:
+                    parquet_writers[job] = PartitionWriter(parquet_dir, ym, code)
+                parquet_writers[job].write(estate_df)
+            self.write(estate_df, write_mode)
+
+        def finish(job):
+            writer = parquet_writers.pop(job, None)
+            if writer is not None:
+                writer.close()
+            if write_mode == EXCHANGE and job not in skipped:
+                self.stage_region(job[0], job[2]) # 적재 행이 없던 작업 (있으면 이미 호출됨)
+
+        # 작업 소요 시간: 앞 작업이 끝난 뒤부터 (단계가 겹쳐 실행되므로 작업 간 경과 시간 기준)
+        job_start = time.perf_counter()
+        try:
+            for job, rows in run_pipeline(jobs, fetch_chunks, transform, write, finish=finish):
+                job_end = time.perf_counter()
+                if job not in skipped:
+                    self.metrics.job(job[0], job[1], job[2], job_end - job_start, rows)
+                job_start = job_end
+                yield job, (None if job in skipped else rows)
+        finally:
+            # 끝나지 않은 작업(QuotaExhausted 등으로 중단)의 parquet 임시 파일 정리. 기존 파일은 그대로
+            for writer in parquet_writers.values():
+                writer.abort()
+
+
+    def _run_processes(self, jobs: list, processes: int, write_mode: str, parquet_dir: str, replay: bool, volumes: dict):
+        # 응답 원본 준비 (부모 프로세스 스레드). 캐시에 없으면 None -> 건너뜀
+        def load(job):
+            code, name, ym = job
+            if not replay:
+                return self.fetch_raw(code, ym, page_size_for(volumes.get(code)))
+            try:
+                return self.cache.pages(self.spec.endpoint, code, ym)
+            except CacheMiss:
+                return None
+
+        job_start = time.perf_counter()
+        for (code, name, ym), estate_df in process_jobs(self.spec.name, jobs, load, processes, metrics=self.metrics):
+            if estate_df is None:
+                yield (code, name, ym), None
+                continue
+            if write_mode == EXCHANGE:
+                self.stage_region(code, ym)
+            if estate_df.shape[0] > 0:
+                if parquet_dir:
+                    write_partition(estate_df, parquet_dir, ym, code)
+                self.write(estate_df, write_mode)
+            job_end = time.perf_counter()
+            self.metrics.job(code, name, ym, job_end - job_start, estate_df.shape[0])
+            job_start = job_end
+            yield (code, name, ym), estate_df.shape[0]
+
+
+### write_mode='exchange': 모든 지역이 적재 완료된 계약월만 준비 테이블로 교체 (나머지는 다음 실행에서 이어서 채움)
+def exchange_months(ingestor: Ingestor, checkpoint: Checkpoint, regions: list, months: list):
+    loaded = checkpoint.loaded()
+    for ym in months:
+        if any((code, ym) not in loaded for code, name in regions):
+            continue
+        start = time.time()
+        rows = ingestor.exchange_month(ym)
+        if rows is not None:
+            print('{} {} 파티션 교체 완료 ({}행). 소요 시간: {:.2f}s'.format(ingestor.table, ym, rows, time.time() - start))
+
+
+### 기간 x 지역 backfill (할당량 기준으로 매일 이어서)
+# checkpoint: 적재 완료 기록 (replay는 날짜별로 따로). 적재 완료한 (지역, 계약월)은 건너뜀
+# catalog: 지역·계약월별 행 수 기록 (region_catalog.py). 없으면 checkpoint에 기록된 행 수 사용
+def backfill(ingestor: Ingestor, checkpoint: Checkpoint, regions: list, start_ym: str, end_ym: str,
+             write_mode: str = 'upsert', parquet_dir: str = None, replay: bool = False, processes: int = None,
+             catalog=None):
+    start = time.time()
+    quota = ingestor.quota
+    loaded = checkpoint.loaded()
+
+    # 최근 월 먼저, 거래 많은 지역 먼저 (오래 걸리는 작업을 먼저 시작해서 마지막에 큰 작업 하나만 남지 않도록)
+    volumes = catalog.volumes(ingestor.spec.table) if catalog is not None else checkpoint.volumes()
+    jobs = plan_jobs(regions, month_range(start_ym, end_ym), volumes)
+    if replay:
+        cached = set(ingestor.cache.jobs(ingestor.spec.endpoint))
+        jobs = [job for job in jobs if (job[0], job[2]) in cached]
+    jobs = [job for job in jobs if (job[0], job[2]) not in loaded]
+    checkpoint.add([(code, ym) for code, name, ym in jobs])
+    if quota is not None and not replay:
+        # 소요 일수는 작업 수가 아니라 예상 호출 수 기준 (행이 많은 지역은 페이지 수만큼)
+        n_calls = calls_needed(jobs, volumes)
+        print('남은 작업 {}개 (예상 호출 {}회), 오늘 가능 {}회, 예상 {}일 소요'.format(
+            len(jobs), n_calls, quota.remaining_total(), days_needed(n_calls, quota.remaining_total(), len(quota.keys), quota.daily_limit)))
+    else:
+        print('남은 작업 {}개'.format(len(jobs)))
+
+    part_start = time.time()
+    try:
+        for (code, name, ym), rows in ingestor.run(jobs, write_mode=write_mode, parquet_dir=parquet_dir,
+                                                   replay=replay, volumes=volumes, processes=processes):
+            if rows is None:
+                print('{} {} 캐시 없음'.format(name, ym))
+                continue
+            if rows > 0 and write_mode != EXCHANGE:
+                ingestor.update_rollup(code, ym)
+            checkpoint.mark(code, ym, LOADED, rows=rows)
+            if catalog is not None:
+                catalog.record(ingestor.spec.table, code, ym, rows)
+            part_end = time.time()
+            print('{} {} {}행 적재 완료. 소요 시간: {:.2f}s'.format(name, ym, rows, part_end - part_start))
+            part_start = part_end
+    except QuotaExhausted:
+        print('오늘 api 할당량 소진. 남은 작업은 다음 실행 때 이어서')
+
+    if write_mode == EXCHANGE:
+        exchange_months(ingestor, checkpoint, regions, month_range(start_ym, end_ym))
+    print('{} 적재 완료. 소요 시간: {:.2f}s'.format(ingestor.spec.name, time.time() - start))
+
+
+if __name__ == '__main__':
+    # 예: python ingest.py --dataset apart_rent --start 202301 --end 202312 (다 끝날 때까지 매일 같은 명령 실행)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--dataset', required=True, choices=sorted(DATASETS))
+    parser.add_argument('--start', required=True, help='시작 계약월 YYYYMM')
+    parser.add_argument('--end', required=True, help='종료 계약월 YYYYMM')
+    parser.add_argument('--daily-limit', type=int, default=DAILY_LIMIT, help='서비스키당 일일 호출 수')
+    parser.add_argument('--write-mode', default='upsert', choices=WRITE_MODES + (EXCHANGE,))
+    parser.add_argument('--replay', action='store_true', help='api 호출 없이 캐시된 응답으로 다시 적재')
+    parser.add_argument('--parquet-dir', default=None, help='지정하면 지역·계약월별 parquet 파일도 저장 (pyarrow 필요)')
+    parser.add_argument('--processes', type=int, default=None, help='파싱·전처리 워커 프로세스 수 (없으면 청크 파이프라인)')
+    parser.add_argument('--metrics-out', default=None, help='단계별 소요 시간 저장 경로 (.json 또는 .prom)')
+    parser.add_argument('--dimensions', action='store_true', help='apart 데이터셋: apart 대신 차원 테이블 id로 바꾼 apart_fact에 적재')
+    args = parser.parse_args()
+
+    from context import Context # context가 이 모듈을 import하므로 실행할 때만
+
+    ctx = Context()
+    spec = get_dataset(args.dataset)
+    # 데이터셋별 키가 없으면 아파트 키 사용 (data.go.kr 키 하나로 국토부 api 공용)
+    quota = QuotaTracker(ctx.checkpoint_path, ctx.service_keys(spec.name), args.daily_limit)
+    ingestor = ctx.ingestor(spec, quota=quota, dimensions=ctx.dimensions if args.dimensions else None)
+    dataset = '{}_replay_{}'.format(spec.name, datetime.now().strftime('%Y%m%d')) if args.replay else spec.name
+    checkpoint = ctx.checkpoint(dataset)
+
+    # 지역 목록·행 수는 데이터셋 테이블 기준 (거래 없는 지역은 데이터셋마다 다름)
+    regions = ctx.catalog.regions(spec.table)
+    backfill(ingestor, checkpoint, regions, args.start, args.end, write_mode=args.write_mode,
+             parquet_dir=args.parquet_dir, replay=args.replay, processes=args.processes, catalog=ctx.catalog)
+    print(ctx.client.summary())
+    print(ctx.db.summary())
+    print(checkpoint.summary())
+    print(quota.summary())
+    print(ctx.cache.summary())
+    print(ctx.catalog.summary(spec.table))
+    print(ctx.metrics.summary())
+    if args.metrics_out:
+        ctx.metrics.write(args.metrics_out)
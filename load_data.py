@@ -4,257 +4,86 @@
 create: 2023.02.23
 '''
 
-import sys, os
-from sqlalchemy import create_engine
-import pymysql
-import logging, pickle, requests
-from urllib import parse
-import pandas as pd
-import numpy as np
-import xml.etree.ElementTree as ET
+import os
+import argparse
 # from bs4 import BeautifulSoup
 from datetime import datetime
-import time
 
-## 시작 시간
-start = time.time()
+from bulk_writer import WRITE_MODES
+from context import Context
+from datasets import APT_TRADE_OLD
+from ingest import backfill
+from partitions import EXCHANGE
+from planner import DAILY_LIMIT, QuotaTracker
 
-## 이 py 파일의 위치
-# pc용
-curr_dir = os.getcwd()
-# cron용
-# curr_path = os.path.realpath(__file__)
-# curr_dir = os.path.dirname(curr_path)
+## 설정·연결은 처음 쓸 때 만듦 (import만으로는 pickle 읽기, db 연결 없음 -> 함수만 가져다 쓰기 가능)
+# pc용: 실행 폴더의 dbinfo_estate.pickle, api_keys.pickle, checkpoint.db, cache
+# cron용: Context() -> 이 파일 옆 info 폴더
+ctx = Context(info_dir=os.getcwd(), cache_dir=os.getcwd() + '/cache')
 
-## db connection info
-with open(curr_dir + '/dbinfo_estate.pickle', 'rb') as f:
-    dbinfo = pickle.load(f)
 
-## 정부 api key
-with open(curr_dir + '/api_keys.pickle', 'rb') as f:
-    api_keys = pickle.load(f)
-
-## connect MySQL
-try:
-    conn = pymysql.connect(
-        host=dbinfo['host'],
-        user=dbinfo['username'],
-        passwd=dbinfo['password'],
-        db=dbinfo['database'],
-        port=dbinfo['port'],
-        use_unicode=True, charset='utf8'
-    )
-    cursor = conn.cursor()
-except:
-    logging.error("could not connect to rds")
-    sys.exit(1)
-
-
-endpoint = "http://openapi.molit.go.kr/OpenAPI_ToolInstallPackage/service/rest/RTMSOBJSvc/getRTMSDataSvcAptTradeDev"
-service_key = api_keys['apart']
-
-### 종결 함수
-def terminate():
-    end = time.time()
-    print('스크립트 종료. 소요 시간: {:.2f}s'.format(end - start))
-    quit()
-
-
-### xml 데이터 파싱
-def get_items(response, bas_ym, zip_code):
-    root = ET.fromstring(response.content)
-    item_list = []
-    cnt = 0
-
-    # api 요청 횟수 초과로 데이터 리턴하지 않을 때, 스크립트 종료
-    if not root.find('body'):
-        print('api 요청 횟수 초과')
-        terminate()
-    
-    for child in root.find('body').find('items'):
-        cnt += 1
-        elements = child.findall('*')
-        data = {}
-        data['no'] = '{}_{}'.format(bas_ym, str(cnt).zfill(4)) # 일련번호. 202208_0003 형식(pk로 사용). 근데 순번별 데이터가 변할 일이 있을까?
-        # data['bas_ym'] = bas_ym
-        data['zip_code'] = zip_code
-
-        for ele in elements:
-            tag = ele.tag.strip() # key. 처음에만 저장하면 되지 않나?
-            text = ele.text.strip() # value
-            data[tag] = text
-        item_list.append(data)
-    return item_list
-
-def get_data(params):
-    r = requests.get(endpoint, params=params)
-    item_list = get_items(r, bas_ym=params['DEAL_YMD'], zip_code=params['LAWD_CD'])
-    return item_list
-
-
-## 가져온 데이터 전처리
-def proc_df(data_frame):
-    data = data_frame.copy()
-    # 공백은 null로 바꾸기
-    for col in data.columns:
-        blank_cnt = data[data[col] == ''].shape[0]
-        if blank_cnt > 0:
-            # print(col, blank_cnt)
-            data[col].replace({'': np.nan}, inplace=True)
-
-    data['거래금액'] = data['거래금액'].str.replace(',', '').astype(int)
-    data['층'] = data['층'].astype(float) # 이게 null이 있는 행이 있음: float로 변환. 원래는 string이었나?
-    data['전용면적'] = data['전용면적'].astype(float)
-    data['해제여부'].replace({'O':'1', 'X':'0'}, inplace=True)
-    data['bas_ym'] = data['no'].str[:6]
-    data['bas_dt'] = data.apply(lambda x:'%s%s%s' % (x['년'],x['월'].zfill(2),x['일'].zfill(2)),axis=1)
-    data.drop(columns=['년', '월', '일', 'bas_ym', '지역코드'], inplace=True)
-
-    # 컬럼명 mysql에 맞게 바꾸기
-    data.rename(columns={
-        '거래금액': 'deal_amount',
-        '거래유형': 'req_gbn',
-        '건축년도': 'build_year',
-        '도로명': 'road_name',
-        '도로명건물본번호코드': 'road_name_bonbun',
-        '도로명건물부번호코드': 'road_name_bubun',
-        '도로명시군구코드': 'road_name_sigungu_code',
-        '도로명일련번호코드': 'road_name_seq',
-        '도로명지상지하코드': 'road_name_basement_code',
-        '도로명코드': 'road_name_code',
-        '법정동': 'dong',
-        '법정동본번코드': 'bonbun',
-        '법정동부번코드': 'bubun',
-        '법정동시군구코드': 'sigungu_cd',
-        '법정동읍면동코드': 'emd_code',
-        '법정동지번코드': 'land_code',
-        '아파트': 'apartment_name',
-        '일련번호': 'reg_no',
-        '전용면적': 'size',
-        '중개사소재지': 'dealer_sigungu',
-        '지번': 'jibun',
-        '층': 'floor',
-        '해제사유발생일': 'cancel_deal_type',
-        '해제여부': 'cancel_deal_yn',
-    }, inplace=True)
-
-    return data
-
-
-## 우편번호 데이터 전처리
-def proc_zipdf(data_frame):
-    zips = data_frame.copy()
-    # 타입 변경
-    zips['법정동코드'] = zips['법정동코드'].astype(str) 
-
-    # 존재하는 지역만 남기기
-    zips = zips[(zips['폐지여부'] == '존재')]
-
-    # LAWD_CD 파라미터는 5자리 -> 시/군/구 단위로만 남기기 (277개)
-    zips = zips[zips['법정동코드'].str[5:] == '00000']
-    zips['법정동코드'] = zips['법정동코드'].str[:5]
-    zips = zips[['법정동코드', '법정동명']]
-    zips.columns = ['code', 'name']
-    zips.reset_index(inplace=True, drop=True)
-
-    # 기초단체만 api 조회됨 (시/군/구)
-    zips_small = zips[zips['code'].str[2:] != '000']
-    return zips_small
-
-
-## 우편번호 데이터는 db에서 가져오기
-# api 데이터 제공되지 않는 지역 제외 (옹진군, 수원, 성남, 안양, 안산, 고양, 용인, 청주, 천안, 전주, 포항)
-# 옹진군은 아파트가 없는 것 같고, 나머지 지역은 하위 지역(구 단위)에서 데이터 제공
-def get_zip_data():
-    sql = "select code, name from zip_code where api_data_yn = '1'"
-    cursor.execute(sql)
-    zips_db = cursor.fetchall()
-    
-    return zips_db
-
-
-def main():
+def main(start_ym, end_ym, write_mode='upsert', daily_limit=DAILY_LIMIT, replay=False, parquet_dir=None, metrics_out=None,
+         processes=None, dimensions=False):
     # 작업 시작
-    print("{} 작업 시작".format(datetime.now()))
+    ctx.start()
+    print("{} 작업 시작 ({} ~ {})".format(datetime.now(), start_ym, end_ym))
 
-    #우편번호 목록 가져오기
-    # zips = pd.read_csv(curr_dir + '/zip_code.txt', sep='\t', encoding='cp949')
-    # zips_small = proc_zipdf(zips) # 파일로 관리
-    zips_small = get_zip_data() # db로 관리
+    # 수집 대상 지역 (region_catalog.py. db zip_code 테이블은 일주일에 한 번만 조회)
+    # 구 단위로 제공되는 시(수원, 성남 등), 거래 없는 지역(옹진군 등)은 제외
+    zips_small = ctx.catalog.regions(APT_TRADE_OLD.table)
 
     # 한 동네(종로구)에 대해 6초
     # 6 * 261 -> 다 하면 26분 정도 걸릴 각
     # 모든 동네에 대해 202101 ~ 202212 해보기 -> 총 요청 횟수 261*24 = 6264
     # 근데 하루 트래픽 제한 1000. 24개월 기준, 하루에 40개 정도 지역만 적재 가능
-
-    ### api 데이터 가져오기 (zip_code 단위. 2년치씩 한번에 저장)
-    # year = ['2021', '2022'] # 3/19 완료
-    # year = ['2019', '2020'] # 3/19 시작
-    year = ['2023']
-
-    # 데이터 없는 지역에 대해 주소 조회
-    sql = '''
-        select distinct zip_code from apart
-        where substr(bas_dt,1,6) between '202304' and '202305'
-        order by 1
-    '''.format(bas_ym)
-
-    cursor.execute(sql)
-    zips_db = [ele[0] for ele in cursor.fetchall()]
-
-    # 3중 for문 말고, zip으로 해야 하나? zip(code, yy, mm). mm은 list(range)
-    for code, name in zips_small:
-        part_start = time.time()
-        # 현재 db에 해당 zip_code 데이터 있을 경우, 다음으로 넘어가기
-        if code in zips_db:
-            continue
-
-        print('{} 적재 시작'.format(name))
-        estate_data = []
-        # cnt += 1
-        for yy in year:
-            # for mm in range(1, 13):
-            for mm in range(4, 6): # 4/13: 3월까지 적재. 6/1: 4,5월 적재
-                bas_ym = yy + "%02d" % mm
-                # print(bas_ym)
-                params = {
-                    'serviceKey': service_key,
-                    'DEAL_YMD': bas_ym, # 계약월
-                    'LAWD_CD': code,
-                    'pageNo': '1',
-                    'numOfRows': '10000', # 없으면 4행. 4/12 1000 -> 10000 수정
-                }
-
-                data_temp = get_data(params)
-                estate_data.extend(data_temp)
-                # print(bas_ym, data_temp.shape)
-
-        ### 전처리
-        estate_df = pd.DataFrame(estate_data)
-        len_df = estate_df.shape[0]
-        
-        # 해당 조건 데이터 없을 경우 종료
-        if len_df == 0:
-            pass
-        else:
-            estate_df = proc_df(estate_df)
-
-            ### mysql 데이터 insert
-            # 단순 삽입만 가능한가? 필요시 pymysql로 쿼리 짜기
-            db_connection_str = 'mysql+pymysql://{}:{}@{}/{}'.format(dbinfo['username'], dbinfo['password'], dbinfo['host'], dbinfo['database'])
-            db_connection = create_engine(db_connection_str)
-            # conn = db_connection.connect()
-            estate_df.to_sql(name='apart', con=db_connection, if_exists='append',index=False) # 이 라이브러리는 이미 pk 있을 경우 데이터 replace 기능 있나? 근데 그럴 일이 있을지 모르겠음. pk도 내가 만든 거니까
-
-        part_end = time.time()
-        print('{} {}행 적재 완료. 소요 시간: {:.2f}s'.format(name, estate_df.shape[0], part_end - part_start))
-        # if cnt == 5:
-        #     break
-
-    end = time.time()
-    print('모든 데이터 적재 완료. 소요 시간: {:.2f}s'.format(end - start))
+    # -> 기간 전체 작업을 한 번에 계획하고, 매일 할당량만큼만 수행 (cron으로 매일 같은 명령 실행)
+
+    # 적재 완료한 (지역, 계약월)은 작업 기록(checkpoint)으로 판단. 최근 월 먼저, 거래 많은 지역 먼저
+    # replay: 캐시에 있는 응답으로 다시 파싱·적재 (할당량 안 씀). 진행 기록은 날짜별로 따로
+    checkpoint = ctx.checkpoint('apart_replay_{}'.format(datetime.now().strftime('%Y%m%d')) if replay else 'apart')
+    # 서비스키 여러 개면 list로 저장 (키마다 일일 할당량 따로)
+    quota = QuotaTracker(ctx.checkpoint_path, ctx.service_keys(), daily_limit)
+
+    ## 예전 api (한글 태그). 요청·파싱·전처리·적재는 ingest.Ingestor 공용 (컬럼 정의는 datasets.APT_TRADE_OLD)
+    # api 요청 횟수 초과로 데이터 리턴하지 않을 때 QuotaExceeded -> QuotaTracker.call에서 다른 키로 바꾸거나 정상 종료
+    # dimensions: apart 대신 apart_fact(단지·도로명·중개사 소재지를 id로 바꾼 거래 테이블)에 적재
+    ingestor = ctx.ingestor(APT_TRADE_OLD, quota=quota, dimensions=ctx.dimensions if dimensions else None)
+
+    # 수집 -> 전처리 -> 적재를 페이지(청크) 단위로 (지역·계약월 전체를 메모리에 모으지 않음)
+    # processes 지정 시 파싱·전처리는 워커 프로세스에서 (replay처럼 응답이 캐시에 있을 때 코어 수만큼 빨라짐)
+    # 페이지 크기, 작업 순서는 지역별 과거 행 수 기준 (적재한 행 수는 다시 지역 목록에 기록)
+    backfill(ingestor, checkpoint, zips_small, start_ym, end_ym, write_mode=write_mode, parquet_dir=parquet_dir, replay=replay,
+             processes=processes, catalog=ctx.catalog)
+
+    print('모든 데이터 적재 완료. 소요 시간: {:.2f}s'.format(ctx.elapsed()))
+    print(ctx.client.summary())
+    print(ctx.db.summary())
+    print(checkpoint.summary())
+    print(quota.summary())
+    print(ctx.cache.summary())
+    print(ctx.catalog.summary())
+    if dimensions:
+        print(ctx.dimensions.summary())
+    print(ctx.metrics.summary())
+    if metrics_out:
+        ctx.metrics.write(metrics_out)
 
 
 
 if __name__ == '__main__':
-    main()
+    # 예: python load_data.py --start 202101 --end 202212 (다 끝날 때까지 매일 같은 명령 실행)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--start', required=True, help='시작 계약월 YYYYMM')
+    parser.add_argument('--end', required=True, help='종료 계약월 YYYYMM')
+    parser.add_argument('--daily-limit', type=int, default=DAILY_LIMIT, help='서비스키당 일일 호출 수')
+    parser.add_argument('--write-mode', default='upsert', choices=WRITE_MODES + (EXCHANGE,))
+    parser.add_argument('--replay', action='store_true', help='api 호출 없이 캐시된 응답으로 다시 적재')
+    parser.add_argument('--parquet-dir', default=None, help='지정하면 지역·계약월별 parquet 파일도 저장 (pyarrow 필요)')
+    parser.add_argument('--metrics-out', default=None, help='단계별 소요 시간 저장 경로 (.json 또는 .prom)')
+    parser.add_argument('--processes', type=int, default=None, help='파싱·전처리 워커 프로세스 수')
+    parser.add_argument('--dimensions', action='store_true', help='apart 대신 차원 테이블 id로 바꾼 apart_fact에 적재')
+    args = parser.parse_args()
+
+    main(args.start, args.end, write_mode=args.write_mode, daily_limit=args.daily_limit, replay=args.replay,
+         parquet_dir=args.parquet_dir, metrics_out=args.metrics_out, processes=args.processes,
+         dimensions=args.dimensions)
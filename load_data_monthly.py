@@ -8,245 +8,177 @@ edit: 2024.10.12(새 api에 맞추어 데이터 레이아웃 수정)
 edit: 2024.10.30(load_dh 컬럼 추가)
 '''
 
+import argparse
 import logging
-import os
-import pickle
-import sys
 import time
-import xml.etree.ElementTree as ET
 
 # from bs4 import BeautifulSoup
 from datetime import datetime, timedelta
 
-import numpy as np
-import pandas as pd
-import pymysql
-import requests
-from sqlalchemy import create_engine
-
-## 시작 시간
-start = time.time()
-
-## 이 py 파일의 위치
-# pc용
-# curr_dir = os.getcwd()
-# py, cron 겸용
-curr_path = os.path.realpath(__file__)
-curr_dir = os.path.dirname(curr_path)
-
-## db connection info
-with open(curr_dir + '/info/dbinfo_estate.pickle', 'rb') as f:
-    dbinfo = pickle.load(f)
-
-## 정부 api key
-with open(curr_dir + '/info/api_keys.pickle', 'rb') as f:
-    api_keys = pickle.load(f)
-
-## connect MySQL
-try:
-    conn = pymysql.connect(
-        host=dbinfo['host'],
-        user=dbinfo['username'],
-        passwd=dbinfo['password'],
-        db=dbinfo['database'],
-        port=dbinfo['port'],
-        use_unicode=True, charset='utf8'
-    )
-    cursor = conn.cursor()
-except Exception as e:
-    logging.error("could not connect to rds", e)
-    sys.exit(1)
-
-# api 호출 정보
-# endpoint = "http://openapi.molit.go.kr/OpenAPI_ToolInstallPackage/service/rest/RTMSOBJSvc/getRTMSDataSvcAptTradeDev"
-endpoint = "http://apis.data.go.kr/1613000/RTMSDataSvcAptTradeDev/getRTMSDataSvcAptTradeDev" # 240816 api 변경 
-service_key = api_keys['apart']
+from bulk_writer import WRITE_MODES
+from change_detect import diff_rows, load_stored, recent_months
+from checkpoint import FAILED, FETCHED, LOADED
+from context import Context
+from datasets import APT_TRADE
+from fetcher import fetch_concurrent
+from ingest import exchange_months
+from parquet_sink import write_partition
+from partitions import EXCHANGE
+from planner import page_size_for, plan_jobs
+from xml_parser import QuotaExceeded
+
+## 설정·연결은 처음 쓸 때 만듦 (import만으로는 pickle 읽기, db 연결 없음 -> 함수만 가져다 쓰기 가능)
+# 이 파일 옆 info 폴더 (py, cron 겸용). 설정 파일·캐시 위치, api 주소는 환경 변수로 변경 가능 (context.py)
+ctx = Context()
 
 ### 종결 함수
 def terminate():
-    end = time.time()
-    print('스크립트 종료. 소요 시간: {:.2f}s'.format(end - start))
+    print('스크립트 종료. 소요 시간: {:.2f}s'.format(ctx.elapsed()))
     quit()
 
 
-### xml 데이터 파싱
-def get_items(response, bas_ym: str, zip_code: str):
-    root = ET.fromstring(response.content)
-    item_list = []
-    cnt = 0
-
-    # api 요청 횟수 초과로 데이터 리턴하지 않을 때, 스크립트 종료
-    # if not root.find('body'):
-    if root.find('body') is None: # deprecated 해결 테스트
-        print('api 요청 횟수 초과')
-        terminate()
-    
-    for child in root.find('body').find('items'):
-        cnt += 1
-        elements = child.findall('*')
-        data = {}
-        data['no'] = '{}_{}'.format(bas_ym, str(cnt).zfill(4)) # 일련번호. 202208_0003 형식(pk로 사용). 근데 순번별 데이터가 변할 일이 있을까?
-        # data['bas_ym'] = bas_ym # 불필요한 컬럼. 제거
-        # data['zip_code'] = zip_code # 이거 대신 sggCd 컬럼 사용
-
-        for ele in elements:
-            tag = ele.tag.strip() # key. 처음에만 저장하면 되지 않나?
-            text = ele.text.strip() # value
-            data[tag] = text
-        item_list.append(data)
-    return item_list
-
-def get_data(params: dict) -> list:
-    r = requests.get(endpoint, params=params)
-    item_list = get_items(r, bas_ym=params['DEAL_YMD'], zip_code=params['LAWD_CD'])
-    return item_list
-
-
-## 가져온 데이터 전처리
-def proc_df(data_frame: pd.DataFrame):
-    data = data_frame.copy()
-    # 공백은 null로 바꾸기
-    for col in data.columns:
-        blank_cnt = data[data[col] == ''].shape[0]
-        if blank_cnt > 0:
-            # print(col, blank_cnt)
-            data[col].replace({'': np.nan}, inplace=True)
-
-    # 컬럼별 전처리
-    data['dealAmount'] = data['dealAmount'].str.replace(',', '').astype(int)
-    data['floor'] = data['floor'].astype(float) # 이게 null이 있는 행이 있음: float로 변환. 원래는 string이었나?
-    data['excluUseAr'] = data['excluUseAr'].astype(float) # 전용면적(소수점 단위 m^2)
-    data['cdealType'].replace({'O':'1', 'X':'0'}, inplace=True)
-    data['bas_dt'] = data.apply(lambda x:'%s%s%s' % (x['dealYear'],x['dealMonth'].zfill(2),x['dealDay'].zfill(2)),axis=1)
-    data.loc[data['rgstDate'].notnull(), 'rgstDate'] = data.loc[data['rgstDate'].notnull(), 'rgstDate'].apply(lambda x: '20' + x[:2] + x[3:5] + x[6:8])
-    data.drop(columns=['dealYear', 'dealMonth', 'dealDay'], inplace=True)
-
-    # 컬럼명 mysql에 맞게 바꾸기
-    data.rename(columns={
-        'aptDong': 'apartment_dong', # 신규(아파트 동명)
-        'aptNm': 'apartment_name',
-        'aptSeq': 'reg_no', # 단지 일련번호(new): 일련번호(old)
-        # 'bonbun': '', # 그대로
-        # 'bubun': '', # 그대로
-        'buildYear': 'build_year',
-        'buyerGbn': 'buyer',
-        'cdealDay': 'cancel_deal_type', # 해제사유발생일. sql 컬럼명 cancel_deal_type -> cancel_deal_day 변경 필요!!!
-        'cdealType': 'cancel_deal_yn', # 해제여부
-        'dealAmount': 'deal_amount', 
-        'dealDay': 'day', 'dealMonth': 'month', 'dealYear': 'year', # 년월일 합쳐서 bas_dt
-        'dealingGbn': 'dealing_gbn', # 거래유형. 컬럼명 변경하기 (req_gbn -> dealing_gbn)
-        'estateAgentSggNm': 'dealer_sigungu',
-        'excluUseAr': 'size', # 전용면적
-        # 'floor': '', # 그대로
-        # 'jibun': '', # 그대로
-        'landCd': 'land_code',
-        'landLeaseholdGbn': 'land_lease_hold_yn', # 신규(토지임대부 아파트 여부) 
-        'rgstDate': 'reg_dt', # 신규(등기일자)
-        'roadNm': 'road_name',
-        'roadNmBonbun': 'road_name_bonbun', 
-        'roadNmBubun': 'road_name_bubun',
-        'roadNmCd': 'road_name_code', 
-        'roadNmSeq': 'road_name_seq', 
-        'roadNmSggCd': 'road_name_sigungu_code',
-        'roadNmbCd': 'road_name_basement_code', 
-        'sggCd': 'zip_code',
-        'slerGbn': 'seller', 
-        'umdCd': 'emd_code',
-        'umdNm': 'dong' # 읍면동
-    }, inplace=True)
-
-    # load_dh 컬럼 추가
-    now_dt = datetime.now().strftime('%Y%m%d%H%M%S')
-    data['load_dh'] = now_dt
-
-    # 처리 후 남은 한글 컬럼명 지우기 (241022 기준 없음)
-    # ko_cols = [col for col in data.columns if not col.replace('_', '').encode().isalpha()]
-    # data.drop(columns=ko_cols, inplace=True)
-
-    return data
-
-
-## 우편번호 데이터는 db에서 가져오기
-# api 데이터 제공되지 않는 지역 제외 (옹진군, 수원, 성남, 안양, 안산, 고양, 용인, 청주, 천안, 전주, 포항)
-# 옹진군은 아파트가 없는 것 같고, 나머지 지역은 하위 지역(구 단위)에서 데이터 제공
-def get_zip_data() -> tuple:
-    sql = "select code, name from zip_code where api_data_yn = '1'"
-    cursor.execute(sql)
-    zips_db = cursor.fetchall()
-    
-    return zips_db
-
-
-def main():
+def main(workers: int = 1, rps: float = None, write_mode: str = 'upsert', refresh_months: int = 0,
+         replay: bool = False, replay_months: list = None, parquet_dir: str = None, metrics_out: str = None,
+         dimensions: bool = False):
     # 작업 시작
+    ctx.start()
+    if refresh_months and write_mode != 'upsert':
+        # 변경분은 이미 있는 trade_key 행의 갱신 -> upsert만 가능
+        # (to_sql, multi, load_data는 pk 중복 오류, exchange는 변경분만 준비 테이블에 넣고 교체하면 나머지 행이 사라짐)
+        raise ValueError('--refresh-months는 upsert 적재 방식만 가능 (--write-mode {})'.format(write_mode))
     lastday_lm = datetime.today().replace(day=1) - timedelta(days=1)
     bas_ym = lastday_lm.strftime("%Y%m")
     print("{} 작업 시작. {}".format(bas_ym, datetime.now()))
 
-    #우편번호 목록 가져오기
-    # zips = pd.read_csv(curr_dir + '/zip_code.txt', sep='\t', encoding='cp949')
-    # zips_small = proc_zipdf(zips) # 파일로 관리
-    zips_small = get_zip_data() # db로 관리
-
-    # 이미 있는 우편번호 목록 파악. 없는 지역에 대해서만 api 요청
-    sql = '''
-        select distinct zip_code from apart
-        where substr(bas_dt,1,6) = '{}'
-        order by 1
-    '''.format(bas_ym)
-
-    cursor.execute(sql)
-    zips_db = [ele[0] for ele in cursor.fetchall()]
-
-    for code, name in zips_small:
-        # 현재 db에 해당 zip_code 데이터 있을 경우, 다음으로 넘어가기
-        # 근데 매 루프마다 이렇게 하면 오래 걸림. 다음날 시작할 지점을 기록해 두어야 하나? 루프 밖에서 max(zip_code)보다 큰 지역만 집계하기
-        if code in zips_db:
+    # 수집 대상 지역 (region_catalog.py. db zip_code 테이블은 일주일에 한 번만 조회)
+    # 구 단위로 제공되는 시(수원, 성남 등), 거래 없는 지역(옹진군 등)은 제외
+    catalog = ctx.catalog
+    zips_small = catalog.regions()
+    volumes = catalog.volumes() # 지역별 과거 평균 행 수 -> 페이지 크기, 작업 순서
+
+    ## 요청·파싱·캐시 저장·전처리는 ingest.Ingestor 공용 (endpoint, 컬럼은 datasets.APT_TRADE)
+    cache = ctx.cache
+    # dimensions: apart 대신 apart_fact(단지·도로명·중개사 소재지를 id로 바꾼 거래 테이블)에 적재 (schema.py 008_dimensions 필요)
+    ingestor = ctx.ingestor(APT_TRADE, service_key=ctx.service_keys()[0], dimensions=ctx.dimensions if dimensions else None)
+
+    if replay:
+        # 캐시에 있는 응답 전체(또는 지정한 월)를 다시 파싱·적재. api 호출 없음
+        names = dict(zips_small)
+        checkpoint = ctx.checkpoint('apart_replay_{}'.format(datetime.now().strftime('%Y%m%d')))
+        jobs = [(code, names.get(code, code), ym) for code, ym in cache.jobs(APT_TRADE.endpoint, replay_months)]
+    elif refresh_months:
+        # 최근 n개월 전체 지역 다시 조회 -> 저장된 값과 다른 행만 적재 (사후 수정된 해제여부, 등기일자 반영)
+        # 같은 날 다시 돌리면 끊긴 지점부터 이어서
+        months = recent_months(refresh_months)
+        print('refresh 대상 월: {}'.format(', '.join(months)))
+        checkpoint = ctx.checkpoint('apart_refresh_{}'.format(datetime.now().strftime('%Y%m%d')))
+        jobs = plan_jobs(zips_small, months, volumes)
+    else:
+        # 이미 적재 완료한 지역은 작업 기록(checkpoint)으로 판단. apart 테이블 distinct 조회 안 함
+        # 거래 많은 지역 먼저 (동시 요청 중 마지막에 큰 지역 하나만 남아 기다리지 않도록)
+        checkpoint = ctx.checkpoint()
+        jobs = plan_jobs(zips_small, [bas_ym], volumes)
+
+    loaded = checkpoint.loaded()
+    job_months = sorted({ym for code, name, ym in jobs}) # 교체 대상 (이전 실행에서 적재만 끝난 월 포함)
+    jobs = [job for job in jobs if (job[0], job[2]) not in loaded]
+    checkpoint.add([(code, ym) for code, name, ym in jobs])
+    print('남은 작업 {}개 (완료 {}개)'.format(len(jobs), len(loaded)))
+
+    # api 요청 + 파싱 + 전처리 (워커 스레드에서 실행). 작업별 소요 시간은 수집 + 적재 시간
+    fetch_seconds = {}
+    def fetch(job):
+        code, name, ym = job
+        fetch_start = time.perf_counter()
+
+        # 요청 횟수 초과(terminate)는 pending으로 남겨 두고 다음 실행 때 다시 시도
+        try:
+            # 넘치는 건 다음 페이지로 (totalCount 기준). replay면 캐시에서 (없으면 CacheMiss)
+            data_temp = ingestor.fetch_month(code, ym, page_size_for(volumes.get(code)), replay=replay)
+            # print(bas_ym, data_temp.shape)
+
+            ### 전처리 (해당 조건 데이터 없을 경우 전처리 생략)
+            estate_df = ingestor.transform(data_temp)
+        except QuotaExceeded:
+            # api 요청 횟수 초과로 데이터 리턴하지 않을 때, 스크립트 종료
+            print('api 요청 횟수 초과')
+            terminate()
+        except Exception as e:
+            logging.exception('%s %s 수집 실패', name, ym)
+            checkpoint.mark(code, ym, FAILED, error=repr(e))
+            return None
+
+        checkpoint.mark(code, ym, FETCHED, rows=estate_df.shape[0])
+        fetch_seconds[job] = time.perf_counter() - fetch_start
+        return estate_df
+
+    # 적재는 여기서 한 번에 하나씩, 지역 순서대로
+    for (code, name, ym), estate_df in fetch_concurrent(jobs, fetch, workers=workers, rps=rps):
+        if estate_df is None:
             continue
-
         part_start = time.time()
-        print('{} 적재 시작'.format(name))
-        estate_data = []
-        
-        params = {
-            'serviceKey': service_key,
-            'DEAL_YMD': bas_ym, # 계약월
-            'LAWD_CD': code,
-            'pageNo': '1',
-            'numOfRows': '10000', # 없으면 4행. 4/12 1000 -> 10000 수정
-        }
-
-        data_temp = get_data(params)
-        estate_data.extend(data_temp)
-        # print(bas_ym, data_temp.shape)
-
-        ### 전처리
-        estate_df = pd.DataFrame(estate_data)
-        len_df = estate_df.shape[0]
-        
-        # 해당 조건 데이터 없을 경우 종료
-        if len_df == 0:
-            pass
-        else:
-            estate_df = proc_df(estate_df)
-
-            ### mysql 데이터 insert
-            # 단순 삽입만 가능한가? 필요시 pymysql로 쿼리 짜기
-            db_connection_str = 'mysql+pymysql://{}:{}@{}/{}'.format(dbinfo['username'], dbinfo['password'], dbinfo['host'], dbinfo['database'])
-            db_connection = create_engine(db_connection_str)
-            # conn = db_connection.connect()
-            estate_df.to_sql(name='apart', con=db_connection, if_exists='append',index=False)
-            # 이 라이브러리는 이미 pk 있을 경우 데이터 replace 기능 있나? 근데 그럴 일이 있을지 모르겠음. pk도 내가 만든 거니까
 
+        write_msg = ''
+        catalog.record(APT_TRADE.table, code, ym, estate_df.shape[0]) # 변경분만 남기기 전 전체 행 수
+        if parquet_dir and estate_df.shape[0] > 0:
+            # 분석용 parquet: 변경분이 아니라 지역·계약월 전체로 파일 교체
+            write_partition(estate_df, parquet_dir, ym, code)
+
+        if refresh_months and estate_df.shape[0] > 0:
+            # 신규/변경/해제 행만 적재
+            changes = diff_rows(estate_df, load_stored(ctx.db, code, ym, ingestor.table))
+            estate_df = changes['rows']
+            write_msg = ' (신규 {inserts}, 변경 {updates}, 해제 {cancels}, api에 없음 {missing})'.format(**changes)
+
+        if write_mode == EXCHANGE:
+            # 준비 테이블의 이 지역 행 지우고 다시 채움 (적재할 행이 없어도. 없어진 거래가 교체 때 반영되도록)
+            ingestor.stage_region(code, ym)
+        if estate_df.shape[0] > 0:
+            ### mysql 데이터 insert (write_mode: to_sql, multi, load_data, upsert, exchange)
+            # upsert: trade_key(자연키) 기준. 다시 돌려도 바뀐 행만 갱신 (schema.py 001_trade_key 적용 필요)
+            stats = ingestor.write(estate_df, write_mode)
+            write_msg += ' ({:.0f}행/s)'.format(stats['rows_per_sec'])
+            # 적재한 지역·계약월만 요약 테이블 다시 계산 (rollup.py). exchange는 월 교체 후 한 번에
+            if write_mode != EXCHANGE:
+                ingestor.update_rollup(code, ym)
+
+        checkpoint.mark(code, ym, LOADED)
         part_end = time.time()
-        print('{} {}행 적재 완료. 소요 시간: {:.2f}s'.format(name, estate_df.shape[0], part_end - part_start))
-        # if cnt == 5:
-        #     break
+        ctx.metrics.job(code, name, ym, fetch_seconds.pop((code, name, ym), 0.0) + part_end - part_start, estate_df.shape[0])
+        print('{} {} {}행 적재 완료. 소요 시간: {:.2f}s{}'.format(name, ym, estate_df.shape[0], part_end - part_start, write_msg))
+
+    if write_mode == EXCHANGE:
+        # 전 지역 적재가 끝난 월만 준비 테이블 -> apart 파티션 교체 (실패한 지역이 있으면 다음 실행 때)
+        exchange_months(ingestor, checkpoint, zips_small, job_months)
 
-    end = time.time()
-    print('모든 데이터 적재 완료. 소요 시간: {:.2f}s'.format(end - start))
+    print('모든 데이터 적재 완료. 소요 시간: {:.2f}s'.format(ctx.elapsed()))
+    print(ctx.client.summary())
+    print(ctx.db.summary())
+    print(checkpoint.summary())
+    print(cache.summary())
+    print(catalog.summary())
+    if dimensions:
+        print(ctx.dimensions.summary())
+    print(ctx.metrics.summary())
+    if metrics_out:
+        ctx.metrics.write(metrics_out)
 
 
 
 if __name__ == '__main__':
-    main()
+    # 동시 요청 수, 초당 요청 수 제한
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--rps', type=float, default=None)
+    parser.add_argument('--write-mode', default='upsert', choices=WRITE_MODES + (EXCHANGE,))
+    parser.add_argument('--refresh-months', type=int, default=0, help='최근 n개월 변경분 반영 (0이면 지난달 미적재 지역만)')
+    parser.add_argument('--replay', action='store_true', help='api 호출 없이 캐시된 응답으로 다시 적재')
+    parser.add_argument('--replay-months', nargs='*', help='replay할 계약월 YYYYMM (없으면 캐시 전체)')
+    parser.add_argument('--parquet-dir', default=None, help='지정하면 지역·계약월별 parquet 파일도 저장 (pyarrow 필요)')
+    parser.add_argument('--metrics-out', default=None, help='단계별 소요 시간 저장 경로 (.json 또는 .prom, 실행 간 비교는 metrics.py)')
+    parser.add_argument('--dimensions', action='store_true', help='apart 대신 차원 테이블 id로 바꾼 apart_fact에 적재')
+    args = parser.parse_args()
+
+    main(workers=args.workers, rps=args.rps, write_mode=args.write_mode, refresh_months=args.refresh_months,
+         replay=args.replay, replay_months=args.replay_months, parquet_dir=args.parquet_dir, metrics_out=args.metrics_out,
+         dimensions=args.dimensions)
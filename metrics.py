@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+'''
+적재 단계별 소요 시간·처리량 기록 (병목이 네트워크/파싱/전처리/mysql 중 어디인지, 실행 간 성능 비교용)
+- 단계(http, parse, transform, write)마다 소요 시간 히스토그램 + 행 수 + 바이트 수
+- 지역·계약월(작업)별 소요 시간 -> 실행 끝에 가장 느린 작업 목록
+- 결과는 json 또는 prometheus textfile(node_exporter textfile collector) 형식으로 저장
+- 두 실행 결과(json) 비교: python metrics.py 이전.json 이번.json
+create: 2026.10.18
+'''
+
+import argparse
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+# 히스토그램 구간 상한(초). prometheus 기본값에 긴 요청(재시도 포함)용 구간 추가
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+STAGES = ('http', 'parse', 'transform', 'write') # 요약 출력 순서 (그 외 단계는 뒤에)
+PROM_PREFIX = 'estate'
+
+
+### 단계 하나의 소요 시간 분포 (구간별 개수만 저장 -> 요청 수와 관계없이 메모리 일정)
+class Histogram:
+    def __init__(self, buckets: tuple = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1) # 마지막은 가장 큰 구간 초과
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.bytes = 0
+
+    def observe(self, seconds: float, rows: int = 0, nbytes: int = 0):
+        i = 0
+        while i < len(self.buckets) and seconds > self.buckets[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+        self.rows += rows
+        self.bytes += nbytes
+
+    ### 분위수 추정 (구간 안에서는 선형 보간. prometheus histogram_quantile과 같은 방식)
+    def quantile(self, q: float) -> float:
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if seen + n >= rank and n > 0:
+                if i == len(self.buckets):
+                    return self.max
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                return min(self.max, lower + (self.buckets[i] - lower) * (rank - seen) / n)
+            seen += n
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            'count': self.count, 'sum': self.sum, 'max': self.max, 'rows': self.rows, 'bytes': self.bytes,
+            'p50': self.quantile(0.5), 'p95': self.quantile(0.95),
+            'buckets': dict(zip([str(b) for b in self.buckets] + ['+Inf'], self.counts)),
+        }
+
+
+class Metrics:
+    def __init__(self, buckets: tuple = BUCKETS):
+        self.buckets = buckets
+        self.stages = {} # 단계 이름 -> Histogram
+        self.jobs = [] # (지역코드, 지역명, 계약월, 소요 시간, 행 수)
+        self.started = time.time()
+        self.lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float, rows: int = 0, nbytes: int = 0):
+        with self.lock:
+            if stage not in self.stages:
+                self.stages[stage] = Histogram(self.buckets)
+            self.stages[stage].observe(seconds, rows, nbytes)
+
+    ### with metrics.timer('parse') as m: ... m['rows'] = n
+    @contextmanager
+    def timer(self, stage: str):
+        record = {'rows': 0, 'bytes': 0}
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            self.observe(stage, time.perf_counter() - start, record['rows'], record['bytes'])
+
+    ### 작업(지역·계약월) 하나 완료
+    def job(self, code: str, name: str, ym: str, seconds: float, rows: int):
+        with self.lock:
+            self.jobs.append((code, name, ym, seconds, rows))
+
+    def slowest(self, top: int = 10) -> list:
+        with self.lock:
+            return sorted(self.jobs, key=lambda job: job[3], reverse=True)[:top]
+
+    def _ordered_stages(self) -> list:
+        return [s for s in STAGES if s in self.stages] + sorted(s for s in self.stages if s not in STAGES)
+
+    def report(self, top: int = 10) -> dict:
+        with self.lock:
+            stages = {stage: self.stages[stage].to_dict() for stage in self._ordered_stages()}
+            n_jobs = len(self.jobs)
+            job_rows = sum(job[4] for job in self.jobs)
+        return {
+            'started': datetime.fromtimestamp(self.started).strftime('%Y%m%d%H%M%S'),
+            'elapsed': time.time() - self.started,
+            'jobs': n_jobs,
+            'rows': job_rows,
+            'stages': stages,
+            'slowest': [{'code': code, 'name': name, 'ym': ym, 'seconds': seconds, 'rows': rows}
+                        for code, name, ym, seconds, rows in self.slowest(top)],
+        }
+
+    ### 실행 끝 요약. 단계별 누적 시간 비중이 가장 큰 단계를 병목으로 표시
+    # (단계가 스레드로 겹쳐 실행되면 비중 합이 실제 경과 시간보다 클 수 있음)
+    def summary(self, top: int = 5) -> str:
+        report = self.report(top)
+        stages = report['stages']
+        if not stages:
+            return '단계별 기록 없음'
+        total = sum(s['sum'] for s in stages.values()) or 1.0
+        lines = ['{:>10} {:>8} {:>9} {:>6} {:>9} {:>9} {:>9} {:>10} {:>10}'.format(
+            '단계', '횟수', '누적(s)', '비중', 'p50(ms)', 'p95(ms)', '최대(ms)', '행', 'MB')]
+        for stage, s in stages.items():
+            lines.append('{:>10} {:>8} {:>9.2f} {:>5.0f}% {:>9.1f} {:>9.1f} {:>9.1f} {:>10} {:>10.1f}'.format(
+                stage, s['count'], s['sum'], s['sum'] / total * 100, s['p50'] * 1000, s['p95'] * 1000, s['max'] * 1000,
+                s['rows'], s['bytes'] / 1024 / 1024))
+        bottleneck = max(stages, key=lambda stage: stages[stage]['sum'])
+        lines.append('병목: {} (누적 시간 비중 {:.0f}%)'.format(bottleneck, stages[bottleneck]['sum'] / total * 100))
+        if report['slowest']:
+            lines.append('가장 느린 작업: ' + ', '.join('{name} {ym} {seconds:.2f}s({rows}행)'.format(**job) for job in report['slowest']))
+        return '\n'.join(lines)
+
+    def prometheus(self) -> str:
+        report = self.report()
+        name = PROM_PREFIX + '_stage_seconds'
+        lines = ['# HELP {} 적재 단계별 소요 시간'.format(name), '# TYPE {} histogram'.format(name)]
+        for stage, s in report['stages'].items():
+            cumulative = 0
+            for le, n in s['buckets'].items():
+                cumulative += n
+                lines.append('{}_bucket{{stage="{}",le="{}"}} {}'.format(name, stage, le, cumulative))
+            lines.append('{}_sum{{stage="{}"}} {}'.format(name, stage, s['sum']))
+            lines.append('{}_count{{stage="{}"}} {}'.format(name, stage, s['count']))
+        for key, help_text in (('rows', '단계별 처리 행 수'), ('bytes', '단계별 처리 바이트 수')):
+            counter = '{}_stage_{}_total'.format(PROM_PREFIX, key)
+            lines += ['# HELP {} {}'.format(counter, help_text), '# TYPE {} counter'.format(counter)]
+            lines += ['{}{{stage="{}"}} {}'.format(counter, stage, s[key]) for stage, s in report['stages'].items()]
+        for key, kind in (('jobs', 'gauge'), ('rows', 'gauge'), ('elapsed', 'gauge')):
+            lines += ['# TYPE {}_run_{} {}'.format(PROM_PREFIX, key, kind), '{}_run_{} {}'.format(PROM_PREFIX, key, report[key])]
+        lines += ['# TYPE {}_run_last_success_timestamp_seconds gauge'.format(PROM_PREFIX),
+                  '{}_run_last_success_timestamp_seconds {:.0f}'.format(PROM_PREFIX, time.time())]
+        return '\n'.join(lines) + '\n'
+
+    ### 파일 저장. .prom이면 prometheus textfile, 그 외는 json
+    # 임시 파일에 쓴 뒤 교체 (수집기가 반쯤 쓰인 파일을 읽지 않도록)
+    def write(self, path: str) -> str:
+        if path.endswith('.prom'):
+            body = self.prometheus()
+        else:
+            body = json.dumps(self.report(top=20), ensure_ascii=False, indent=2)
+        tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+        return path
+
+
+### 두 실행 결과(report json) 단계별 비교. threshold 이상 느려진 단계 목록 반환
+def compare(before: dict, after: dict, threshold: float = 0.2) -> list:
+    regressions = []
+    print('{:>10} {:>12} {:>12} {:>8}'.format('단계', '이전 p95(ms)', '이번 p95(ms)', '변화'))
+    for stage in after['stages']:
+        if stage not in before['stages']:
+            continue
+        old, new = before['stages'][stage]['p95'], after['stages'][stage]['p95']
+        change = (new - old) / old if old > 0 else (math.inf if new > 0 else 0.0)
+        print('{:>10} {:>12.1f} {:>12.1f} {:>7.0f}%'.format(stage, old * 1000, new * 1000, change * 100))
+        if change >= threshold:
+            regressions.append(stage)
+    return regressions
+
+
+if __name__ == '__main__':
+    # 예: python metrics.py reports/202409.json reports/202410.json (느려진 단계가 있으면 종료 코드 1)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float, default=0.2, help='이 비율 이상 느려지면 회귀로 판단 (p95 기준)')
+    args = parser.parse_args()
+
+    with open(args.before, encoding='utf-8') as f:
+        before = json.load(f)
+    with open(args.after, encoding='utf-8') as f:
+        after = json.load(f)
+    regressions = compare(before, after, args.threshold)
+    if regressions:
+        print('느려진 단계: {}'.format(', '.join(regressions)))
+        raise SystemExit(1)
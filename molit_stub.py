@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+'''
+getRTMSDataSvcAptTradeDev 응답을 흉내내는 로컬 http 서버 (벤치마크용. api 키·네트워크 없이 실행)
+- 지역·계약월별 행 수, 응답 지연(+ 임의 편차), 5xx 오류 비율 지정
+- 서비스키당 요청 수 제한: 넘으면 실제 api처럼 body 없는 요청 횟수 초과 응답
+실행: python molit_stub.py --port 8080 --latency 0.2 --error-rate 0.05 --quota 1000
+create: 2026.10.18
+'''
+
+import argparse
+import functools
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from xml.sax.saxutils import escape
+
+DONG_NAMES = ['사직동', '내수동', '청운동', '평창동', '무악동', '교남동', '숭인동', '창신동']
+APT_NAMES = ['래미안', '자이', '힐스테이트', '아이파크', '푸르지오', '롯데캐슬', 'e편한세상', '더샵']
+GBN = ['중개거래', '직거래']
+PERSON = ['개인', '법인', '기타']
+
+
+### 지역·계약월별로 항상 같은 데이터가 나오도록 seed 고정
+def make_items(lawd_cd: str, deal_ymd: str, n_rows: int) -> list:
+    rnd = random.Random('{}_{}'.format(lawd_cd, deal_ymd))
+    year, month = deal_ymd[:4], str(int(deal_ymd[4:]))
+    items = []
+    for i in range(n_rows):
+        apt_no = rnd.randrange(200)
+        cancel = rnd.random() < 0.03
+        registered = rnd.random() < 0.5
+        items.append({
+            'aptDong': rnd.choice(['', '101', '102', '103']),
+            'aptNm': '{}{}차'.format(rnd.choice(APT_NAMES), apt_no % 5 + 1),
+            'aptSeq': '{}-{}'.format(lawd_cd, apt_no),
+            'bonbun': '{:04d}'.format(apt_no),
+            'bubun': '0000',
+            'buildYear': str(rnd.randint(1980, 2023)),
+            'buyerGbn': rnd.choice(PERSON),
+            'cdealDay': '{}.{:02d}.{:02d}'.format(year[2:], int(month), 28) if cancel else '',
+            'cdealType': 'O' if cancel else '',
+            'dealAmount': '{:,}'.format(rnd.randint(5000, 300000)),
+            'dealDay': str(rnd.randint(1, 28)),
+            'dealMonth': month,
+            'dealYear': year,
+            'dealingGbn': rnd.choice(GBN),
+            'estateAgentSggNm': '서울 종로구',
+            'excluUseAr': '{:.4f}'.format(rnd.uniform(20, 200)),
+            'floor': str(rnd.randint(1, 40)),
+            'jibun': str(apt_no),
+            'landCd': '1',
+            'landLeaseholdGbn': 'N',
+            'rgstDate': '{}.{:02d}.{:02d}'.format(year[2:], int(month), 28) if registered else '',
+            'roadNm': '종로{}길'.format(apt_no % 30),
+            'roadNmBonbun': '{:05d}'.format(apt_no),
+            'roadNmBubun': '00000',
+            'roadNmCd': '{:07d}'.format(apt_no * 7),
+            'roadNmSeq': '01',
+            'roadNmSggCd': lawd_cd,
+            'roadNmbCd': '0',
+            'sggCd': lawd_cd,
+            'slerGbn': rnd.choice(PERSON),
+            'umdCd': '{:05d}'.format(10100 + apt_no % 8 * 100),
+            'umdNm': DONG_NAMES[apt_no % 8],
+        })
+    return items
+
+
+# data.go.kr 일일 트래픽 초과 시 응답 (response/body 없음 -> xml_parser.QuotaExceeded)
+QUOTA_EXCEEDED_XML = ('<OpenAPI_ServiceResponse><cmmMsgHeader><errMsg>SERVICE ERROR</errMsg>'
+                      '<returnAuthMsg>LIMITED_NUMBER_OF_SERVICE_REQUESTS_EXCEEDS_ERROR</returnAuthMsg>'
+                      '<returnReasonCode>22</returnReasonCode></cmmMsgHeader></OpenAPI_ServiceResponse>').encode('utf-8')
+
+
+def make_xml(items: list, page_no: int, num_of_rows: int, total_count: int) -> bytes:
+    parts = ['<?xml version="1.0" encoding="UTF-8" standalone="yes"?>',
+             '<response><header><resultCode>000</resultCode><resultMsg>OK</resultMsg></header>',
+             '<body><items>']
+    for item in items:
+        parts.append('<item>')
+        for tag, text in item.items():
+            # 실제 api처럼 빈 값은 공백 한 칸
+            parts.append('<{0}>{1}</{0}>'.format(tag, escape(text) if text else ' '))
+        parts.append('</item>')
+    parts.append('</items><numOfRows>{}</numOfRows><pageNo>{}</pageNo><totalCount>{}</totalCount></body></response>'
+                 .format(num_of_rows, page_no, total_count))
+    return ''.join(parts).encode('utf-8')
+
+
+# 페이지마다 전체 데이터를 다시 만들지 않도록 (큰 지역 여러 페이지 요청 시)
+_cached_items = functools.lru_cache(maxsize=16)(make_items)
+
+
+### 요청 처리
+# rows: 지역코드 -> 행 수 함수 (없으면 기본 100~1000행)
+# latency + 0~jitter초 지연, error_rate 비율로 500 응답, quota: 서비스키당 요청 수 제한 (None이면 무제한)
+class MolitHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1' # keep-alive
+    rows = None
+    latency = 0.0
+    jitter = 0.0
+    error_rate = 0.0
+    quota = None
+
+    def _send(self, status: int, body: bytes):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/xml;charset=UTF-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+        stats = self.server.stats
+        with self.server.lock:
+            stats['requests'] += 1
+            key = params.get('serviceKey', '')
+            stats['keys'][key] = used = stats['keys'].get(key, 0) + 1
+            delay = self.latency + (self.server.rnd.uniform(0, self.jitter) if self.jitter else 0.0)
+            failed = self.error_rate and self.server.rnd.random() < self.error_rate
+            if failed:
+                stats['errors'] += 1
+            elif self.quota is not None and used > self.quota:
+                stats['quota_exceeded'] += 1
+        if delay:
+            time.sleep(delay)
+        if failed:
+            self._send(500, b'Internal Server Error')
+            return
+        if self.quota is not None and used > self.quota:
+            self._send(200, QUOTA_EXCEEDED_XML) # 실제 api도 200으로 줌
+            return
+
+        lawd_cd = params.get('LAWD_CD', '11110')
+        deal_ymd = params.get('DEAL_YMD', '202409')
+        page_no = int(params.get('pageNo', '1'))
+        num_of_rows = int(params.get('numOfRows', '10'))
+
+        if self.rows:
+            total_count = self.rows(lawd_cd)
+        else:
+            total_count = random.Random(lawd_cd).randint(100, 1000)
+        items = _cached_items(lawd_cd, deal_ymd, total_count)
+        page = items[(page_no - 1) * num_of_rows: page_no * num_of_rows]
+        self._send(200, make_xml(page, page_no, num_of_rows, total_count))
+
+    def log_message(self, format, *args):
+        pass
+
+
+### 백그라운드 스레드로 서버 시작. (server, endpoint url) 반환
+# server.stats: 요청 수, 5xx 수, 요청 횟수 초과 응답 수, 서비스키별 요청 수. seed: 지연·오류 발생 순서 고정
+def start_server(port: int = 0, rows=None, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 quota: int = None, seed: int = 0):
+    handler = type('Handler', (MolitHandler,), {'rows': staticmethod(rows) if rows else None, 'latency': latency,
+                                                'jitter': jitter, 'error_rate': error_rate, 'quota': quota})
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.stats = {'requests': 0, 'errors': 0, 'quota_exceeded': 0, 'keys': {}}
+    server.rnd = random.Random(seed)
+    server.lock = threading.Lock()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    endpoint = 'http://127.0.0.1:{}/1613000/RTMSDataSvcAptTradeDev/getRTMSDataSvcAptTradeDev'.format(server.server_port)
+    return server, endpoint
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--rows', type=int, default=None, help='지역·계약월마다 행 수 (없으면 지역별 100~1000행)')
+    parser.add_argument('--latency', type=float, default=0.0, help='요청당 지연(초)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='지연에 더할 임의 편차 최대(초)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='500 응답 비율')
+    parser.add_argument('--quota', type=int, default=None, help='서비스키당 요청 수 제한')
+    args = parser.parse_args()
+
+    rows = (lambda code: args.rows) if args.rows else None
+    server, endpoint = start_server(port=args.port, rows=rows, latency=args.latency, jitter=args.jitter,
+                                    error_rate=args.error_rate, quota=args.quota)
+    print(endpoint)
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
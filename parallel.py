@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+'''
+파싱·전처리 멀티 프로세스 실행 (xml 파싱, pandas 전처리는 cpu 작업이라 스레드로는 GIL에 막힘)
+- 부모: 응답 원본(bytes) 준비 (캐시 읽기 또는 api 요청. io라서 스레드) -> 워커 프로세스로 전달
+- 워커: parse_page + proc_spec -> arrow ipc 버퍼(컬럼 단위)로 반환 (컬럼별 list·dict pickle보다 작고 빠름)
+  pyarrow 없으면 DataFrame 그대로 반환 (numpy 블록 단위로 pickle)
+- 적재는 부모 한 스레드에서 작업 순서대로
+응답이 캐시에 있거나(replay) 요청이 빠를 때 코어 수만큼 처리량 증가
+워커는 datasets, transform만 import (설정 파일·db 연결 없음)
+create: 2026.10.18
+'''
+
+import io
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError: # pyarrow 없으면 DataFrame 그대로 주고받음
+    pa = None
+
+from datasets import get_dataset, parse_page
+from fetcher import fetch_concurrent
+from transform import proc_spec
+
+
+### DataFrame <-> arrow ipc stream (category는 dictionary, Int16 등 nullable 타입은 pandas metadata로 복원)
+def encode_frame(data: pd.DataFrame):
+    if pa is None:
+        return data
+    table = pa.Table.from_pandas(data, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def decode_frame(payload) -> pd.DataFrame:
+    if isinstance(payload, pd.DataFrame):
+        return payload
+    return pa.ipc.open_stream(payload).read_all().to_pandas()
+
+
+### 워커: 작업(지역·계약월) 하나의 모든 페이지 파싱 -> 합쳐서 전처리 (trade_key 순번이 작업 전체 기준이 되도록)
+# pages: [(page_no, num_of_rows, body)]. 반환: (인코딩된 결과, {단계: (초, 행 수)})
+def process_pages(dataset: str, lawd_cd: str, deal_ymd: str, pages: list) -> tuple:
+    spec = get_dataset(dataset)
+    params = {'LAWD_CD': lawd_cd, 'DEAL_YMD': deal_ymd}
+
+    start = time.perf_counter()
+    data = None
+    for page_no, num_of_rows, body in pages:
+        page = parse_page(spec, io.BytesIO(body), params, offset=(page_no - 1) * num_of_rows)
+        if data is None:
+            data = page
+        else:
+            for col, values in page.items():
+                data[col].extend(values)
+    parsed = time.perf_counter()
+
+    estate_df = pd.DataFrame(data)
+    n_parsed = estate_df.shape[0]
+    if n_parsed > 0:
+        estate_df = proc_spec(estate_df, spec)
+    timings = {'parse': (parsed - start, n_parsed), 'transform': (time.perf_counter() - parsed, estate_df.shape[0])}
+    return encode_frame(estate_df), timings
+
+
+### 작업 병렬 처리. 결과는 jobs 순서대로 (job, DataFrame 또는 None) 반환
+# jobs: [(code, name, ym)]. load(job) -> pages 또는 None(캐시에 없음 등 건너뛸 작업). 부모 프로세스 스레드에서 실행
+# 진행 중인 작업은 processes * 2개까지만 (응답·결과가 메모리에 쌓이지 않도록)
+# metrics가 있으면 워커의 parse, transform 소요 시간 기록
+def process_jobs(dataset: str, jobs, load, processes: int = None, load_workers: int = 4, metrics=None):
+    processes = processes or os.cpu_count() or 1
+    pool = ProcessPoolExecutor(max_workers=processes)
+
+    def result(job, future):
+        if future is None:
+            return job, None
+        payload, timings = future.result()
+        if metrics is not None:
+            for stage, (seconds, rows) in timings.items():
+                metrics.observe(stage, seconds, rows=rows)
+        return job, decode_frame(payload)
+
+    pending = deque()
+    try:
+        for job, pages in fetch_concurrent(jobs, load, workers=load_workers):
+            future = None if pages is None else pool.submit(process_pages, dataset, job[0], job[2], pages)
+            pending.append((job, future))
+            if len(pending) >= processes * 2:
+                yield result(*pending.popleft())
+
+        while pending:
+            yield result(*pending.popleft())
+    finally:
+        # 중간에 예외(요청 횟수 초과 등)로 끝나면 대기 중인 작업은 취소
+        pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+'''
+전처리 결과 parquet 저장 (분석용. mysql apart 테이블 대신 조회)
+- root/bas_ym=YYYYMM/zip_code=XXXXX/part-0.parquet 형식으로 지역·계약월마다 파일 하나
+- 다시 적재하면 임시 파일에 쓴 뒤 교체 (읽는 쪽에서 반쯤 쓰인 파일을 보는 일 없음. 청크 단위로 나눠 써도 마지막에 한 번 교체)
+  임시 파일은 '.'으로 시작하는 이름 -> 쓰는 중이거나 중단돼서 남아 있어도 read_trades가 읽지 않음 (pyarrow dataset 기본 무시)
+- 읽을 때는 필터로 필요한 폴더·row group만 읽음 (partition pruning + 통계 기반 pushdown)
+pyarrow 필요 (없으면 parquet 저장만 사용 불가)
+create: 2026.10.18
+'''
+
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError: # pyarrow 없으면 parquet 저장 사용 안 함
+    pa = None
+
+PARTITION_COLUMNS = ['bas_ym', 'zip_code']
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError('parquet 저장에는 pyarrow가 필요함 (pip install pyarrow)')
+
+
+def _partition_dir(root: str, bas_ym: str, zip_code: str) -> str:
+    return os.path.join(root, 'bas_ym={}'.format(bas_ym), 'zip_code={}'.format(zip_code))
+
+
+def _partitioning():
+    # 폴더 이름 값은 문자열 그대로 (zip_code 앞자리 0, bas_ym 비교가 숫자로 바뀌지 않도록)
+    return ds.partitioning(pa.schema([('bas_ym', pa.string()), ('zip_code', pa.string())]), flavor='hive')
+
+
+### 파일 스키마 고정: 문자열·category 컬럼은 string으로
+# (청크·파티션마다 전부 null인 컬럼이나 category 크기에 따라 타입이 달라지지 않도록)
+def _to_table(data: pd.DataFrame):
+    data = data.drop(columns=[col for col in PARTITION_COLUMNS if col in data.columns])
+    text_cols = [col for col in data.columns if data[col].dtype == object or pd.api.types.is_string_dtype(data[col].dtype)
+                 or isinstance(data[col].dtype, pd.CategoricalDtype)]
+    data = data.astype({col: 'string' for col in text_cols})
+    return pa.Table.from_pandas(data, preserve_index=False)
+
+
+### 지역·계약월 파일 하나를 청크 단위로 쓰기 (pipeline용). close() 때 기존 파일과 교체, 작업이 실패하면 abort()
+# 파티션 컬럼(bas_ym, zip_code)은 폴더 이름에 있으므로 파일에서는 제외
+class PartitionWriter:
+    def __init__(self, root: str, bas_ym: str, zip_code: str, compression: str = 'zstd', row_group_size: int = 100000):
+        _require_pyarrow()
+        part_dir = _partition_dir(root, bas_ym, zip_code)
+        os.makedirs(part_dir, exist_ok=True)
+        self.path = os.path.join(part_dir, 'part-0.parquet')
+        self.tmp_path = os.path.join(part_dir, '.part-0.parquet.{}.tmp'.format(os.getpid()))
+        self.compression = compression
+        self.row_group_size = row_group_size
+        self.writer = None
+
+    def write(self, data: pd.DataFrame):
+        table = _to_table(data)
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.tmp_path, table.schema, compression=self.compression)
+        self.writer.write_table(table.cast(self.writer.schema), row_group_size=self.row_group_size)
+
+    ### 저장한 파일 경로 반환 (쓴 행이 없으면 None, 기존 파일 유지)
+    def close(self):
+        if self.writer is None:
+            return None
+        self.writer.close()
+        os.replace(self.tmp_path, self.path)
+        return self.path
+
+    ### 임시 파일 지우기 (기존 파일 유지)
+    def abort(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+### 지역·계약월 하나 저장 (이미 있으면 교체). 저장한 파일 경로 반환
+def write_partition(data: pd.DataFrame, root: str, bas_ym: str, zip_code: str,
+                    compression: str = 'zstd', row_group_size: int = 100000) -> str:
+    writer = PartitionWriter(root, bas_ym, zip_code, compression=compression, row_group_size=row_group_size)
+    try:
+        writer.write(data)
+    except Exception:
+        writer.abort()
+        raise
+    return writer.close()
+
+
+### 조회 (필터 조건에 맞는 폴더·row group만 읽음)
+# filters: [('bas_ym', '>=', '202301'), ('zip_code', 'in', ['11110', '11140']), ('deal_amount', '>', 100000)]
+# columns: 필요한 컬럼만 (None이면 전체)
+def read_trades(root: str, filters: list = None, columns: list = None) -> pd.DataFrame:
+    _require_pyarrow()
+    dataset = ds.dataset(root, format='parquet', partitioning=_partitioning())
+    expr = None
+    for col, op, value in filters or []:
+        cond = _expression(ds.field(col), op, value)
+        expr = cond if expr is None else expr & cond
+    return dataset.to_table(columns=columns, filter=expr).to_pandas()
+
+
+def _expression(field, op: str, value):
+    if op in ('=', '=='):
+        return field == value
+    if op == '!=':
+        return field != value
+    if op == '<':
+        return field < value
+    if op == '<=':
+        return field <= value
+    if op == '>':
+        return field > value
+    if op == '>=':
+        return field >= value
+    if op == 'in':
+        return field.isin(value)
+    if op == 'not in':
+        return ~field.isin(value)
+    raise ValueError('지원하지 않는 연산자: {}'.format(op))
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+'''
+계약월(bas_ym) 파티션 교체 적재 (write_mode='exchange')
+- apart는 bas_ym range 파티션 (월마다 하나. schema.py 007_partition_apart)
+- 한 달치를 파티션 없는 준비 테이블(apart_stage_YYYYMM)에 적재 -> 다 채워지면
+  alter table ... exchange partition으로 한 번에 교체 (행 단위 delete/insert 없이 메타데이터 변경만)
+  조회하는 쪽은 교체 전 월 전체 또는 교체 후 월 전체만 봄 (반쯤 적재된 월이 보이지 않음)
+- 준비 테이블에는 다시 적재하는 지역 행만 (지역 목록은 {준비 테이블}_regions. 적재 행이 없는 지역도 기록)
+  다시 적재하는 지역은 처음 쓸 때 준비 테이블에서 그 지역 행만 지우고 채움 (clear_stage_region)
+  교체 직전에 나머지 지역 행을 테이블에서 복사 (db 안에서 insert ... select)
+  -> 이번 실행 대상이 아닌 지역, 다른 적재 방식으로 적재된 지역의 행은 교체 시점의 값 그대로 남음
+     (준비 테이블을 만든 뒤에 들어온 행도 사라지지 않음)
+- 준비 테이블은 실제 테이블이라 backfill이 여러 날에 걸쳐도 이어서 채움 (지역이 다 적재된 월만 교체, 비우지 않음)
+- 교체는 월 단위라 나머지 지역 행 복사 비용이 있음 -> 한 월의 지역을 모아서 한 번에 교체 (지역 하나만이면 upsert가 빠름)
+- sqlite(벤치마크·테스트)는 파티션이 없어서 한 트랜잭션 안에서 다시 적재한 지역 delete + 준비 테이블 insert로 대신함
+create: 2026.10.18
+'''
+
+from datetime import datetime
+
+from sqlalchemy import text
+
+from planner import month_range
+
+EXCHANGE = 'exchange' # 적재 방식 이름 (bulk_writer WRITE_MODES와 같이 사용)
+OLD_PARTITION = 'p_old' # 첫 파티션 이전 월 전체
+MAX_PARTITION = 'p_max' # 마지막 파티션 이후 월 전체
+
+
+def partition_name(ym: str) -> str:
+    return 'p' + ym
+
+
+def stage_table(table: str, ym: str) -> str:
+    return '{}_stage_{}'.format(table, ym)
+
+
+### 준비 테이블에 다시 적재한 지역 목록 테이블
+def stage_regions_table(table: str, ym: str) -> str:
+    return '{}_regions'.format(stage_table(table, ym))
+
+
+def next_month(ym: str) -> str:
+    year, month = int(ym[:4]), int(ym[4:])
+    return '{:04d}{:02d}'.format(year + month // 12, month % 12 + 1)
+
+
+def prev_month(ym: str) -> str:
+    year, month = int(ym[:4]), int(ym[4:])
+    return '{:04d}{:02d}'.format(year - (month == 1), 12 if month == 1 else month - 1)
+
+
+def is_mysql(db) -> bool:
+    return db.dialect.name == 'mysql'
+
+
+def partition_sql(ym: str) -> str:
+    return "partition {} values less than ('{}')".format(partition_name(ym), next_month(ym))
+
+
+### 파티션 정의 sql (start_ym ~ end_ym 월마다 하나 + 앞뒤 나머지)
+def partition_clause(start_ym: str, end_ym: str) -> str:
+    parts = ["partition {} values less than ('{}')".format(OLD_PARTITION, start_ym)]
+    parts += [partition_sql(ym) for ym in month_range(start_ym, end_ym)]
+    parts.append('partition {} values less than (maxvalue)'.format(MAX_PARTITION))
+    return 'partition by range columns (bas_ym) (\n    {}\n)'.format(',\n    '.join(parts))
+
+
+### 테이블의 월 파티션 목록 (파티션 없으면 빈 list)
+def partitions(db, table: str) -> list:
+    rows = db.fetchall('''
+        select partition_name from information_schema.partitions
+        where table_schema = database() and table_name = :table and partition_name is not null
+        order by partition_ordinal_position
+    ''', table=table)
+    return [name[1:] for name, in rows if name not in (OLD_PARTITION, MAX_PARTITION)]
+
+
+### 기존 테이블을 bas_ym 파티션으로 변경 (pk에 bas_ym 포함 필요). 있는 월마다 하나, 이후 월은 적재할 때 추가
+def partition_table(db, table: str = 'apart'):
+    start_ym, end_ym = db.fetchall('select min(bas_ym), max(bas_ym) from {}'.format(table))[0]
+    if start_ym is None: # 빈 테이블은 이번 달 하나로 시작
+        start_ym = end_ym = datetime.today().strftime('%Y%m')
+    db.execute('alter table {} {}'.format(table, partition_clause(start_ym, end_ym)))
+
+
+### ym 월 파티션이 없으면 만들기 (마지막 이후면 p_max, 첫 파티션 이전이면 p_old를 나눔)
+def ensure_partition(db, table: str, ym: str):
+    months = partitions(db, table)
+    if ym in months:
+        return
+    if not months:
+        raise ValueError('{} 테이블에 계약월 파티션 없음 (schema.py 007_partition_apart 적용 필요)'.format(table))
+    if ym > months[-1]:
+        new = month_range(next_month(months[-1]), ym)
+        db.execute('alter table {} reorganize partition {} into ({}, partition {} values less than (maxvalue))'.format(
+            table, MAX_PARTITION, ', '.join(partition_sql(month) for month in new), MAX_PARTITION))
+    else:
+        new = month_range(ym, prev_month(months[0]))
+        db.execute("alter table {} reorganize partition {} into (partition {} values less than ('{}'), {})".format(
+            table, OLD_PARTITION, OLD_PARTITION, ym, ', '.join(partition_sql(month) for month in new)))
+
+
+def stage_exists(db, table: str, ym: str) -> bool:
+    stage = stage_table(table, ym)
+    if is_mysql(db):
+        sql = 'select count(*) from information_schema.tables where table_schema = database() and table_name = :name'
+    else:
+        sql = "select count(*) from sqlite_master where type = 'table' and name = :name"
+    return db.fetchall(sql, name=stage)[0][0] > 0
+
+
+### 빈 준비 테이블 + 지역 목록 테이블 만들기 (이미 있으면 그대로 -> 이전 실행에서 채운 지역 유지)
+# mysql: 같은 구조(생성 컬럼, 인덱스 포함) + 파티션 제거 (exchange partition 조건)
+# sqlite: 같은 컬럼 + upsert용 trade_key unique
+def create_stage(db, table: str, ym: str) -> str:
+    stage = stage_table(table, ym)
+    db.execute('create table if not exists {} (zip_code varchar(10) primary key)'.format(stage_regions_table(table, ym)))
+    if stage_exists(db, table, ym):
+        return stage
+    if is_mysql(db):
+        db.execute('create table {} like {}'.format(stage, table))
+        if partitions(db, stage):
+            db.execute('alter table {} remove partitioning'.format(stage))
+    else:
+        db.execute('create table {} as select * from {} where 0'.format(stage, table))
+        db.execute('create unique index idx_{0}_trade_key on {0} (trade_key)'.format(stage))
+    return stage
+
+
+### 적재할 수 있는 컬럼 (생성 컬럼 bas_ym 제외)
+def stage_columns(db, stage: str) -> list:
+    with db.connect() as conn:
+        cols = list(conn.execute(text('select * from {} where 1 = 0'.format(stage))).keys())
+    return [col for col in cols if col != 'bas_ym']
+
+
+### 다시 적재하는 지역: 지역 목록에 추가 + 준비 테이블에서 그 지역 행 지우기 (이후 적재한 행으로 채움)
+# 목록에 있는 지역은 교체 때 준비 테이블 행으로 바뀜 (없어진 거래는 같이 없어짐). 준비 테이블이 없으면 만들기. 지운 행 수 반환
+def clear_stage_region(db, table: str, ym: str, zip_code: str) -> int:
+    stage = create_stage(db, table, ym)
+    regions = stage_regions_table(table, ym)
+    if not db.fetchall('select 1 from {} where zip_code = :zip_code'.format(regions), zip_code=zip_code):
+        db.execute('insert into {} (zip_code) values (:zip_code)'.format(regions), zip_code=zip_code)
+    return db.execute('delete from {} where zip_code = :zip_code'.format(stage), zip_code=zip_code)
+
+
+### 준비 테이블 -> 월 파티션 교체. 교체된 이전 데이터(준비 테이블 쪽)와 지역 목록은 삭제. 교체 후 월 행 수 반환
+# mysql: 다시 적재하지 않은 지역 행을 교체 직전에 준비 테이블로 복사 (그 사이 테이블에 들어온 행도 포함)
+# sqlite: 다시 적재한 지역만 delete + insert
+def exchange(db, table: str, ym: str) -> int:
+    stage = stage_table(table, ym)
+    regions = stage_regions_table(table, ym)
+    cols = ', '.join(stage_columns(db, stage))
+    if is_mysql(db):
+        ensure_partition(db, table, ym)
+        db.execute('''
+            insert into {0} ({1}) select {1} from {2}
+            where bas_ym = :ym and zip_code not in (select zip_code from {3})
+        '''.format(stage, cols, table, regions), ym=ym)
+        rows = db.fetchall('select count(*) from {}'.format(stage))[0][0]
+        # 준비 테이블의 bas_ym이 모두 이 월인지 검사 (with validation, 기본값)
+        db.execute('alter table {} exchange partition {} with table {}'.format(table, partition_name(ym), stage))
+    else:
+        with db.connect() as conn:
+            conn.execute(text('delete from {} where bas_ym = :ym and zip_code in (select zip_code from {})'.format(
+                table, regions)), {'ym': ym})
+            conn.execute(text('insert into {0} ({1}) select {1} from {2}'.format(table, cols, stage)))
+            conn.commit()
+        rows = db.fetchall('select count(*) from {} where bas_ym = :ym'.format(table), ym=ym)[0][0]
+    db.execute('drop table {}'.format(stage))
+    db.execute('drop table {}'.format(regions))
+    return rows
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+'''
+청크 단위 적재 파이프라인 (메모리 사용량 일정하게)
+수집(요청+파싱) -> 전처리 -> 적재 단계를 스레드로 나누고, 단계 사이는 크기 제한 있는 큐로 연결
+- 한 지역·계약월 전체를 모으지 않고 페이지(청크) 단위로 흘려보냄
+- 뒤 단계가 느리면 큐가 차서 앞 단계가 기다림 (backpressure) -> 메모리에는 큐 크기만큼의 청크만 존재
+- 기간·지역 크기와 관계없이 최대 메모리 일정
+create: 2026.10.18
+'''
+
+import queue
+import threading
+
+CHUNK_ROWS = 2000 # 전처리·적재 청크 크기 (페이지를 이만큼 합쳐서. coalesce)
+PREFETCH_PAGES = 4 # 수집 단계가 미리 받아 두는 페이지 수 (fetcher.iter_pages window)
+
+_JOB_END = object() # 작업(지역·계약월) 하나의 청크가 끝났다는 표시
+_STOP = object() # 전체 종료 표시
+
+
+class _Failed:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+### 작은 청크(페이지)를 rows행 이상이 될 때까지 합쳐서 반환 ({컬럼: list})
+# 페이지마다 전처리·적재하면 호출당 고정 비용(컬럼별 pandas 처리, insert 문)이 페이지 수만큼 -> 일정 크기로 묶음
+# 메모리는 rows행 + 페이지 하나 정도로 지역 크기와 관계없이 일정
+def coalesce(chunks, rows: int):
+    data = None
+    for chunk in chunks:
+        if data is None:
+            data = chunk
+        else:
+            for col, values in chunk.items():
+                data[col].extend(values)
+        if len(next(iter(data.values()), [])) >= rows:
+            yield data
+            data = None
+    if data is not None:
+        yield data
+
+
+### 파이프라인 실행. 작업 하나의 모든 청크 적재가 끝날 때마다 (job, 적재 행 수) 반환
+# fetch_chunks(job): 청크({컬럼: list}) generator (워커 스레드)
+# transform(job, chunk, state) -> DataFrame 또는 None (워커 스레드). state는 작업마다 새 dict (청크 간 이어지는 값 보관용)
+# write(job, data): 적재 (호출한 스레드). finish(job): 작업 마지막 청크 적재 후 호출 (선택)
+# 앞 단계에서 난 예외는 그 전까지의 청크를 모두 적재한 뒤 여기서 다시 발생
+def run_pipeline(jobs, fetch_chunks, transform, write, finish=None, queue_size: int = 1):
+    fetched = queue.Queue(maxsize=queue_size)
+    transformed = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+
+    # 큐가 차 있으면 기다리되, 중간에 종료되면 포기
+    def put(q, item):
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(q):
+        while not stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return None, _STOP
+
+    def fetch_stage():
+        try:
+            for job in jobs:
+                for chunk in fetch_chunks(job):
+                    if not put(fetched, (job, chunk)):
+                        return
+                if not put(fetched, (job, _JOB_END)):
+                    return
+            put(fetched, (None, _STOP))
+        except BaseException as e:
+            put(fetched, (None, _Failed(e)))
+
+    def transform_stage():
+        state = {}
+        while True:
+            job, chunk = get(fetched)
+            if chunk is _STOP or isinstance(chunk, _Failed):
+                put(transformed, (job, chunk))
+                return
+            if chunk is _JOB_END:
+                state = {}
+                if not put(transformed, (job, chunk)):
+                    return
+                continue
+            try:
+                data = transform(job, chunk, state)
+            except BaseException as e:
+                put(transformed, (job, _Failed(e)))
+                return
+            if data is not None and not put(transformed, (job, data)):
+                return
+
+    threads = [threading.Thread(target=fetch_stage, daemon=True), threading.Thread(target=transform_stage, daemon=True)]
+    for thread in threads:
+        thread.start()
+
+    rows = 0
+    try:
+        while True:
+            job, data = transformed.get()
+            if data is _STOP:
+                break
+            if isinstance(data, _Failed):
+                raise data.error
+            if data is _JOB_END:
+                if finish is not None:
+                    finish(job)
+                yield job, rows
+                rows = 0
+                continue
+            if data.shape[0] > 0:
+                write(job, data)
+                rows += data.shape[0]
+    finally:
+        # 호출한 쪽이 중간에 멈추거나 예외가 나면 앞 단계도 정리
+        stop.set()
+        for q in (fetched, transformed):
+            try:
+                while True:
+                    q.get_nowait()
+            except queue.Empty:
+                pass
+        for thread in threads:
+            thread.join(timeout=5)
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+'''
+api 일일 할당량 기준 backfill 계획
+- 기간 x 지역 전체 작업 목록 생성, 우선순위 정렬 (최근 월 먼저, 거래 많은 지역 먼저)
+- 서비스키별 하루 사용량 기록 (로컬 sqlite) -> 할당량만큼만 쓰고 정상 종료, 다음 실행 때 이어서
+create: 2026.10.18
+'''
+
+import hashlib
+import math
+import sqlite3
+import threading
+from datetime import date
+
+from xml_parser import QuotaExceeded
+
+DAILY_LIMIT = 1000 # 개발계정 일일 트래픽
+MAX_PAGE_SIZE = 1000 # 한 번에 요청할 최대 행 수 (이보다 많으면 페이지 나눠서 동시 요청)
+MIN_PAGE_SIZE = 100
+
+
+### 모든 서비스키의 오늘 할당량 소진
+class QuotaExhausted(Exception):
+    pass
+
+
+### 'YYYYMM' ~ 'YYYYMM' 월 목록 (양 끝 포함)
+def month_range(start_ym: str, end_ym: str) -> list:
+    year, month = int(start_ym[:4]), int(start_ym[4:])
+    months = []
+    while '{}{:02d}'.format(year, month) <= end_ym:
+        months.append('{}{:02d}'.format(year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+### 작업 목록 (code, name, ym) 우선순위 정렬
+# 최근 월 먼저 -> 같은 월 안에서는 과거 거래량(volumes: {code: 평균 행 수}) 많은 지역 먼저
+def plan_jobs(regions: list, months: list, volumes: dict = None) -> list:
+    volumes = volumes or {}
+    jobs = [(code, name, ym) for code, name in regions for ym in months]
+    return sorted(jobs, key=lambda job: (job[2], volumes.get(job[0], 0)), reverse=True)
+
+
+### 지역 과거 평균 행 수 기준 페이지 크기
+# 작은 지역은 한 번에 다 받을 만큼만 (여유 20%), 큰 지역은 MAX_PAGE_SIZE로 나눠서. 기록 없으면 MAX_PAGE_SIZE
+def page_size_for(volume: float = None) -> int:
+    if not volume:
+        return MAX_PAGE_SIZE
+    size = math.ceil(volume * 1.2 / MIN_PAGE_SIZE) * MIN_PAGE_SIZE
+    return min(max(size, MIN_PAGE_SIZE), MAX_PAGE_SIZE)
+
+
+### 지역·계약월 하나의 예상 api 호출 수 (페이지 수. 과거 평균 행 수 + 여유 20% 기준, 기록 없으면 1회)
+def page_calls(volume: float = None) -> int:
+    if not volume:
+        return 1
+    return max(math.ceil(volume * 1.2 / page_size_for(volume)), 1)
+
+
+### 작업 목록 [(code, name, ym)] 전체의 예상 api 호출 수
+def calls_needed(jobs: list, volumes: dict = None) -> int:
+    volumes = volumes or {}
+    return sum(page_calls(volumes.get(code)) for code, name, ym in jobs)
+
+
+### 남은 호출을 끝내는 데 필요한 일수 (키 수 x 일일 할당량 기준, 오늘 남은 양 먼저 사용)
+# n_calls: 작업 수가 아니라 호출 수 (calls_needed. 행이 많은 지역은 페이지 수만큼 호출)
+def days_needed(n_calls: int, remaining_today: int, n_keys: int, daily_limit: int = DAILY_LIMIT) -> int:
+    if n_calls <= remaining_today:
+        return 1 if n_calls else 0
+    return 1 + math.ceil((n_calls - remaining_today) / (n_keys * daily_limit))
+
+
+class QuotaTracker:
+    # keys: 서비스키 목록. 키 원문 대신 해시 앞자리로 기록
+    def __init__(self, path: str, keys: list, daily_limit: int = DAILY_LIMIT):
+        self.keys = list(keys)
+        self.daily_limit = daily_limit
+        self.lock = threading.Lock()
+        self.reserve_lock = threading.Lock() # 키 고르기 + 기록을 한 번에 (페이지 요청 스레드가 같이 사용)
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute('''
+            create table if not exists api_usage (
+                key_id text not null,
+                use_date text not null,
+                calls integer not null,
+                primary key (key_id, use_date)
+            )
+        ''')
+
+    def key_id(self, key: str) -> str:
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()[:10]
+
+    def _today(self) -> str:
+        return date.today().strftime('%Y%m%d')
+
+    def used(self, key: str) -> int:
+        with self.lock:
+            row = self.conn.execute('select calls from api_usage where key_id = ? and use_date = ?',
+                                    (self.key_id(key), self._today())).fetchone()
+        return row[0] if row else 0
+
+    def remaining(self, key: str) -> int:
+        return max(self.daily_limit - self.used(key), 0)
+
+    def remaining_total(self) -> int:
+        return sum(self.remaining(key) for key in self.keys)
+
+    ### 호출 1회 기록
+    def spend(self, key: str, calls: int = 1):
+        with self.lock:
+            self.conn.execute('''
+                insert into api_usage (key_id, use_date, calls) values (?, ?, ?)
+                on conflict (key_id, use_date) do update set calls = calls + excluded.calls
+            ''', (self.key_id(key), self._today(), calls))
+
+    ### 서버가 요청 횟수 초과 응답을 주면 오늘은 이 키 사용 안 함
+    def exhaust(self, key: str):
+        with self.lock:
+            self.conn.execute('''
+                insert into api_usage (key_id, use_date, calls) values (?, ?, ?)
+                on conflict (key_id, use_date) do update set calls = max(calls, excluded.calls)
+            ''', (self.key_id(key), self._today(), self.daily_limit))
+
+    ### 할당량 남은 키 하나를 골라서 호출 1회 기록. 없으면 None
+    # 여러 스레드가 동시에 골라도 남은 양보다 많이 쓰지 않도록 고르기와 기록을 lock 안에서
+    def reserve(self):
+        with self.reserve_lock:
+            key = self.pick()
+            if key is not None:
+                self.spend(key)
+        return key
+
+    ### 할당량 남은 키로 요청 하나 실행. request(key)가 QuotaExceeded를 내면 그 키는 오늘 사용 중지하고 다른 키로
+    # 모든 키 소진 시 QuotaExhausted. 재시도(api_client)는 request 안에서 spend(key)로 따로 기록
+    def call(self, request):
+        while True:
+            key = self.reserve()
+            if key is None:
+                raise QuotaExhausted()
+            try:
+                return request(key)
+            except QuotaExceeded:
+                print('api 요청 횟수 초과 ({})'.format(self.key_id(key)))
+                self.exhaust(key)
+
+    ### 남은 할당량이 가장 많은 키 (없으면 None)
+    def pick(self):
+        best = max(self.keys, key=self.remaining, default=None)
+        if best is None or self.remaining(best) == 0:
+            return None
+        return best
+
+    def summary(self) -> str:
+        return 'api 할당량 ' + ', '.join('{}: {}/{}'.format(self.key_id(key), self.used(key), self.daily_limit)
+                                       for key in self.keys)
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+'''
+apart 조회 모음 (내부 도구용). 직접 sql 작성 대신 사용
+- 단지별 가격 이력 (reg_no = aptSeq), 동별 최근 거래, 면적·층·건축년도가 비슷한 거래(비교 사례)
+- 조회마다 맞는 인덱스 사용 (schema.py 006_query_indexes. explain 확인은 python schema.py --check)
+- 차원 테이블로 적재하면(--dimensions) apart 대신 apart_fact_v 조회 (같은 컬럼)
+- 결과는 프로세스 안 LRU 캐시 (개수·유효 시간 제한). 새로 적재되면(max(load_dh) 변경) 캐시 전체 비움
+  max(load_dh)는 load_dh 인덱스로 바로 읽고, 매 조회가 아니라 check_seconds마다 한 번만 확인
+실행: python queries.py history <reg_no> | recent <zip_code> <dong> | comps <zip_code> <size> [--floor 10 --build-year 2005]
+create: 2026.10.18
+'''
+
+import argparse
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import pandas as pd
+
+TRADE_COLUMNS = ['zip_code', 'dong', 'reg_no', 'apartment_name', 'apartment_dong', 'bas_dt', 'deal_amount', 'size',
+                 'floor', 'build_year', 'cancel_deal_yn']
+
+# 해제된 거래 제외 (include_cancelled=False)
+NOT_CANCELLED = "(cancel_deal_yn is null or cancel_deal_yn <> '1')"
+
+### 단지별 가격 이력: (reg_no, bas_dt) 인덱스
+HISTORY_SQL = '''
+    select {cols} from {table}
+    where reg_no = :reg_no and bas_dt >= :start_dt and bas_dt <= :end_dt{cancel}
+    order by bas_dt, no
+'''
+
+### 동별 최근 거래: (zip_code, dong, bas_dt) 인덱스 역순으로 limit까지만
+RECENT_SQL = '''
+    select {cols} from {table}
+    where zip_code = :zip_code and dong = :dong and bas_dt >= :start_dt{cancel}
+    order by bas_dt desc
+    limit :limit
+'''
+
+### 비교 사례: (zip_code, size) 인덱스로 면적 범위만 읽은 뒤 계약일·층·건축년도 조건
+# build_year는 문자열 컬럼 (4자리라 문자열 비교로 범위 조건 가능)
+COMPS_SQL = '''
+    select {cols} from {table}
+    where zip_code = :zip_code and size between :size_min and :size_max and bas_dt >= :start_dt
+    {conds}{cancel}
+    order by bas_dt desc
+    limit :limit
+'''
+
+# 캐시 무효화 기준 (load_dh 인덱스)
+STAMP_SQL = 'select max(load_dh) from {table}'
+
+# (인덱스 이름, 컬럼). schema.py 006_query_indexes
+QUERY_INDEXES = [
+    ('idx_apart_reg_dt', 'reg_no, bas_dt'),
+    ('idx_apart_zip_dong_dt', 'zip_code, dong, bas_dt'),
+    ('idx_apart_zip_size', 'zip_code, size'),
+    ('idx_apart_load_dh', 'load_dh'),
+]
+
+
+def months_ago(months: int, today: datetime = None) -> str:
+    today = today or datetime.today()
+    year, month = divmod(today.year * 12 + today.month - 1 - months, 12)
+    return '{:04d}{:02d}01'.format(year, month + 1)
+
+
+### 조회 결과 LRU 캐시 (유효 시간 ttl초, 최대 maxsize개). 스레드 공용
+class QueryCache:
+    def __init__(self, maxsize: int = 256, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.items = OrderedDict() # key -> (저장 시각, 결과)
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0, 'evicted': 0, 'invalidated': 0}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.items.get(key)
+            if item is not None and time.monotonic() - item[0] > self.ttl:
+                del self.items[key]
+                self.stats['expired'] += 1
+                item = None
+            if item is None:
+                self.stats['misses'] += 1
+                return None
+            self.items.move_to_end(key)
+            self.stats['hits'] += 1
+            return item[1]
+
+    def put(self, key, value):
+        with self.lock:
+            self.items[key] = (time.monotonic(), value)
+            self.items.move_to_end(key)
+            while len(self.items) > self.maxsize:
+                self.items.popitem(last=False)
+                self.stats['evicted'] += 1
+
+    def clear(self):
+        with self.lock:
+            if self.items:
+                self.stats['invalidated'] += 1
+            self.items.clear()
+
+    def summary(self) -> str:
+        with self.lock:
+            return '조회 캐시: {}개, hit {hits}, miss {misses}, 만료 {expired}, 밀려남 {evicted}, 무효화 {invalidated}'.format(
+                len(self.items), **self.stats)
+
+
+class Queries:
+    # check_seconds: max(load_dh) 확인 주기 (0이면 조회마다 확인)
+    # table: 조회할 테이블 (차원 테이블로 적재하면 apart_fact_v). stamp_table: max(load_dh) 확인할 테이블 (없으면 table)
+    # view는 join 때문에 load_dh 인덱스를 못 쓰므로 apart_fact_v 조회면 stamp_table='apart_fact'
+    def __init__(self, db, maxsize: int = 256, ttl: float = 300, check_seconds: float = 10, table: str = 'apart',
+                 stamp_table: str = None):
+        self.db = db
+        self.table = table
+        self.stamp_table = stamp_table or table
+        self.cache = QueryCache(maxsize, ttl)
+        self.check_seconds = check_seconds
+        self.stamp = None
+        self.checked = None
+        self.lock = threading.Lock()
+
+    ### 새로 적재됐으면 캐시 비우기
+    def _check_stamp(self):
+        with self.lock:
+            now = time.monotonic()
+            if self.checked is not None and now - self.checked < self.check_seconds:
+                return
+            self.checked = now
+            stamp = self.db.fetchall(STAMP_SQL.format(table=self.stamp_table))[0][0]
+            if stamp != self.stamp:
+                self.cache.clear()
+                self.stamp = stamp
+
+    ### 캐시에 없으면 조회. 호출한 쪽에서 바꿔도 캐시가 안 바뀌도록 복사본 반환
+    def _query(self, key: tuple, sql: str, params: dict) -> pd.DataFrame:
+        self._check_stamp()
+        result = self.cache.get(key)
+        if result is None:
+            result = pd.DataFrame(self.db.fetchall(sql, **params), columns=TRADE_COLUMNS)
+            self.cache.put(key, result)
+        return result.copy()
+
+    def _format(self, sql: str, include_cancelled: bool, conds: str = '') -> str:
+        return sql.format(table=self.table, cols=', '.join(TRADE_COLUMNS), conds=conds,
+                          cancel='' if include_cancelled else ' and ' + NOT_CANCELLED)
+
+    ### 단지 가격 이력 (계약일 순). start_ym, end_ym: YYYYMM (없으면 전체 기간)
+    def price_history(self, reg_no: str, start_ym: str = None, end_ym: str = None,
+                      include_cancelled: bool = False) -> pd.DataFrame:
+        params = {'reg_no': reg_no, 'start_dt': (start_ym or '000000') + '00', 'end_dt': (end_ym or '999999') + '99'}
+        sql = self._format(HISTORY_SQL, include_cancelled)
+        return self._query(('history', reg_no, start_ym, end_ym, include_cancelled), sql, params)
+
+    ### 동별 최근 거래 (최근 months개월, 최신순 limit건)
+    def recent_trades(self, zip_code: str, dong: str, months: int = 3, limit: int = 100,
+                      include_cancelled: bool = False) -> pd.DataFrame:
+        params = {'zip_code': zip_code, 'dong': dong, 'start_dt': months_ago(months), 'limit': limit}
+        sql = self._format(RECENT_SQL, include_cancelled)
+        return self._query(('recent', zip_code, dong, params['start_dt'], limit, include_cancelled), sql, params)
+
+    ### 비교 사례: 같은 지역, 전용면적 ±size_tol 비율, 층 ±floor_tol, 건축년도 ±year_tol (없으면 조건 없음)
+    def comparables(self, zip_code: str, size: float, floor: int = None, build_year: int = None,
+                    size_tol: float = 0.1, floor_tol: int = 5, year_tol: int = 5, months: int = 12,
+                    limit: int = 50, include_cancelled: bool = False) -> pd.DataFrame:
+        params = {'zip_code': zip_code, 'size_min': size * (1 - size_tol), 'size_max': size * (1 + size_tol),
+                  'start_dt': months_ago(months), 'limit': limit}
+        conds = ''
+        if floor is not None:
+            conds += ' and floor between :floor_min and :floor_max'
+            params.update({'floor_min': floor - floor_tol, 'floor_max': floor + floor_tol})
+        if build_year is not None:
+            conds += ' and build_year between :year_min and :year_max'
+            params.update({'year_min': str(build_year - year_tol), 'year_max': str(build_year + year_tol)})
+        sql = self._format(COMPS_SQL, include_cancelled, conds)
+        key = ('comps', zip_code, size, floor, build_year, size_tol, floor_tol, year_tol, params['start_dt'], limit, include_cancelled)
+        return self._query(key, sql, params)
+
+    def summary(self) -> str:
+        return self.cache.summary()
+
+
+if __name__ == '__main__':
+    from context import Context
+
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest='command', required=True)
+    history = sub.add_parser('history', help='단지 가격 이력')
+    history.add_argument('reg_no')
+    history.add_argument('--start', default=None, help='시작 계약월 YYYYMM')
+    history.add_argument('--end', default=None, help='종료 계약월 YYYYMM')
+    recent = sub.add_parser('recent', help='동별 최근 거래')
+    recent.add_argument('zip_code')
+    recent.add_argument('dong')
+    recent.add_argument('--months', type=int, default=3)
+    comps = sub.add_parser('comps', help='비교 사례')
+    comps.add_argument('zip_code')
+    comps.add_argument('size', type=float)
+    comps.add_argument('--floor', type=int, default=None)
+    comps.add_argument('--build-year', type=int, default=None)
+    parser.add_argument('--dimensions', action='store_true', help='apart 대신 apart_fact_v 조회 (차원 테이블로 적재한 경우)')
+    args = parser.parse_args()
+
+    ctx = Context()
+    if args.dimensions:
+        from dimensions import FACT_TABLE, FACT_VIEW
+        queries = Queries(ctx.db, table=FACT_VIEW, stamp_table=FACT_TABLE)
+    else:
+        queries = ctx.queries
+    if args.command == 'history':
+        result = queries.price_history(args.reg_no, args.start, args.end)
+    elif args.command == 'recent':
+        result = queries.recent_trades(args.zip_code, args.dong, args.months)
+    else:
+        result = queries.comparables(args.zip_code, args.size, args.floor, args.build_year)
+    print(result.to_string(index=False))
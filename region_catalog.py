@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+'''
+수집 대상 지역 목록 + 지역·계약월별 행 수 기록 (로컬 sqlite)
+- 지역 목록은 db zip_code 테이블(또는 법정동코드 파일)에서 가져와 로컬에 저장. max_age_days 지나야 다시 조회
+  내용 해시(version)가 바뀔 때만 교체
+- 시 -> 구 관계 (수원시 41110 -> 장안구 41111 등): 구가 있는 시는 api에서 구 단위로만 데이터 제공 (api_data_yn = '0')
+- 지역·계약월별 적재 행 수 -> 페이지 크기(planner.page_size_for), 거래 많은 지역 먼저 수집(planner.plan_jobs)
+  처음에는 요약 테이블(apart_rollup)에서 한 번에 가져오고, 이후 적재할 때마다 기록
+- 거래가 없는 지역(옹진군 등)은 요청하지 않음 (최근 기록이 모두 0행이거나 KNOWN_EMPTY)
+  기록으로 판단한 빈 지역은 EMPTY_RECHECK_DAYS 지나면 다시 요청 (거래가 다시 생겼는지 확인)
+실행: python region_catalog.py [--refresh] [--csv zip_code.txt]
+create: 2026.10.18
+'''
+
+import argparse
+import hashlib
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from rollup import month_counts
+
+# 데이터셋(적재 테이블)별 거래가 없는 지역 (응답은 정상이지만 항상 0건)
+KNOWN_EMPTY = {'apart': {'28720': '옹진군'}}
+EMPTY_MONTHS = 12 # 최근 기록이 이만큼 있고 모두 0행이면 빈 지역
+EMPTY_RECHECK_DAYS = 90 # 빈 지역 판단 유효 기간. 마지막 기록이 이보다 오래되면 다시 수집 대상 (KNOWN_EMPTY는 해당 없음)
+VOLUME_MONTHS = 12 # 평균 행 수 계산 기간 (최근 기록 기준)
+
+ZIP_CODE_SQL = 'select code, name, api_data_yn from zip_code'
+
+
+### 법정동코드 파일(행정표준코드관리시스템 전체 자료) -> [(code, name, api_data_yn)]
+# 존재하는 시/군/구만 (5자리). 시/도는 제외, 하위 구가 있는 시는 api_data_yn = '0'
+def legal_code_regions(data_frame: pd.DataFrame) -> list:
+    zips = data_frame.copy()
+    zips['법정동코드'] = zips['법정동코드'].astype(str)
+    zips = zips[(zips['폐지여부'] == '존재') & (zips['법정동코드'].str[5:] == '00000')]
+    codes = dict(zip(zips['법정동코드'].str[:5], zips['법정동명']))
+    codes = {code: name for code, name in codes.items() if code[2:] != '000'}
+    parents = {parent_code(code, codes) for code in codes} - {None}
+    return [(code, name, '0' if code in parents else '1') for code, name in sorted(codes.items())]
+
+
+### 구의 상위 시 코드 (끝자리만 0으로 바꾼 코드가 목록에 있으면). 없으면 None
+def parent_code(code: str, codes) -> str:
+    parent = code[:4] + '0'
+    return parent if parent != code and parent in codes else None
+
+
+class RegionCatalog:
+    def __init__(self, path: str):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute('pragma journal_mode=wal')
+        self.conn.execute('''
+            create table if not exists regions (
+                code text primary key,
+                name text not null,
+                parent text,
+                api_data_yn text not null
+            )
+        ''')
+        self.conn.execute('''
+            create table if not exists volumes (
+                dataset text not null,
+                code text not null,
+                ym text not null,
+                rows integer not null,
+                updated_dh text not null,
+                primary key (dataset, code, ym)
+            )
+        ''')
+        self.conn.execute('create table if not exists meta (key text primary key, value text)')
+
+    def _now(self) -> str:
+        return datetime.now().strftime('%Y%m%d%H%M%S')
+
+    def _meta(self, key: str) -> str:
+        row = self.conn.execute('select value from meta where key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str):
+        self.conn.execute('insert or replace into meta (key, value) values (?, ?)', (key, value))
+
+    @property
+    def version(self) -> str:
+        with self.lock:
+            return self._meta('version')
+
+    @staticmethod
+    def make_version(rows: list) -> str:
+        body = '\n'.join('\t'.join(str(value) for value in row) for row in sorted(rows))
+        return hashlib.sha1(body.encode('utf-8')).hexdigest()[:12]
+
+    ### 지역 목록 교체 (내용이 같으면 그대로). 바뀌었으면 True
+    def replace(self, rows: list) -> bool:
+        rows = [(code, name, api_data_yn or '1') for code, name, api_data_yn in rows]
+        version = self.make_version(rows)
+        codes = {code for code, _, _ in rows}
+        with self.lock:
+            self._set_meta('synced_dh', self._now())
+            if version == self._meta('version'):
+                return False
+            self.conn.execute('begin')
+            self.conn.execute('delete from regions')
+            self.conn.executemany('insert into regions (code, name, parent, api_data_yn) values (?, ?, ?, ?)',
+                                  [(code, name, parent_code(code, codes), yn) for code, name, yn in rows])
+            self._set_meta('version', version)
+            self.conn.execute('commit')
+        return True
+
+    ### max_age_days 지났거나 비어 있으면 db에서 다시 가져오기 (지역 목록 + 요약 테이블의 지역·계약월 행 수)
+    def sync(self, db, max_age_days: float = 7, force: bool = False) -> bool:
+        with self.lock:
+            synced = self._meta('synced_dh')
+        stale = synced is None or datetime.strptime(synced, '%Y%m%d%H%M%S') < datetime.now() - timedelta(days=max_age_days)
+        if not (force or stale):
+            return False
+        changed = self.replace(db.fetchall(ZIP_CODE_SQL))
+        self.record_many('apart', [(code, ym, rows) for (code, ym), rows in month_counts(db).items()])
+        return changed
+
+    ### 지역·계약월 적재 행 수 기록 (dataset: 적재 테이블. apart_old도 apart)
+    def record(self, dataset: str, code: str, ym: str, rows: int):
+        self.record_many(dataset, [(code, ym, rows)])
+
+    def record_many(self, dataset: str, rows: list):
+        now = self._now()
+        with self.lock:
+            self.conn.executemany('insert or replace into volumes (dataset, code, ym, rows, updated_dh) values (?, ?, ?, ?, ?)',
+                                  [(dataset, code, ym, int(n), now) for code, ym, n in rows])
+
+    ### 지역별 최근 months개월(기록 기준) 평균 행 수 {code: 평균}
+    def volumes(self, dataset: str = 'apart', months: int = VOLUME_MONTHS) -> dict:
+        with self.lock:
+            rows = self.conn.execute('''
+                select code, avg(rows) from (
+                    select code, rows, row_number() over (partition by code order by ym desc) rn
+                    from volumes where dataset = ?
+                ) where rn <= ? group by code
+            ''', (dataset, months)).fetchall()
+        return dict(rows)
+
+    ### 거래 없는 지역: KNOWN_EMPTY + 최근 EMPTY_MONTHS개월 기록이 모두 0행이고 recheck_days 안에 기록된 지역
+    # 빈 지역은 요청하지 않아 새 기록이 안 생기므로, 기록이 오래되면 빈 지역에서 빼서 한 번 다시 수집
+    # -> 다시 0행이면 기록이 갱신되어 빈 지역, 거래가 생겼으면 0보다 큰 기록이 남아 계속 수집
+    def empty_codes(self, dataset: str = 'apart', recheck_days: float = EMPTY_RECHECK_DAYS) -> set:
+        since = (datetime.now() - timedelta(days=recheck_days)).strftime('%Y%m%d%H%M%S')
+        with self.lock:
+            rows = self.conn.execute('''
+                select code from (
+                    select code, rows, updated_dh, row_number() over (partition by code order by ym desc) rn
+                    from volumes where dataset = ?
+                ) where rn <= ? group by code having count(*) >= ? and max(rows) = 0 and max(updated_dh) >= ?
+            ''', (dataset, EMPTY_MONTHS, EMPTY_MONTHS, since)).fetchall()
+        return {code for code, in rows} | set(KNOWN_EMPTY.get(dataset, {}))
+
+    ### 수집 대상 [(code, name)]: api 제공 지역(하위 구가 있는 시 제외), 빈 지역 제외 (include_empty=True면 포함)
+    def regions(self, dataset: str = 'apart', include_empty: bool = False) -> list:
+        with self.lock:
+            rows = self.conn.execute("select code, name from regions where api_data_yn = '1' order by code").fetchall()
+        skip = set() if include_empty else self.empty_codes(dataset)
+        return [(code, name) for code, name in rows if code not in skip]
+
+    def children(self, code: str) -> list:
+        with self.lock:
+            return self.conn.execute('select code, name from regions where parent = ? order by code', (code,)).fetchall()
+
+    def parent(self, code: str) -> str:
+        with self.lock:
+            row = self.conn.execute('select parent from regions where code = ?', (code,)).fetchone()
+        return row[0] if row else None
+
+    def summary(self, dataset: str = 'apart') -> str:
+        with self.lock:
+            n_regions, n_parents = self.conn.execute(
+                "select count(*), sum(case when api_data_yn = '1' then 0 else 1 end) from regions").fetchone()
+            n_volumes = self.conn.execute('select count(*) from volumes where dataset = ?', (dataset,)).fetchone()[0]
+            version, synced = self._meta('version'), self._meta('synced_dh')
+            codes = {code for code, in self.conn.execute('select code from regions')}
+        return '지역 목록 {}: 지역 {}개 (구 단위로 제공되는 시 {}개), 빈 지역 {}개, 행 수 기록 {}개, 갱신 {}'.format(
+            version, n_regions, n_parents or 0, len(self.empty_codes(dataset) & codes), n_volumes, synced)
+
+    def close(self):
+        self.conn.close()
+
+
+if __name__ == '__main__':
+    from context import Context
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--refresh', action='store_true', help='기간과 관계없이 db에서 다시 가져오기')
+    parser.add_argument('--csv', default=None, help='법정동코드 파일(탭 구분, cp949)로 지역 목록 교체')
+    args = parser.parse_args()
+
+    ctx = Context()
+    catalog = ctx.catalog
+    if args.csv:
+        catalog.replace(legal_code_regions(pd.read_csv(args.csv, sep='\t', encoding='cp949')))
+    elif args.refresh:
+        catalog.sync(ctx.db, force=True)
+    print(catalog.summary())
+    volumes = catalog.volumes()
+    names = dict(catalog.regions(include_empty=True))
+    print('거래 많은 지역: ' + ', '.join('{} {:.0f}행'.format(names.get(code, code), volume)
+                                    for code, volume in sorted(volumes.items(), key=lambda ele: -ele[1])[:10]))
@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+'''
+api 원본 응답(xml) 로컬 캐시
+- (endpoint, LAWD_CD, DEAL_YMD, pageNo) 단위로 gzip 압축 저장. 파일 이름은 내용 해시 (같은 응답은 한 번만 저장)
+- 보관 기간(ttl), 전체 용량 기준으로 오래된 것부터 삭제
+  전체 용량은 저장할 때마다 누적 (매번 집계하지 않음). 넘으면 한도의 90%까지 삭제, 만료는 EXPIRE_CHECK_PUTS번 저장마다 확인
+- 전처리(proc_df)·스키마가 바뀌어도 api 다시 호출하지 않고 캐시에서 다시 파싱·적재 (replay)
+- 페이지마다 응답의 totalCount, item 수도 저장 -> 받은 페이지의 행 수 합계가 totalCount보다 적으면(받다가 끊김) 없는 것으로 처리
+create: 2026.10.18
+'''
+
+import gzip
+import hashlib
+import io
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+from xml_parser import QuotaExceeded, peek_meta
+
+
+EVICT_TO = 0.9 # 용량 초과 시 한도의 이 비율까지 삭제 (한도 근처에서 저장할 때마다 삭제하지 않도록)
+EXPIRE_CHECK_PUTS = 1000 # 만료 항목 확인 주기 (저장 횟수)
+
+
+class CacheMiss(KeyError):
+    pass
+
+
+class ResponseCache:
+    # path: 캐시 폴더. ttl_days: 보관 일수 (None이면 무기한). max_mb: 전체 용량 (넘으면 오래 안 쓴 것부터 삭제)
+    def __init__(self, path: str, ttl_days: int = None, max_mb: int = 2048):
+        self.path = path
+        self.ttl_days = ttl_days
+        self.max_bytes = max_mb * 1024 * 1024
+        self.lock = threading.Lock()
+        os.makedirs(os.path.join(path, 'blobs'), exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(path, 'index.db'), check_same_thread=False, isolation_level=None)
+        self.conn.execute('pragma journal_mode=wal')
+        self.conn.execute('''
+            create table if not exists responses (
+                endpoint text not null,
+                lawd_cd text not null,
+                deal_ymd text not null,
+                page_no integer not null,
+                num_of_rows integer not null,
+                digest text not null,
+                size integer not null,
+                fetched_dh text not null,
+                accessed_dh text not null,
+                total_count integer,
+                items integer,
+                primary key (endpoint, lawd_cd, deal_ymd, page_no)
+            )
+        ''')
+        self._add_count_columns()
+        self.stats = {'hits': 0, 'misses': 0, 'puts': 0, 'evicted': 0}
+        self.total_bytes = self.conn.execute('select coalesce(sum(size), 0) from responses').fetchone()[0]
+        self.puts_since_evict = 0
+
+    ### 예전 캐시(total_count, items 컬럼 없음): 컬럼 추가 후 저장된 응답에서 채우기 (한 번만)
+    def _add_count_columns(self):
+        cols = {row[1] for row in self.conn.execute('pragma table_info(responses)')}
+        for col in ('total_count', 'items'):
+            if col not in cols:
+                self.conn.execute('alter table responses add column {} integer'.format(col))
+        rows = self.conn.execute('select distinct digest from responses where items is null').fetchall()
+        for digest, in rows:
+            try:
+                with gzip.open(self._blob_path(digest), 'rb') as f:
+                    meta = peek_meta(f.read())
+            except (FileNotFoundError, QuotaExceeded):
+                continue # 비어 있는 채로 두면 그 지역·계약월은 캐시에 없는 것으로 처리
+            self.conn.execute('update responses set total_count = ?, items = ? where digest = ?',
+                              (int(meta.get('totalCount') or 0), meta['items'], digest))
+
+    def _now(self) -> str:
+        return datetime.now().strftime('%Y%m%d%H%M%S')
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.path, 'blobs', digest[:2], digest + '.xml.gz')
+
+    def _expired_before(self) -> str:
+        if self.ttl_days is None:
+            return ''
+        return (datetime.now() - timedelta(days=self.ttl_days)).strftime('%Y%m%d%H%M%S')
+
+    ### 응답 저장 (파싱 성공한 응답만 저장할 것. 요청 횟수 초과 응답 등은 저장하지 않음)
+    # 1페이지가 새로 들어오면 예전 페이지 크기로 받은 나머지 페이지는 삭제 (페이지 구성이 섞이지 않도록)
+    # totalCount, item 수는 응답 원본에서 바로 확인해서 같이 저장 (나머지 페이지를 다 받았는지 확인용)
+    def put(self, endpoint: str, params: dict, body: bytes):
+        meta = peek_meta(body)
+        digest = hashlib.sha1(body).hexdigest()
+        blob_path = self._blob_path(digest)
+        if not os.path.exists(blob_path):
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            tmp_path = '{}.{}.tmp'.format(blob_path, threading.get_ident())
+            with gzip.open(tmp_path, 'wb') as f:
+                f.write(body)
+            os.replace(tmp_path, blob_path) # 쓰다 끊겨도 깨진 파일 안 남게
+        size = os.path.getsize(blob_path)
+
+        page_no = int(params['pageNo'])
+        key = (endpoint, params['LAWD_CD'], params['DEAL_YMD'])
+        now = self._now()
+        with self.lock:
+            # 지우거나 덮어쓰는 행 크기는 전체 용량에서 빼기
+            replaced = self.conn.execute('''
+                select coalesce(sum(size), 0) from responses
+                where endpoint = ? and lawd_cd = ? and deal_ymd = ? and (page_no = ? or (? = 1 and page_no > 1))
+            ''', key + (page_no, page_no)).fetchone()[0]
+            if page_no == 1:
+                self.conn.execute('delete from responses where endpoint = ? and lawd_cd = ? and deal_ymd = ? and page_no > 1', key)
+            self.conn.execute('''
+                insert or replace into responses
+                (endpoint, lawd_cd, deal_ymd, page_no, num_of_rows, digest, size, fetched_dh, accessed_dh, total_count, items)
+                values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', key + (page_no, int(params['numOfRows']), digest, size, now, now, int(meta.get('totalCount') or 0),
+                        meta['items']))
+            self.stats['puts'] += 1
+            self.total_bytes += size - replaced
+            self.puts_since_evict += 1
+            due = self.total_bytes > self.max_bytes or \
+                (self.ttl_days is not None and self.puts_since_evict >= EXPIRE_CHECK_PUTS)
+        if due:
+            self.evict()
+
+    ### 지역·계약월 전체 페이지 [(pageNo, numOfRows, digest)] (페이지 순서). 없거나 만료면 CacheMiss
+    # 받다가 끊긴 경우(중간 페이지가 빠졌거나, 페이지 행 수 합계가 1페이지의 totalCount보다 적음)도 CacheMiss
+    def _page_index(self, endpoint: str, lawd_cd: str, deal_ymd: str) -> list:
+        key = (endpoint, lawd_cd, deal_ymd)
+        with self.lock:
+            rows = self.conn.execute('''
+                select page_no, num_of_rows, digest, total_count, items from responses
+                where endpoint = ? and lawd_cd = ? and deal_ymd = ? and fetched_dh >= ?
+                order by page_no
+            ''', key + (self._expired_before(),)).fetchall()
+            complete = bool(rows) and [row[0] for row in rows] == list(range(1, len(rows) + 1))
+            complete = complete and rows[0][3] is not None and None not in [row[4] for row in rows] \
+                and sum(row[4] for row in rows) >= rows[0][3]
+            if not complete:
+                self.stats['misses'] += 1
+                raise CacheMiss(key)
+            self.conn.execute('update responses set accessed_dh = ? where endpoint = ? and lawd_cd = ? and deal_ymd = ?',
+                              (self._now(),) + key)
+            self.stats['hits'] += 1
+        return [row[:3] for row in rows]
+
+    def _read(self, key: tuple, digest: str) -> bytes:
+        try:
+            with gzip.open(self._blob_path(digest), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            raise CacheMiss(key)
+
+    ### 지역·계약월 전체 페이지 [(pageNo, numOfRows, xml bytes)] (페이지 순서). 없거나 만료면 CacheMiss
+    def pages(self, endpoint: str, lawd_cd: str, deal_ymd: str) -> list:
+        key = (endpoint, lawd_cd, deal_ymd)
+        return [(page_no, num_of_rows, self._read(key, digest))
+                for page_no, num_of_rows, digest in self._page_index(endpoint, lawd_cd, deal_ymd)]
+
+    ### 캐시된 페이지를 하나씩 다시 파싱 (api 호출 없음. 한 번에 한 페이지만 메모리에)
+    # parse(파일 객체, offset) -> {컬럼: list}. offset은 앞 페이지까지의 행 수 (일련번호용)
+    def iter_replay(self, endpoint: str, lawd_cd: str, deal_ymd: str, parse):
+        key = (endpoint, lawd_cd, deal_ymd)
+        for page_no, num_of_rows, digest in self._page_index(endpoint, lawd_cd, deal_ymd):
+            yield parse(io.BytesIO(self._read(key, digest)), (page_no - 1) * num_of_rows)
+
+    ### 캐시된 페이지를 다시 파싱해서 합치기
+    def replay(self, endpoint: str, lawd_cd: str, deal_ymd: str, parse) -> dict:
+        data = None
+        for page in self.iter_replay(endpoint, lawd_cd, deal_ymd, parse):
+            if data is None:
+                data = page
+            else:
+                for col, values in page.items():
+                    data[col].extend(values)
+        return data
+
+    ### 캐시에 전체 페이지가 있는 (lawd_cd, deal_ymd) 목록 (replay 작업 목록. 조건은 _page_index와 같음)
+    def jobs(self, endpoint: str, months: list = None) -> list:
+        with self.lock:
+            rows = self.conn.execute('''
+                select lawd_cd, deal_ymd from responses
+                where endpoint = ? and fetched_dh >= ?
+                group by lawd_cd, deal_ymd
+                having min(page_no) = 1 and max(page_no) = count(*) and count(items) = count(*)
+                    and sum(items) >= max(case when page_no = 1 then total_count end)
+                order by deal_ymd, lawd_cd
+            ''', (endpoint, self._expired_before())).fetchall()
+        if months:
+            rows = [row for row in rows if row[1] in months]
+        return rows
+
+    ### 만료된 항목, 용량 초과분(오래 안 쓴 것부터. 한도의 EVICT_TO까지) 삭제
+    # 지역·계약월 단위로 삭제 (일부 페이지만 남으면 replay 때 행이 빠짐). put이 필요할 때만 호출
+    def evict(self):
+        expired_before = self._expired_before()
+        with self.lock:
+            groups = self.conn.execute('''
+                select endpoint, lawd_cd, deal_ymd, sum(size), min(fetched_dh) < ? from responses
+                group by endpoint, lawd_cd, deal_ymd
+                order by max(accessed_dh)
+            ''', (expired_before,)).fetchall()
+            total = sum(group[3] for group in groups if not group[4])
+            over = total > self.max_bytes
+            victims = []
+            for endpoint, lawd_cd, deal_ymd, size, expired in groups:
+                if expired:
+                    victims.append((endpoint, lawd_cd, deal_ymd))
+                elif over and total > self.max_bytes * EVICT_TO:
+                    victims.append((endpoint, lawd_cd, deal_ymd))
+                    total -= size
+            self.total_bytes = total
+            self.puts_since_evict = 0
+            if not victims:
+                return
+
+            digests = set()
+            for key in victims:
+                digests.update(ele[0] for ele in self.conn.execute(
+                    'select digest from responses where endpoint = ? and lawd_cd = ? and deal_ymd = ?', key))
+            self.conn.executemany('delete from responses where endpoint = ? and lawd_cd = ? and deal_ymd = ?', victims)
+
+            # 다른 항목이 같은 내용(digest)을 쓰고 있으면 파일은 남김
+            for digest in digests:
+                in_use = self.conn.execute('select 1 from responses where digest = ? limit 1', (digest,)).fetchone()
+                if not in_use:
+                    try:
+                        os.remove(self._blob_path(digest))
+                    except FileNotFoundError:
+                        pass
+            self.stats['evicted'] += len(victims)
+
+    def summary(self) -> str:
+        with self.lock:
+            cnt, size = self.conn.execute('select count(*), coalesce(sum(size), 0) from responses').fetchone()
+        return '응답 캐시: {}개 {:.1f}MB, hit {hits}, miss {misses}, 저장 {puts}, 삭제 {evicted}'.format(
+            cnt, size / 1024 / 1024, **self.stats)
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+'''
+apart 요약 테이블 (apart_rollup) 유지·조회
+(zip_code, bas_ym, dong, 면적 구간)마다 건수, 해제 건수, 거래금액 합계·최소·최대, 평당가 합계 + 분위수 sketch
+- 적재가 끝난 지역·계약월만 다시 계산 (그 지역·계약월 행만 (zip_code, bas_ym) 인덱스로 읽어서 교체)
+  upsert·변경분 적재로 같은 행이 바뀌어도 중복 집계 없음
+- 분위수는 병합 가능한 sketch (로그 구간 히스토그램, 상대 오차 1%) -> 여러 동·월·구간을 합쳐도 중앙값 계산 가능
+- 대시보드, 적재 완료 확인(1000행 잘린 월 등)은 apart 전체 group by 대신 이 테이블 조회
+create: 2026.10.18
+'''
+
+import json
+import math
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+ROLLUP_TABLE = 'apart_rollup'
+
+# 전용면적 구간 하한(m^2): 60 이하, 60~85, 85~102, 102~135, 135 초과. 면적 없으면 -1
+SIZE_BUCKETS = (0, 60, 85, 102, 135)
+PYEONG = 3.305785 # m^2
+
+ROLLUP_DDL = '''
+    create table if not exists apart_rollup (
+        zip_code varchar(10) not null,
+        bas_ym char(6) not null,
+        dong varchar(50) not null,
+        size_bucket smallint not null,
+        cnt int not null,
+        cancel_cnt int not null,
+        amount_sum bigint not null,
+        amount_min int,
+        amount_max int,
+        ppp_sum double,
+        amount_sketch text,
+        ppp_sketch text,
+        updated_dh char(14) not null,
+        primary key (zip_code, bas_ym, dong, size_bucket)
+    )
+'''
+
+# 다시 계산할 지역·계약월 행 ((zip_code, bas_ym) 인덱스). table: apart 또는 apart_fact_v (dimensions.py)
+SOURCE_SQL = '''
+    select dong, size, deal_amount, cancel_deal_yn from {table}
+    where zip_code = :zip_code and bas_ym = :bas_ym
+'''
+
+# 지역·계약월별 전체 행 수 (해제 포함. apart count(*)와 같은 값)
+MONTH_COUNTS_SQL = '''
+    select zip_code, bas_ym, sum(cnt + cancel_cnt) cnt from apart_rollup
+    group by zip_code, bas_ym
+'''
+
+STAT_COLUMNS = ['cnt', 'cancel_cnt', 'amount_sum', 'amount_min', 'amount_max', 'ppp_sum', 'amount_sketch', 'ppp_sketch']
+
+
+### 분위수 sketch (DDSketch 방식 로그 구간 히스토그램)
+# 값 v는 구간 ceil(log_gamma(v))에 개수만 기록 -> 구간 대표값이 실제 값과 상대 오차 alpha 이내
+# 구간별 개수를 더하면 병합 (동·월·면적 구간을 합쳐도 다시 원본을 읽을 필요 없음). 양수 값만
+class QuantileSketch:
+    def __init__(self, alpha: float = 0.01, bins: dict = None):
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self.bins = dict(bins or {})
+
+    @property
+    def count(self) -> int:
+        return sum(self.bins.values())
+
+    def add(self, values):
+        values = np.asarray(values, dtype='float64')
+        values = values[values > 0]
+        if values.size == 0:
+            return self
+        index, counts = np.unique(np.ceil(np.log(values) / math.log(self.gamma)).astype('int64'), return_counts=True)
+        for i, n in zip(index.tolist(), counts.tolist()):
+            self.bins[i] = self.bins.get(i, 0) + n
+        return self
+
+    def merge(self, other: 'QuantileSketch'):
+        for i, n in other.bins.items():
+            self.bins[i] = self.bins.get(i, 0) + n
+        return self
+
+    def quantile(self, q: float) -> float:
+        total = self.count
+        if total == 0:
+            return float('nan')
+        rank = q * (total - 1)
+        seen = 0
+        for i in sorted(self.bins):
+            seen += self.bins[i]
+            if seen > rank:
+                return 2 * self.gamma ** i / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)
+
+    def to_json(self) -> str:
+        return json.dumps({'a': self.alpha, 'b': {str(i): n for i, n in sorted(self.bins.items())}}, separators=(',', ':'))
+
+    @classmethod
+    def from_json(cls, value: str) -> 'QuantileSketch':
+        if not value:
+            return cls()
+        data = json.loads(value)
+        return cls(data['a'], {int(i): n for i, n in data['b'].items()})
+
+
+def size_bucket(size: pd.Series) -> pd.Series:
+    edges = np.asarray(SIZE_BUCKETS, dtype='float64')
+    values = pd.to_numeric(size, errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+    index = np.clip(np.searchsorted(edges, values, side='left') - 1, 0, len(edges) - 1)
+    return pd.Series(np.where(np.isnan(values), -1, edges[index].astype('int64')), index=size.index)
+
+
+### 지역·계약월 하나의 행 -> 요약 행 (dong, size_bucket마다 하나). 해제된 거래는 가격 통계에서 제외
+def summarize(rows: pd.DataFrame, zip_code: str, bas_ym: str) -> pd.DataFrame:
+    if rows.shape[0] == 0:
+        return pd.DataFrame(columns=['zip_code', 'bas_ym', 'dong', 'size_bucket'] + STAT_COLUMNS)
+    data = pd.DataFrame({
+        'dong': rows['dong'].astype(object).where(rows['dong'].notna(), '').astype(str),
+        'size_bucket': size_bucket(rows['size']),
+        'amount': pd.to_numeric(rows['deal_amount'], errors='coerce'),
+        'cancel': rows['cancel_deal_yn'].astype(object).astype(str) == '1',
+    })
+    size = pd.to_numeric(rows['size'], errors='coerce')
+    data['ppp'] = data['amount'] / (size / PYEONG).where(size > 0)
+
+    out = []
+    for (dong, bucket), group in data.groupby(['dong', 'size_bucket'], sort=True):
+        valid = group[~group['cancel'] & group['amount'].notna()]
+        amount, ppp = valid['amount'], valid['ppp'].dropna()
+        out.append({
+            'zip_code': zip_code, 'bas_ym': bas_ym, 'dong': dong, 'size_bucket': int(bucket),
+            'cnt': int(valid.shape[0]),
+            'cancel_cnt': int(group.shape[0] - valid.shape[0]),
+            'amount_sum': int(amount.sum()),
+            'amount_min': int(amount.min()) if amount.size else None,
+            'amount_max': int(amount.max()) if amount.size else None,
+            'ppp_sum': float(ppp.sum()),
+            'amount_sketch': QuantileSketch().add(amount).to_json(),
+            'ppp_sketch': QuantileSketch().add(ppp).to_json(),
+        })
+    return pd.DataFrame(out)
+
+
+### 지역·계약월 하나 다시 계산 (적재 완료 후 호출). 기존 요약 행은 같은 트랜잭션에서 교체. 요약 행 수 반환
+# source: 거래를 읽을 테이블 (차원 테이블로 적재하면 apart_fact_v)
+def refresh_rollup(db, zip_code: str, bas_ym: str, source: str = 'apart') -> int:
+    rows = pd.DataFrame(db.fetchall(SOURCE_SQL.format(table=source), zip_code=zip_code, bas_ym=bas_ym),
+                        columns=['dong', 'size', 'deal_amount', 'cancel_deal_yn'])
+    summary = summarize(rows, zip_code, bas_ym)
+    summary['updated_dh'] = datetime.now().strftime('%Y%m%d%H%M%S')
+    records = summary.astype(object).where(summary.notna(), None).to_dict('records')
+
+    cols = list(summary.columns)
+    insert = 'insert into {} ({}) values ({})'.format(ROLLUP_TABLE, ', '.join(cols), ', '.join(':' + col for col in cols))
+    with db.connect() as conn:
+        conn.execute(text('delete from {} where zip_code = :zip_code and bas_ym = :bas_ym'.format(ROLLUP_TABLE)),
+                     {'zip_code': zip_code, 'bas_ym': bas_ym})
+        if records:
+            conn.execute(text(insert), records)
+        conn.commit()
+    return len(records)
+
+
+### 계약월 전체 다시 계산 (파티션 교체 적재 후. 없어진 지역의 요약 행도 정리)
+def refresh_month(db, bas_ym: str, source: str = 'apart') -> int:
+    codes = db.fetchall('''
+        select zip_code from {} where bas_ym = :bas_ym
+        union select zip_code from apart_rollup where bas_ym = :bas_ym
+    '''.format(source), bas_ym=bas_ym)
+    return sum(refresh_rollup(db, zip_code, bas_ym, source) for zip_code, in codes)
+
+
+### 기존 데이터 전체 요약 (처음 한 번. schema.py 005_rollup)
+def rebuild_rollups(db):
+    for zip_code, bas_ym in db.fetchall('select distinct zip_code, bas_ym from apart'):
+        refresh_rollup(db, zip_code, bas_ym)
+
+
+### 요약 행 조회 (zip_codes, 계약월 범위 조건)
+def read_rollup(db, zip_codes: list = None, start_ym: str = None, end_ym: str = None) -> pd.DataFrame:
+    conds, params = [], {}
+    if zip_codes:
+        conds.append('zip_code in ({})'.format(', '.join(':z{}'.format(i) for i in range(len(zip_codes)))))
+        params.update({'z{}'.format(i): code for i, code in enumerate(zip_codes)})
+    if start_ym:
+        conds.append('bas_ym >= :start_ym')
+        params['start_ym'] = start_ym
+    if end_ym:
+        conds.append('bas_ym <= :end_ym')
+        params['end_ym'] = end_ym
+    cols = ['zip_code', 'bas_ym', 'dong', 'size_bucket'] + STAT_COLUMNS
+    sql = 'select {} from {}{}'.format(', '.join(cols), ROLLUP_TABLE, ' where ' + ' and '.join(conds) if conds else '')
+    return pd.DataFrame(db.fetchall(sql, **params), columns=cols)
+
+
+### 요약 행을 원하는 단위로 합치기 (예: by=['zip_code', 'bas_ym'] -> 지역·월별 거래량, 평균·중앙값)
+# 분위수는 sketch 병합으로 계산 (원본 다시 읽지 않음)
+def combine(rollup: pd.DataFrame, by: list, quantiles: tuple = (0.5,)) -> pd.DataFrame:
+    out = []
+    for keys, group in rollup.groupby(by, sort=True):
+        keys = keys if isinstance(keys, tuple) else (keys,)
+        amount = QuantileSketch()
+        ppp = QuantileSketch()
+        for value in group['amount_sketch']:
+            amount.merge(QuantileSketch.from_json(value))
+        for value in group['ppp_sketch']:
+            ppp.merge(QuantileSketch.from_json(value))
+        cnt = int(group['cnt'].sum())
+        row = dict(zip(by, keys))
+        row.update({
+            'cnt': cnt,
+            'cancel_cnt': int(group['cancel_cnt'].sum()),
+            'amount_avg': group['amount_sum'].sum() / cnt if cnt else None,
+            'amount_min': group['amount_min'].min(),
+            'amount_max': group['amount_max'].max(),
+            'ppp_avg': group['ppp_sum'].sum() / ppp.count if ppp.count else None,
+        })
+        for q in quantiles:
+            row['amount_p{:g}'.format(q * 100)] = amount.quantile(q)
+            row['ppp_p{:g}'.format(q * 100)] = ppp.quantile(q)
+        out.append(row)
+    return pd.DataFrame(out)
+
+
+### 지역·계약월별 전체 행 수 {(zip_code, bas_ym): 행 수} (적재 완료 확인용)
+def month_counts(db) -> dict:
+    return {(zip_code, bas_ym): int(cnt) for zip_code, bas_ym, cnt in db.fetchall(MONTH_COUNTS_SQL)}
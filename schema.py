@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+'''
+apart 테이블 스키마 변경 (mysql)
+- 적용한 변경은 schema_migrations 테이블에 기록 -> 여러 번 실행해도 한 번만 적용
+- explain으로 주요 조회가 인덱스를 타는지 확인 (테이블이 커져도 full scan 안 하는지)
+실행: python schema.py [--check] (load_data_monthly와 같은 info/dbinfo_estate.pickle 사용)
+create: 2026.10.18
+'''
+
+import argparse
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy import text
+
+from bulk_writer import executemany
+from change_detect import STORED_SQL
+from context import Context
+from datasets import DATASETS, table_ddl
+from db import Database
+from dimensions import (COMPLEX, FACT_TABLE, FACT_TYPES, FACT_VIEW, NATURAL_KEY, backfill_fact,
+                        create_tables as create_dimension_tables, create_view as create_fact_view)
+from partitions import partition_table
+from queries import COMPS_SQL, HISTORY_SQL, QUERY_INDEXES, RECENT_SQL, TRADE_COLUMNS
+from rollup import ROLLUP_DDL, SOURCE_SQL as ROLLUP_SOURCE_SQL, rebuild_rollups
+from transform import trade_keys
+
+
+APART_ZIP_YM_INDEX = 'idx_apart_zip_ym'
+
+# 1000행에서 잘린 채 적재된 지역·계약월 (load_extra_data). apart 대신 요약 테이블(rollup.py) 행 수 합계로 확인
+TRUNCATED_MONTHS_SQL = '''
+    select a.bas_ym, a.zip_code, b.name, a.cnt
+    from (
+        select zip_code, bas_ym, sum(cnt + cancel_cnt) cnt from apart_rollup
+        group by zip_code, bas_ym
+        having sum(cnt + cancel_cnt) = 1000
+    ) a
+    inner join zip_code b on a.zip_code = b.code
+    order by 2,1
+'''
+
+
+### apart 외 데이터셋 테이블 (전월세, 오피스텔, 연립다세대). 컬럼은 datasets 정의 기준
+def create_dataset_tables(db: Database):
+    for spec in DATASETS.values():
+        if spec.table != 'apart':
+            db.execute(table_ddl(spec))
+
+
+### 기존 행의 trade_key 채우기 (지역·계약월 단위)
+# 적재 때와 같은 transform.trade_keys로 계산해야 이후 upsert 키가 일치함. 같은 키 순번은 no 순서 기준
+# no는 '202401_0003' 형식이라 문자열 정렬이면 10000번 이후가 잘못 정렬됨 -> 길이, 값 순서
+# (bas_ym 컬럼이 생기기 전에 실행되는 변경이라 substr 사용)
+def backfill_trade_keys(db: Database):
+    sql = '''
+        select distinct zip_code, substr(bas_dt,1,6) bas_ym from apart
+        where trade_key is null
+    '''
+    for zip_code, bas_ym in db.fetchall(sql):
+        sql = '''
+            select zip_code, no, reg_no, bas_dt, floor, size, deal_amount, apartment_dong from apart
+            where zip_code = :zip_code and substr(bas_dt,1,6) = :bas_ym
+            order by length(no), no
+        '''
+        rows = pd.DataFrame(db.fetchall(sql, zip_code=zip_code, bas_ym=bas_ym),
+                            columns=['zip_code', 'no', 'reg_no', 'bas_dt', 'floor', 'size', 'deal_amount', 'apartment_dong'])
+        rows['trade_key'] = trade_keys(rows)
+        executemany(db, 'update apart set trade_key = %s where zip_code = %s and no = %s',
+                    rows[['trade_key', 'zip_code', 'no']], chunksize=5000)
+
+
+### 저장된 trade_key 다시 계산 (키 컬럼·해시 방식이 바뀐 뒤. 지역·계약월 단위, 바뀐 행만 update)
+# source: 키 컬럼을 읽을 테이블 또는 view (apart_fact는 차원 테이블 join한 apart_fact_v)
+def rekey_table(db: Database, table: str, spec, source: str = None):
+    source = source or table
+    cols = ['trade_key', 'no'] + spec.key_columns
+    for zip_code, bas_ym in db.fetchall('select distinct zip_code, bas_ym from {}'.format(source)):
+        sql = '''
+            select {} from {}
+            where zip_code = :zip_code and bas_ym = :bas_ym
+            order by length(no), no
+        '''.format(', '.join(cols), source)
+        rows = pd.DataFrame(db.fetchall(sql, zip_code=zip_code, bas_ym=bas_ym), columns=cols)
+        new_keys = trade_keys(rows, columns=spec.key_columns, int_columns=spec.key_int_columns(),
+                              float_columns=spec.key_float_columns())
+        changed = pd.DataFrame({'new': new_keys, 'old': rows['trade_key'], 'bas_ym': bas_ym})
+        changed = changed[changed['new'] != changed['old']]
+        if changed.shape[0] > 0: # bas_ym 조건: 파티션 하나만 (007_partition_apart)
+            executemany(db, 'update {} set trade_key = %s where trade_key = %s and bas_ym = %s'.format(table), changed,
+                        chunksize=5000)
+
+
+### 009_trade_key_v2: zip_code를 키에 추가, 행 단위 sha1 -> pandas 해시. apart, 데이터셋 테이블, apart_fact 전체
+def rekey_trade_keys(db: Database):
+    specs = {}
+    for spec in DATASETS.values():
+        specs.setdefault(spec.table, spec) # apart는 새 api 정의 (예전 api와 키 컬럼 같음)
+    for table, spec in specs.items():
+        rekey_table(db, table, spec)
+    create_fact_view(db) # 008 때 만든 view에는 bas_ym이 없음
+    rekey_table(db, FACT_TABLE, specs['apart'], source=FACT_VIEW)
+
+
+### 010_partition_fact: apart_fact도 계약월 파티션 (차원 테이블로 적재할 때 exchange는 apart_fact 파티션 교체)
+def partition_fact(db: Database):
+    partition_table(db, FACT_TABLE)
+
+
+def table_columns(db: Database, table: str) -> list:
+    with db.connect() as conn:
+        return list(conn.execute(text('select * from {} where 1 = 0'.format(table))).keys())
+
+
+### 011_fact_old_api: 예전 api 행도 apart_fact_v가 apart와 같은 값
+# - dim_complex: reg_no 대신 natural_key(reg_no, 빈 값이면 지역|단지명|지번)로 구분 -> 일련번호 없는 행도 단지 id
+# - apart_fact: apart의 예전 api 컬럼(req_gbn, sigungu_cd) 추가
+# 008 때 이미 이 구조로 만들었으면(새 db) 그대로. 바꿨으면 apart의 예전 api 행을 apart_fact에 다시 옮기기
+def upgrade_fact_old_api(db: Database):
+    changed = False
+    if NATURAL_KEY not in table_columns(db, COMPLEX.table):
+        db.execute('alter table {} add column {} varchar(200) null after {}'.format(COMPLEX.table, NATURAL_KEY, COMPLEX.id_column))
+        db.execute('update {} set {} = reg_no'.format(COMPLEX.table, NATURAL_KEY))
+        db.execute('''
+            alter table {} modify {} varchar(200) not null, modify reg_no varchar(100) null,
+            drop index reg_no, add unique ({})
+        '''.format(COMPLEX.table, NATURAL_KEY, NATURAL_KEY))
+        changed = True
+    missing = [col for col in FACT_TYPES if col not in table_columns(db, FACT_TABLE)]
+    if missing:
+        db.execute('alter table {} {}'.format(FACT_TABLE, ', '.join('add column {} {}'.format(col, FACT_TYPES[col])
+                                                                    for col in missing)))
+        changed = True
+    create_fact_view(db)
+    if changed:
+        backfill_fact(db, "reg_no is null or reg_no = '' or req_gbn is not null or sigungu_cd is not null")
+
+
+# (이름, [sql 또는 함수(db)]) 순서대로 적용
+MIGRATIONS = [
+    # 자연키 기반 upsert. 기존 pk(no)는 지역·월마다 다시 매기는 순번이라 upsert 기준으로 못 씀
+    ('001_trade_key', [
+        'alter table apart add column trade_key char(40) null',
+        backfill_trade_keys,
+        'alter table apart modify trade_key char(40) not null',
+        'alter table apart drop primary key, add primary key (trade_key)',
+    ]),
+    # 변경 감지. 기존 행은 null -> 다음 refresh 때 한 번 갱신되면서 채워짐
+    ('002_row_hash', [
+        'alter table apart add column row_hash char(40) null',
+    ]),
+    # 계약월 조회용. substr(bas_dt,1,6) 조건은 인덱스를 못 타서 매번 full scan
+    # 생성 컬럼이라 적재 코드는 그대로 (bas_dt만 넣으면 채워짐)
+    ('003_bas_ym', [
+        'alter table apart add column bas_ym char(6) as (substr(bas_dt,1,6)) stored',
+        'create index {} on apart (zip_code, bas_ym)'.format(APART_ZIP_YM_INDEX),
+    ]),
+    # ingest.py로 수집하는 데이터셋 테이블 (trade_key pk, bas_ym 생성 컬럼, (zip_code, bas_ym) 인덱스는 apart와 같게)
+    ('004_datasets', [
+        create_dataset_tables,
+    ]),
+    # 지역·계약월·동·면적 구간 요약 (이후 적재 때 적재한 지역·계약월만 다시 계산). 기존 데이터는 한 번 전체 계산
+    ('005_rollup', [
+        ROLLUP_DDL,
+        rebuild_rollups,
+    ]),
+    # 조회 모음(queries.py): 단지 이력, 동별 최근 거래, 비교 사례, 캐시 무효화 기준(max(load_dh))
+    ('006_query_indexes', [
+        'create index {} on apart ({})'.format(name, cols) for name, cols in QUERY_INDEXES
+    ]),
+    # 계약월 파티션 교체 적재 (partitions.py, write_mode='exchange'). 파티션 키는 모든 unique 키에 포함돼야 함
+    ('007_partition_apart', [
+        'alter table apart drop primary key, add primary key (trade_key, bas_ym)',
+        partition_table,
+    ]),
+    # 단지·도로명·중개사 소재지 차원 테이블 + id만 가진 거래 테이블(apart_fact), apart와 같은 컬럼의 view
+    ('008_dimensions', [
+        create_dimension_tables,
+        backfill_fact,
+    ]),
+    # 자연키에 zip_code 추가 (예전 api 행은 reg_no가 빈 값일 수 있어서 다른 지역 행과 키가 겹침), 키 해시 방식 변경
+    ('009_trade_key_v2', [
+        rekey_trade_keys,
+    ]),
+    # 차원 테이블로 적재하면 apart 대신 apart_fact가 적재 테이블 -> apart와 같게 pk에 bas_ym, 계약월 파티션
+    ('010_partition_fact', [
+        'alter table {} drop primary key, add primary key (trade_key, bas_ym)'.format(FACT_TABLE),
+        partition_fact,
+    ]),
+    # 예전 api 행(일련번호 빈 값)은 단지 id가 null이라 view에서 단지명·동 등이 빠짐, req_gbn·sigungu_cd 컬럼 없음
+    ('011_fact_old_api', [
+        upgrade_fact_old_api,
+    ]),
+]
+
+# (이름, 조회, 파라미터, 사용해야 하는 인덱스)
+INDEX_CHECKS = [
+    ('change_detect.load_stored', STORED_SQL.format(table='apart'), {'zip_code': '11110', 'bas_ym': '202401'}, APART_ZIP_YM_INDEX),
+    ('rollup.refresh_rollup', ROLLUP_SOURCE_SQL.format(table='apart'), {'zip_code': '11110', 'bas_ym': '202401'}, APART_ZIP_YM_INDEX),
+    ('load_extra_data 1000행 월', TRUNCATED_MONTHS_SQL, {}, 'PRIMARY'),
+    ('queries.price_history', HISTORY_SQL.format(table='apart', cols=', '.join(TRADE_COLUMNS), cancel=''),
+     {'reg_no': '11110-2339', 'start_dt': '00000000', 'end_dt': '99999999'}, 'idx_apart_reg_dt'),
+    ('queries.recent_trades', RECENT_SQL.format(table='apart', cols=', '.join(TRADE_COLUMNS), cancel=''),
+     {'zip_code': '11110', 'dong': '사직동', 'start_dt': '20240101', 'limit': 100}, 'idx_apart_zip_dong_dt'),
+    ('queries.comparables', COMPS_SQL.format(table='apart', cols=', '.join(TRADE_COLUMNS), conds='', cancel=''),
+     {'zip_code': '11110', 'size_min': 76.5, 'size_max': 93.5, 'start_dt': '20240101', 'limit': 50}, 'idx_apart_zip_size'),
+]
+
+
+def migrate(db: Database):
+    db.execute('''
+        create table if not exists schema_migrations (
+            name varchar(100) primary key,
+            applied_dh char(14) not null
+        )
+    ''')
+    applied = {ele[0] for ele in db.fetchall('select name from schema_migrations')}
+
+    for name, steps in MIGRATIONS:
+        if name in applied:
+            continue
+        print('{} 적용 시작'.format(name))
+        for step in steps:
+            if callable(step):
+                step(db)
+            else:
+                db.execute(step)
+        db.execute('insert into schema_migrations (name, applied_dh) values (:name, :dh)',
+                   name=name, dh=datetime.now().strftime('%Y%m%d%H%M%S'))
+        print('{} 적용 완료'.format(name))
+
+
+### 주요 조회 실행 계획 확인 (mysql explain). 인덱스를 안 타는 조회 이름 목록 반환
+def explain_check(db: Database) -> list:
+    failed = []
+    for name, sql, params, index in INDEX_CHECKS:
+        with db.connect() as conn:
+            plan = [dict(row) for row in conn.execute(text('explain ' + sql), params).mappings()]
+        used = any(row.get('key') == index for row in plan)
+        print('{}: {} ({})'.format(name, '인덱스 사용' if used else '인덱스 미사용',
+                                   ', '.join('{} type={} key={} rows={}'.format(row.get('table'), row.get('type'), row.get('key'), row.get('rows'))
+                                             for row in plan)))
+        if not used:
+            failed.append(name)
+    return failed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--check', action='store_true', help='변경 적용 후 explain으로 인덱스 사용 확인')
+    args = parser.parse_args()
+
+    db = Context().db
+    migrate(db)
+    if args.check and explain_check(db):
+        raise SystemExit(1)
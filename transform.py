@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+'''
+실거래가 전처리 (datasets.DatasetSpec 정의 기준. 아파트 매매는 proc_df)
+create: 2026.10.18 (load_data_monthly.proc_df에서 분리, 컬럼 단위 처리로 변경)
+'''
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from datasets import APT_TRADE, DatasetSpec
+
+# 아파트 매매 (새 api) 기준 값. 정의는 datasets.APT_TRADE
+RENAME_COLUMNS = APT_TRADE.rename # 컬럼명 mysql에 맞게 바꾸기
+TRADE_KEY_COLUMNS = APT_TRADE.key_columns # 거래 자연키 (mysql 컬럼명 기준). 같은 값의 거래가 여러 건이면 순번을 붙여 구분
+CATEGORY_COLUMNS = APT_TRADE.category_columns # 값 종류가 적은 컬럼은 category로 (메모리 절약)
+
+# 행 해시에서 제외하는 컬럼 (적재 시각, 순번, 키 자신)
+ROW_HASH_EXCLUDE = ('no', 'load_dh', 'trade_key', 'row_hash')
+
+
+## 가져온 데이터 전처리 (데이터셋 정의 기준)
+# 행 단위 apply 없이 컬럼 단위로만 처리
+# key_counts: 한 지역·계약월을 청크로 나눠 처리할 때 앞 청크까지의 키별 건수 (KeyCounts, trade_keys 참고)
+def proc_spec(data_frame: pd.DataFrame, spec: DatasetSpec, key_counts: 'KeyCounts' = None) -> pd.DataFrame:
+    # 공백은 null로 바꾸기 (프레임 전체 한 번에. 새 프레임이 만들어지므로 copy 불필요)
+    data = data_frame.replace('', np.nan)
+
+    # 숫자 컬럼 (금액은 ',' 제거 후)
+    for col, dtype in spec.dtypes.items():
+        values = data[col]
+        if col in spec.comma_columns:
+            values = values.str.replace(',', '', regex=False)
+        data[col] = pd.to_numeric(values).astype(dtype)
+    for col, mapping in spec.flag_columns.items():
+        data[col] = data[col].replace(mapping)
+
+    year, month, day = spec.date_parts
+    data['bas_dt'] = data[year] + data[month].str.pad(2, fillchar='0') + data[day].str.pad(2, fillchar='0')
+    for col in spec.short_date_columns: # yy.mm.dd -> yyyymmdd (null은 그대로 null)
+        values = data[col]
+        data[col] = '20' + values.str[:2] + values.str[3:5] + values.str[6:8]
+    data.drop(columns=list(spec.date_parts) + list(spec.drop_columns), inplace=True)
+    if spec.category_columns:
+        data[spec.category_columns] = data[spec.category_columns].astype('category')
+
+    data.rename(columns=spec.rename, inplace=True)
+
+    # load_dh 컬럼 추가
+    now_dt = datetime.now().strftime('%Y%m%d%H%M%S')
+    data['load_dh'] = now_dt
+
+    # 자연키 (upsert 기준), 행 내용 해시 (변경 감지용)
+    data['trade_key'] = trade_keys(data, key_counts, spec.key_columns, spec.key_int_columns(), spec.key_float_columns())
+    data['row_hash'] = row_hashes(data)
+    return data
+
+
+## 아파트 매매 (새 api) 전처리
+def proc_df(data_frame: pd.DataFrame, key_counts: 'KeyCounts' = None) -> pd.DataFrame:
+    return proc_spec(data_frame, APT_TRADE, key_counts)
+
+
+### uint64 해시 -> 16자리 hex 문자열 (행마다 python 호출 없이 numpy로 한 번에)
+_HEX_DIGITS = np.frombuffer(b'0123456789abcdef', dtype=np.uint8)
+_HEX_SHIFTS = np.arange(60, -4, -4, dtype=np.uint64)
+
+def hex_digest(values) -> np.ndarray:
+    digits = (np.asarray(values, dtype=np.uint64)[:, None] >> _HEX_SHIFTS) & np.uint64(15)
+    return np.ascontiguousarray(_HEX_DIGITS[digits.astype(np.intp)]).view('S16').ravel().astype('U16')
+
+
+### 청크 간 자연키별 건수 (trade_keys 순번용). 키 값 해시(uint64) -> 건수를 정렬된 numpy 배열 두 개로 보관
+# 키 하나당 12바이트 (키 문자열 dict 대신). 청크마다 조회는 searchsorted, 갱신은 청크의 새 키만 끼워 넣기 (전체 다시 정렬 없음)
+class KeyCounts:
+    def __init__(self):
+        self.keys = np.empty(0, dtype=np.uint64)
+        self.counts = np.empty(0, dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    ### hashes가 이미 있는 키인지, 있으면 위치 (없으면 끼워 넣을 위치)
+    def _find(self, hashes: np.ndarray) -> tuple:
+        pos = np.searchsorted(self.keys, hashes)
+        if len(self.keys) == 0:
+            return pos, np.zeros(len(hashes), dtype=bool)
+        return pos, self.keys[np.minimum(pos, len(self.keys) - 1)] == hashes
+
+    ### 앞 청크까지 나온 건수 (없으면 0)
+    def get(self, hashes: np.ndarray) -> np.ndarray:
+        pos, found = self._find(hashes)
+        if not found.any():
+            return np.zeros(len(hashes), dtype=np.int64)
+        return np.where(found, self.counts[np.minimum(pos, len(self.keys) - 1)], 0)
+
+    def add(self, hashes: np.ndarray):
+        new, counts = np.unique(hashes, return_counts=True)
+        pos, found = self._find(new)
+        self.counts[pos[found]] += counts[found].astype(np.int32)
+        self.keys = np.insert(self.keys, pos[~found], new[~found])
+        self.counts = np.insert(self.counts, pos[~found], counts[~found].astype(np.int32))
+
+
+# trade_key 해시 키 (pandas hash_pandas_object의 hash_key, 16자). 두 개로 계산해서 이어 붙임 (128bit)
+TRADE_KEY_HASH_KEYS = ('estate.tradekey1', 'estate.tradekey2')
+
+
+### 거래 자연키 (32자리 hex)
+# 값 정규화: null은 '', 면적 등 실수는 소수점 4자리 정수(x10000. db float 오차 무시), 층·금액 등은 정수
+# 정규화한 컬럼을 pandas 해시(hash_pandas_object)로 한 번에 계산 (행 단위 sha1 대신)
+# (pandas 업그레이드로 해시 값이 바뀌면 schema.rekey_trade_keys로 저장된 키를 다시 계산)
+# db에 이미 있는 행(schema.backfill_trade_keys, rekey_trade_keys)도 같은 함수로 계산해야 키가 일치함
+# key_counts: 청크 단위로 나눠 계산할 때 앞 청크까지 나온 키별 건수 (KeyCounts, 여기서 갱신됨)
+# -> 한 번에 계산한 것과 같은 순번
+def trade_keys(data: pd.DataFrame, key_counts: KeyCounts = None, columns: list = TRADE_KEY_COLUMNS,
+               int_columns: tuple = ('floor', 'deal_amount'), float_columns: tuple = ('size',)) -> pd.Series:
+    parts = {}
+    for col in columns:
+        if col not in data.columns:
+            # 예전 api 데이터는 apartment_dong 없음
+            parts[col] = pd.Series('', index=data.index, dtype=object)
+        elif col in float_columns:
+            parts[col] = (pd.to_numeric(data[col]).astype('float64') * 10000).round().astype('Int64')
+        elif col in int_columns:
+            parts[col] = pd.to_numeric(data[col]).astype('Int64')
+        else:
+            parts[col] = data[col].astype('string').fillna('').str.strip().astype(object)
+    parts = pd.DataFrame(parts, index=data.index)
+
+    # 키 값 해시 2개 (같은 값의 거래끼리 같은 값). 첫 번째는 순번 계산에도 사용
+    hashes = [pd.util.hash_pandas_object(parts, index=False, hash_key=hash_key) for hash_key in TRADE_KEY_HASH_KEYS]
+    base = hashes[0]
+    seq = base.groupby(base).cumcount() # 같은 키 안에서 응답 순서대로 0, 1, 2...
+    if key_counts is not None:
+        seq = seq + key_counts.get(base.values)
+        key_counts.add(base.values)
+    # (키 값 해시, 순번)을 다시 해시 -> 같은 값의 거래도 순번마다 다른 키
+    seq = seq.astype('uint64').values
+    halves = [hex_digest(pd.util.hash_pandas_object(pd.DataFrame({'key': hashed.values, 'seq': seq}), index=False,
+                                                     hash_key=hash_key))
+              for hashed, hash_key in zip(hashes, TRADE_KEY_HASH_KEYS)]
+    return pd.Series(np.char.add(*halves), index=data.index)
+
+
+### 행 내용 해시 (16자리 hex. change_detect에서 저장된 값과 비교)
+# 컬럼 이름 순으로 정렬 후 pandas 해시로 한 번에 계산 (행마다 문자열 연결·sha1 하지 않음)
+def row_hashes(data: pd.DataFrame) -> pd.Series:
+    cols = sorted(col for col in data.columns if col not in ROW_HASH_EXCLUDE)
+    return pd.Series(hex_digest(pd.util.hash_pandas_object(data[cols], index=False)), index=data.index)
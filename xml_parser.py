@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+'''
+실거래가 api xml 응답 스트리밍 파서
+- 응답 전체를 트리로 만들지 않고 iterparse로 item 단위 처리 후 바로 메모리 해제
+- 행은 dict가 아니라 고정 스키마(columns 순서) tuple, 또는 컬럼별 list로 반환
+create: 2026.10.18
+'''
+
+import re
+import xml.etree.ElementTree as ET
+
+# 새 api(2024.10~) item 태그
+APT_TRADE_COLUMNS = (
+    'aptDong', 'aptNm', 'aptSeq', 'bonbun', 'bubun', 'buildYear', 'buyerGbn', 'cdealDay', 'cdealType',
+    'dealAmount', 'dealDay', 'dealMonth', 'dealYear', 'dealingGbn', 'estateAgentSggNm', 'excluUseAr',
+    'floor', 'jibun', 'landCd', 'landLeaseholdGbn', 'rgstDate', 'roadNm', 'roadNmBonbun', 'roadNmBubun',
+    'roadNmCd', 'roadNmSeq', 'roadNmSggCd', 'roadNmbCd', 'sggCd', 'slerGbn', 'umdCd', 'umdNm',
+)
+
+# 이전 api item 태그 (load_data, load_extra_data)
+APT_TRADE_COLUMNS_OLD = (
+    '거래금액', '거래유형', '건축년도', '년', '도로명', '도로명건물본번호코드', '도로명건물부번호코드',
+    '도로명시군구코드', '도로명일련번호코드', '도로명지상지하코드', '도로명코드', '법정동', '법정동본번코드',
+    '법정동부번코드', '법정동시군구코드', '법정동읍면동코드', '법정동지번코드', '아파트', '월', '일',
+    '일련번호', '전용면적', '중개사소재지', '지번', '지역코드', '층', '해제사유발생일', '해제여부',
+)
+
+
+### 응답에 body가 없을 때 (api 요청 횟수 초과 등)
+class QuotaExceeded(Exception):
+    pass
+
+
+_META_TAGS = ('resultCode', 'resultMsg', 'numOfRows', 'pageNo', 'totalCount', 'returnAuthMsg')
+_META_PATTERNS = {tag: re.compile('<{0}>\\s*([^<]*?)\\s*</{0}>'.format(tag).encode('ascii')) for tag in _META_TAGS}
+
+
+### 파싱 없이 응답 원본에서 totalCount 등 item 밖의 값과 item 수만 확인 (멀티 프로세스 모드: 파싱은 워커에서)
+# body가 없으면 iter_items와 똑같이 QuotaExceeded
+def peek_meta(body: bytes) -> dict:
+    meta = {}
+    for tag, pattern in _META_PATTERNS.items():
+        match = pattern.search(body)
+        if match:
+            meta[tag] = match.group(1).decode('utf-8')
+    if b'<body>' not in body and b'<body ' not in body:
+        raise QuotaExceeded(meta.get('returnAuthMsg') or meta.get('resultMsg') or 'no body')
+    meta['items'] = body.count(b'<item>')
+    return meta
+
+
+### item 하나씩 tuple로 반환하는 generator
+# source: 파일 객체(response.raw 등). columns에 없는 태그는 무시, 없는 값은 ''
+# meta에 dict를 넘기면 item 밖의 값(resultCode, resultMsg, totalCount 등)을 채워줌
+def iter_items(source, columns: tuple, meta: dict = None):
+    index = {tag: i for i, tag in enumerate(columns)}
+    n_cols = len(columns)
+    meta = {} if meta is None else meta
+    has_body = False
+    items = None
+    row = None
+
+    for event, elem in ET.iterparse(source, events=('start', 'end')):
+        tag = elem.tag
+        if event == 'start':
+            if tag == 'item':
+                row = [''] * n_cols
+            elif tag == 'items':
+                items = elem
+            elif tag == 'body':
+                has_body = True
+            continue
+
+        if row is not None:
+            if tag == 'item':
+                yield tuple(row)
+                row = None
+                items.clear() # 처리 끝난 item 해제
+            else:
+                i = index.get(tag)
+                if i is not None and elem.text:
+                    row[i] = elem.text.strip()
+        elif len(elem) == 0 and tag != 'items':
+            meta[tag] = (elem.text or '').strip()
+
+    if not has_body:
+        raise QuotaExceeded(meta.get('returnAuthMsg') or meta.get('resultMsg') or 'no body')
+
+
+### 컬럼별 list로 반환 ({컬럼: [값, ...]}) -> pd.DataFrame(...)에 바로 사용
+def parse_columns(source, columns: tuple, meta: dict = None) -> dict:
+    values = [[] for _ in columns]
+    appends = [col_values.append for col_values in values]
+    for row in iter_items(source, columns, meta):
+        for append, value in zip(appends, row):
+            append(value)
+    return dict(zip(columns, values))